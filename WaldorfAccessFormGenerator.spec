@@ -1,39 +1,118 @@
 # -*- mode: python ; coding: utf-8 -*-
+#
+# Build profiles, selected with the WALDORF_BUILD_PROFILE environment variable:
+#
+#   onefile (default)  single executable, unpacked to a temp dir on every launch
+#       pyinstaller WaldorfAccessFormGenerator.spec
+#
+#   onedir             folder install, nothing is extracted at launch; bytecode is
+#                      precompiled with optimize=1, unused Qt plugins and
+#                      translations are left out and UPX is disabled
+#       set WALDORF_BUILD_PROFILE=onedir
+#       pyinstaller WaldorfAccessFormGenerator.spec
+#
+# The Firebase SDK is bundled in both profiles but only imported when
+# DATABASE_TYPE=firebase. Compare cold start of the two builds with
+#   python -m benchmarks.bench_startup --exe <path to the built exe>
+# (see benchmarks/STARTUP.md).
+import os
 
+profile = os.getenv("WALDORF_BUILD_PROFILE", "onefile").lower()
+onedir = profile == "onedir"
+
+hiddenimports = ['sip', 'fpdf', 'fpdf.pdf', 'fpdf.template', 'PIL', 'PIL.Image', 'PyQt5', 'PyQt5.QtCore', 'PyQt5.QtGui', 'PyQt5.QtWidgets', 'firebase_admin', 'firebase_admin.credentials', 'firebase_admin.db', 'google.cloud', 'google.oauth2', 'google.auth', 'dotenv', 'config', 'source.database.db_manager', 'source.GUI', 'source.GUI.login_screen', 'source.GUI.main_screen', 'source.GUI.Form', 'source.GUI.departments_and_positions', 'source.GUI.hotel_systems', 'source.GUI.navigation_bar', 'source.Templates', 'source.Templates.access_template_generator', 'source.Templates.departure_template']
+pathex = []
+excludes = []
+
+if onedir:
+    # Compile the application modules into the archive under the names the
+    # code imports them by, instead of compiling source/*.py at every launch
+    pathex = ['source']
+    hiddenimports += ['instrumentation', 'startup_trace', 'GUI', 'GUI.login_screen', 'GUI.main_screen', 'GUI.Form', 'GUI.departments_and_positions', 'GUI.hotel_systems', 'GUI.navigation_bar', 'GUI.person_completer', 'GUI.metrics_overlay', 'GUI.startup_prefetch', 'GUI.bulk_transfer', 'GUI.edit_history', 'database', 'database.db_manager', 'database.catalog', 'database.models', 'database.codec', 'database.lazy_document', 'database.concurrency', 'database.firebase_layout', 'database.firebase_cache', 'database.resilience', 'database.bulk', 'database.roles', 'database.compaction', 'database.ids', 'database.forms_archive', 'database.person_index', 'Templates', 'Templates.access_template_generator', 'Templates.departure_template', 'Templates.text_metrics']
+    excludes = ['tkinter', 'pydoc', 'PyQt5.QtWebEngine', 'PyQt5.QtWebEngineCore', 'PyQt5.QtWebEngineWidgets', 'PyQt5.QtMultimedia', 'PyQt5.QtQml', 'PyQt5.QtQuick', 'PyQt5.QtSql', 'PyQt5.QtBluetooth', 'PyQt5.QtDesigner']
 
 a = Analysis(
     ['main.py'],
-    pathex=[],
+    pathex=pathex,
     binaries=[],
     datas=[('assets', 'assets'), ('source', 'source'), ('waldodb-74088-firebase-adminsdk-fbsvc-37790af852.json', '.'), ('.env', '.')],
-    hiddenimports=['sip', 'fpdf', 'fpdf.pdf', 'fpdf.template', 'PIL', 'PIL.Image', 'PyQt5', 'PyQt5.QtCore', 'PyQt5.QtGui', 'PyQt5.QtWidgets', 'firebase_admin', 'firebase_admin.credentials', 'firebase_admin.db', 'google.cloud', 'google.oauth2', 'google.auth', 'dotenv', 'config', 'source.database.db_manager', 'source.GUI', 'source.GUI.login_screen', 'source.GUI.main_screen', 'source.GUI.Form', 'source.GUI.departments_and_positions', 'source.GUI.hotel_systems', 'source.GUI.navigation_bar', 'source.Templates', 'source.Templates.access_template_generator', 'source.Templates.departure_template'],
+    hiddenimports=hiddenimports,
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=excludes,
     noarchive=False,
-    optimize=0,
+    optimize=1 if onedir else 0,
 )
+
+if onedir:
+    # Qt plugins the application needs: the Windows platform, the Fusion/Windows
+    # styles and the image formats used for the logo and icon
+    kept_plugin_dirs = ('platforms', 'styles', 'imageformats', 'iconengines')
+
+    def is_unused_qt_file(dest_name):
+        parts = dest_name.replace('\\', '/').split('/')
+        if 'Qt5' not in parts:
+            return False
+        after = parts[parts.index('Qt5') + 1:]
+        if after[:1] == ['translations']:
+            return True
+        if after[:1] == ['plugins'] and len(after) > 1:
+            return after[1] not in kept_plugin_dirs
+        return False
+
+    a.binaries = [entry for entry in a.binaries if not is_unused_qt_file(entry[0])]
+    a.datas = [entry for entry in a.datas if not is_unused_qt_file(entry[0])]
+
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='WaldorfAccessFormGenerator',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-    icon=['assets\\waldorf_ico.ico'],
-)
+if onedir:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='WaldorfAccessFormGenerator',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+        icon=['assets\\waldorf_ico.ico'],
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='WaldorfAccessFormGenerator',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='WaldorfAccessFormGenerator',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+        icon=['assets\\waldorf_ico.ico'],
+    )
@@ -0,0 +1,5 @@
+"""Benchmarks for the data layer, PDF generation and application startup.
+
+Run with ``python -m benchmarks.run`` and ``python -m benchmarks.bench_startup``
+from the project root.
+"""
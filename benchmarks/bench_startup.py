@@ -0,0 +1,170 @@
+"""Cold start benchmark.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 10] [--exe dist/WaldorfAccessFormGenerator.exe]
+                                       [--output startup.json] [--baseline startup.json]
+                                       [--check]
+
+Launches the application repeatedly with the startup trace enabled
+(see startup_trace.py) and quits as soon as the login screen is painted.
+By default main.py is run from source; --exe measures a PyInstaller build
+instead. A second probe imports the database layer in a fresh interpreter
+to time database init on its own.
+
+Budgets are the "startup" (source) and "startup_frozen" (--exe) sections
+of benchmarks/thresholds.json.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THRESHOLDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.harness import (check_against_baseline, check_thresholds, format_table,
+                                load_json, save_json, summarize)
+
+# Imports the database layer the way the screens do, in a fresh interpreter
+DB_INIT_PROBE = (
+    "import startup_trace, sys, os\n"
+    "sys.path.append(os.path.join(os.getcwd(), 'source'))\n"
+    "with startup_trace.phase('db.import'):\n"
+    "    from database.db_manager import db_manager\n"
+)
+
+
+def startup_environment(trace_path, db_path):
+    """Return the environment for a traced, self-terminating launch"""
+    env = dict(os.environ)
+    env.update({
+        "WALDORF_STARTUP_TRACE": trace_path,
+        "WALDORF_STARTUP_TRACE_EXIT": "1",
+        "DATABASE_TYPE": env.get("DATABASE_TYPE", "local"),
+        "LOCAL_DB_PATH": db_path,
+        "WALDORF_LOG_DIR": os.path.join(tempfile.gettempdir(), "waldorf_benchmark_logs"),
+    })
+    # Headless runs (CI) have no display
+    if sys.platform.startswith("linux") and not env.get("DISPLAY"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def run_traced(command, env, timeout):
+    """Run a command with the startup trace and return (wall_ms, trace report)"""
+    if os.path.exists(env["WALDORF_STARTUP_TRACE"]):
+        os.remove(env["WALDORF_STARTUP_TRACE"])
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=PROJECT_ROOT, env=env, timeout=timeout,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    wall_ms = (time.perf_counter() - start) * 1000.0
+    if completed.returncode != 0 or not os.path.exists(env["WALDORF_STARTUP_TRACE"]):
+        raise RuntimeError(f"{' '.join(command)} failed: {completed.stderr.decode(errors='replace')[-2000:]}")
+    return wall_ms, load_json(env["WALDORF_STARTUP_TRACE"])
+
+
+def first_paint_ms(report):
+    """Time until the login screen was painted, including bundle extraction"""
+    painted = report["marks"].get("first_paint.LoginScreen")
+    if painted is None:
+        return None
+    return painted + (report.get("bundle_extraction_ms") or 0.0)
+
+
+def phase_ms(report, name):
+    """Return the duration of a named phase in a trace report"""
+    for entry in report["phases"]:
+        if entry["name"] == name:
+            return entry["duration_ms"]
+    return None
+
+
+def slowest_imports(reports, top=10):
+    """Return the imports with the highest median time across runs (nested imports included)"""
+    samples = {}
+    for report in reports:
+        for entry in report["imports"]:
+            samples.setdefault(entry["module"], []).append(entry["duration_ms"])
+    medians = {name: sorted(values)[len(values) // 2] for name, values in samples.items()}
+    return sorted(medians.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def run_startup_benchmark(runs, exe=None, timeout=60):
+    """Launch the application runs times and return ({name: stats}, reports)"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        trace_path = os.path.join(tmp_dir, "trace.json")
+        db_path = os.path.join(tmp_dir, "database.json")
+        env = startup_environment(trace_path, db_path)
+        command = [exe] if exe else [sys.executable, "main.py"]
+
+        # One untimed launch so the OS file cache is warm for every run
+        run_traced(command, env, timeout)
+
+        samples = {"startup.process_wall": [], "startup.first_paint": [], "startup.imports": []}
+        reports = []
+        for _ in range(runs):
+            wall_ms, report = run_traced(command, env, timeout)
+            reports.append(report)
+            samples["startup.process_wall"].append(wall_ms)
+            samples["startup.first_paint"].append(first_paint_ms(report) or wall_ms)
+            samples["startup.imports"].append(report["import_total_ms"])
+            if report.get("bundle_extraction_ms") is not None:
+                samples.setdefault("startup.bundle_extraction", []).append(report["bundle_extraction_ms"])
+
+        # The frozen build has no interpreter to run the probe with
+        if not exe:
+            probe = [sys.executable, "-c", DB_INIT_PROBE]
+            samples["startup.db_import"] = []
+            for _ in range(runs):
+                _, report = run_traced(probe, env, timeout)
+                samples["startup.db_import"].append(phase_ms(report, "db.import") or 0.0)
+
+    return {name: summarize(values) for name, values in samples.items()}, reports
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark application cold start")
+    parser.add_argument("--runs", type=int, default=10, help="Number of timed launches")
+    parser.add_argument("--exe", help="Benchmark this PyInstaller executable instead of main.py")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="Allowed p95 slowdown against the baseline (0.20 = 20%%)")
+    parser.add_argument("--check", action="store_true",
+                        help="Exit with an error when a budget or the baseline is exceeded")
+    args = parser.parse_args(argv)
+
+    results, reports = run_startup_benchmark(args.runs, args.exe)
+
+    print(f"Target: {args.exe or 'main.py'}, runs: {args.runs}")
+    print(format_table(results))
+    print("\nSlowest imports (median ms, including nested imports):")
+    for module, duration in slowest_imports(reports):
+        print(f"  {module:<40}{duration:>10.1f}")
+
+    if args.output:
+        save_json(args.output, results)
+
+    failures = []
+    if os.path.exists(THRESHOLDS_FILE):
+        section = "startup_frozen" if args.exe else "startup"
+        failures.extend(check_thresholds(results, load_json(THRESHOLDS_FILE).get(section, {})))
+    if args.baseline:
+        failures.extend(check_against_baseline(results, load_json(args.baseline), args.tolerance,
+                                               min_delta_ms=25.0))
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    if args.check and failures:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Local stand-in for the Firebase Realtime Database REST API.
+
+Usage:
+    python -m benchmarks.firebase_standin [--port 9000] [--data database.json]
+                                          [--delay 0.0] [--fail-rate 0.0]
+
+Run the application against it with:
+
+    DATABASE_TYPE=firebase
+    FIREBASE_DATABASE_URL=https://waldorf.firebaseio.com
+    FIREBASE_DATABASE_EMULATOR_HOST=localhost:9000
+
+It implements the requests db_manager makes (GET with shallow, ETag and
+If-None-Match, PUT with If-Match, DELETE) on an in-memory tree. --delay
+holds every response back and --fail-rate drops that share of requests
+without an answer, to exercise the timeouts, retries and circuit breaker
+(see source/database/resilience.py). From Python, StandIn can also be
+taken down and brought back while it runs.
+"""
+import os
+import sys
+import copy
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StandIn:
+    """An in-memory database served over HTTP on localhost"""
+
+    def __init__(self, data=None, port=0, delay=0.0, fail_rate=0.0):
+        self.data = data
+        self.delay = delay
+        self.fail_rate = fail_rate
+        # While down, every request is dropped as if the network were gone
+        self.down = False
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(self))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def host(self):
+        return f"127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get(self, parts):
+        value = self.data
+        for part in parts:
+            if isinstance(value, list) and part.isdigit() and int(part) < len(value):
+                value = value[int(part)]
+            elif isinstance(value, dict) and part in value:
+                value = value[part]
+            else:
+                return None
+        return value
+
+    def put(self, parts, value):
+        if value in (None, {}, []):
+            value = None
+        if not parts:
+            self.data = value
+            return
+        if self.data is None:
+            self.data = {}
+        node = self.data
+        for part in parts[:-1]:
+            if isinstance(node, list) and part.isdigit() and int(part) < len(node):
+                key = int(part)
+            elif isinstance(node, dict):
+                key = part
+            else:
+                raise ValueError(f"Cannot write below a value at {part}")
+            if not isinstance(node[key] if isinstance(node, list) else node.get(key), (dict, list)):
+                node[key] = {}
+            node = node[key]
+        last = parts[-1]
+        if isinstance(node, list) and last.isdigit() and int(last) < len(node):
+            node[int(last)] = value
+        elif isinstance(node, dict):
+            if value is None:
+                node.pop(last, None)
+            else:
+                node[last] = value
+        else:
+            raise ValueError(f"Cannot write {last} into a list")
+
+
+def etag_of(value):
+    """ETag of a value, stable for equal values"""
+    return hashlib.md5(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _make_handler(standin):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _parts(self):
+            path = urlsplit(self.path).path
+            if path.endswith(".json"):
+                path = path[:-len(".json")]
+            return [part for part in path.split("/") if part]
+
+        def _query(self):
+            return parse_qs(urlsplit(self.path).query)
+
+        def _intercept(self):
+            """Apply the configured delay and failures; True if the request was dropped"""
+            with standin.lock:
+                standin.requests += 1
+            if standin.delay:
+                time.sleep(standin.delay)
+            if standin.down or random.random() < standin.fail_rate:
+                self.close_connection = True
+                self.connection.close()
+                return True
+            return False
+
+        def _reply(self, status, value, etag=None):
+            body = json.dumps(value).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if etag is not None:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self._intercept():
+                return
+            with standin.lock:
+                value = copy.deepcopy(standin.get(self._parts()))
+            etag = etag_of(value)
+            if self.headers.get("if-none-match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if self._query().get("shallow") == ["true"] and isinstance(value, (dict, list)):
+                value = {str(key): True for key in (value if isinstance(value, dict) else range(len(value)))}
+            send_etag = self.headers.get("X-Firebase-ETag") == "true" or "if-none-match" in self.headers
+            self._reply(200, value, etag if send_etag else None)
+
+        def do_PUT(self):
+            if self._intercept():
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            value = json.loads(self.rfile.read(length) or b"null")
+            parts = self._parts()
+            with standin.lock:
+                current = standin.get(parts)
+                expected = self.headers.get("if-match")
+                if expected is not None and expected != etag_of(current):
+                    self._reply(412, copy.deepcopy(current), etag_of(current))
+                    return
+                standin.put(parts, value)
+                stored = copy.deepcopy(standin.get(parts))
+            self._reply(200, stored, etag_of(stored))
+
+        def do_DELETE(self):
+            if self._intercept():
+                return
+            with standin.lock:
+                standin.put(self._parts(), None)
+            self._reply(200, None)
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Firebase Realtime Database")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--data", help="Database file to start from, in any codec format")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to hold back every response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests to drop, 0 to 1")
+    args = parser.parse_args(argv)
+
+    data = None
+    if args.data:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "source"))
+        from database import codec
+        data = codec.load_file(args.data)
+
+    standin = StandIn(data, args.port, args.delay, args.fail_rate)
+    print(f"Serving on {standin.host}, set FIREBASE_DATABASE_EMULATOR_HOST={standin.host}")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
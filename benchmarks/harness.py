@@ -0,0 +1,97 @@
+import time
+import json
+
+
+def percentile(sorted_samples, fraction):
+    """Return a percentile of already sorted samples using linear interpolation"""
+    if not sorted_samples:
+        return 0.0
+    position = (len(sorted_samples) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_samples) - 1)
+    weight = position - lower
+    return sorted_samples[lower] * (1 - weight) + sorted_samples[upper] * weight
+
+
+def measure(func, iterations=20, warmup=2, ops_per_call=1):
+    """Time func over several iterations and return latency statistics in milliseconds"""
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000.0)
+
+    return summarize(samples, ops_per_call)
+
+
+def summarize(samples, ops_per_call=1):
+    """Return latency statistics for a list of samples in milliseconds"""
+    samples = sorted(samples)
+    iterations = len(samples)
+    total_seconds = sum(samples) / 1000.0
+    return {
+        "iterations": iterations,
+        "mean_ms": sum(samples) / len(samples),
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "p99_ms": percentile(samples, 0.99),
+        "max_ms": samples[-1],
+        "ops_per_sec": (iterations * ops_per_call) / total_seconds if total_seconds else 0.0,
+    }
+
+
+def check_thresholds(results, thresholds):
+    """Compare results against absolute budgets ({name: {"p95_ms": limit}}).
+
+    Returns a list of human readable failure messages.
+    """
+    failures = []
+    for name, limits in thresholds.items():
+        if name not in results:
+            continue
+        for metric, limit in limits.items():
+            value = results[name].get(metric)
+            if value is not None and value > limit:
+                failures.append(f"{name}: {metric} {value:.2f} exceeds budget {limit:.2f}")
+    return failures
+
+
+def check_against_baseline(results, baseline, tolerance=0.20, metric="p95_ms", min_delta_ms=1.0):
+    """Compare results with an earlier run, flagging slowdowns beyond tolerance.
+
+    Differences smaller than min_delta_ms are ignored, sub-millisecond timings
+    are too noisy to compare relatively.
+    """
+    failures = []
+    for name, stats in results.items():
+        previous = baseline.get(name, {}).get(metric)
+        if (previous and stats[metric] > previous * (1 + tolerance)
+                and stats[metric] - previous > min_delta_ms):
+            failures.append(f"{name}: {metric} {stats[metric]:.2f} is more than "
+                            f"{tolerance:.0%} slower than baseline {previous:.2f}")
+    return failures
+
+
+def format_table(results):
+    """Return the results as an aligned text table"""
+    header = f"{'benchmark':<34}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>12}"
+    lines = [header, "-" * len(header)]
+    for name, stats in results.items():
+        lines.append(f"{name:<34}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                     f"{stats['p99_ms']:>10.2f}{stats['ops_per_sec']:>12.1f}")
+    return "\n".join(lines)
+
+
+def load_json(path):
+    """Load a JSON file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    """Save data to a JSON file"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
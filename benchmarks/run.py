@@ -0,0 +1,177 @@
+"""Run the data layer and PDF generation benchmarks.
+
+Usage:
+    python -m benchmarks.run [--profile medium] [--iterations 20]
+                             [--output results.json] [--baseline results.json]
+                             [--check]
+
+Results are printed as a table with p50/p95/p99 latencies and throughput.
+With --check the run fails when a benchmark exceeds its budget in
+benchmarks/thresholds.json, or is slower than --baseline by more than
+--tolerance.
+"""
+import os
+import sys
+import types
+import argparse
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THRESHOLDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+
+
+def prepare_environment(db_path):
+    """Point the application at a local database before config is imported"""
+    os.environ["DATABASE_TYPE"] = "local"
+    os.environ["LOCAL_DB_PATH"] = db_path
+    # Keep benchmark timings out of the application's own log and snapshot
+    os.environ["WALDORF_LOG_DIR"] = os.path.join(tempfile.gettempdir(), "waldorf_benchmark_logs")
+    for path in (PROJECT_ROOT, os.path.join(PROJECT_ROOT, "source")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    # The PDF templates resolve the logo relative to the working directory
+    os.chdir(PROJECT_ROOT)
+
+
+def busiest_position(db_data):
+    """Return the (dept_id, pos_id) with the most granted systems"""
+    best, best_count = None, -1
+    for dept_id, positions in db_data["access_permissions"].items():
+        for pos_id, categories in positions.items():
+            count = sum(len(systems) for systems in categories.values())
+            if count > best_count:
+                best, best_count = (dept_id, pos_id), count
+    return best
+
+
+def run_benchmarks(profile, iterations):
+    """Run every benchmark and return {name: stats}"""
+    from benchmarks.synthetic import generate_profile, iter_positions
+    from benchmarks.harness import measure
+
+    from database.db_manager import db_manager
+    from Templates.access_template_generator import create_custom_pdf
+    from Templates.departure_template import SeparationChecklistPDF
+    from GUI.Form import FormScreen
+    from GUI.main_screen import MainScreen
+    from database.roles import PermissionResolver
+
+    db_data = generate_profile(profile)
+    db_manager.save_database(db_data)
+    results = {}
+
+    # --- Data layer (local backend) ---
+    results["db.load_database.local"] = measure(db_manager.load_database, iterations)
+    results["db.save_database.local"] = measure(lambda: db_manager.save_database(db_data), iterations)
+
+    # --- Serialization, for every installed JSON backend and on-disk format ---
+    from database import codec
+    default_backend = codec.get_backend()
+    for backend in codec.available_backends():
+        codec.set_backend(backend)
+        for fmt in (codec.PRETTY, codec.COMPACT):
+            encoded = codec.dumps(db_data, fmt)
+            results[f"codec.dumps.{backend}.{fmt}"] = measure(lambda: codec.dumps(db_data, fmt), iterations)
+            results[f"codec.loads.{backend}.{fmt}"] = measure(lambda: codec.loads(encoded), iterations)
+    codec.set_backend(default_backend)
+    try:
+        encoded = codec.dumps(db_data, codec.MSGPACK)
+        results["codec.dumps.msgpack"] = measure(lambda: codec.dumps(db_data, codec.MSGPACK), iterations)
+        results["codec.loads.msgpack"] = measure(lambda: codec.loads(encoded), iterations)
+    except ImportError:
+        pass
+
+    # --- Indexed format: full load against the Form screen's lazy access pattern ---
+    indexed_path = os.path.join(os.path.dirname(os.environ["LOCAL_DB_PATH"]), "database_indexed.json")
+    codec.save_file(indexed_path, db_data, codec.INDEXED)
+    form_dept_id, form_pos_id = busiest_position(db_data)
+
+    def form_access():
+        document = codec.open_lazy(indexed_path)
+        departments = document.get("departments", [])
+        categories = document.get("system_categories", [])
+        grants = document.get("access_permissions", {}).get(form_dept_id, {}).get(form_pos_id, {})
+        return departments, categories, grants
+
+    results["db.load_database.indexed"] = measure(lambda: codec.load_file(indexed_path), iterations)
+    results["db.open_lazy.form_access"] = measure(form_access, iterations)
+
+    # --- Permission lookups, as done by the form and access matrix screens ---
+    positions = list(iter_positions(db_data))
+    screen_state = types.SimpleNamespace(db_data=db_data, permission_resolver=PermissionResolver(db_data))
+
+    def form_lookups():
+        for dept_id, pos_id in positions:
+            FormScreen.get_position_access(screen_state, dept_id, pos_id)
+
+    def matrix_lookups():
+        for dept_id, pos_id in positions:
+            MainScreen.load_permissions_from_database(screen_state, dept_id, pos_id)
+
+    results["lookup.form.position_access"] = measure(form_lookups, iterations, ops_per_call=len(positions))
+    results["lookup.matrix.position_permissions"] = measure(matrix_lookups, iterations, ops_per_call=len(positions))
+
+    # --- PDF generation for the position with the largest access set ---
+    dept_id, pos_id = busiest_position(db_data)
+    access_permissions = db_data["access_permissions"][dept_id][pos_id]
+    system_categories = db_data["system_categories"]
+
+    def signin_layout():
+        return create_custom_pdf("Benchmark Person", "bench.user", "bench@example.com", "Department",
+                                 "Position", "01-Jan-25", access_permissions, system_categories)
+
+    def departure_layout():
+        pdf = SeparationChecklistPDF(orientation='P', unit='mm', format='A4')
+        pdf.generate_checklist("Benchmark Person", "bench.user", "Department", "Position", "01-Jan-25",
+                               access_permissions, system_categories)
+        return pdf
+
+    results["pdf.create_custom_pdf"] = measure(signin_layout, iterations)
+    results["pdf.create_custom_pdf+output"] = measure(lambda: signin_layout().output(), iterations)
+    results["pdf.generate_checklist"] = measure(departure_layout, iterations)
+    results["pdf.generate_checklist+output"] = measure(lambda: departure_layout().output(), iterations)
+
+    return results
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark the data layer and PDF generation")
+    parser.add_argument("--profile", default="medium", choices=["small", "medium", "large"],
+                        help="Size of the synthetic database")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed iterations per benchmark")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="Allowed p95 slowdown against the baseline (0.20 = 20%%)")
+    parser.add_argument("--check", action="store_true",
+                        help="Exit with an error when a budget or the baseline is exceeded")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prepare_environment(os.path.join(tmp_dir, "database.json"))
+        from benchmarks.harness import (check_against_baseline, check_thresholds,
+                                        format_table, load_json, save_json)
+        results = run_benchmarks(args.profile, args.iterations)
+
+    print(f"Profile: {args.profile}, iterations: {args.iterations}")
+    print(format_table(results))
+
+    if args.output:
+        save_json(args.output, results)
+
+    failures = []
+    if os.path.exists(THRESHOLDS_FILE):
+        failures.extend(check_thresholds(results, load_json(THRESHOLDS_FILE).get(args.profile, {})))
+    if args.baseline:
+        failures.extend(check_against_baseline(results, load_json(args.baseline), args.tolerance))
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    if args.check and failures:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
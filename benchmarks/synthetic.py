@@ -0,0 +1,61 @@
+import random
+
+# Dataset sizes: departments, positions per department, categories, systems per category
+PROFILES = {
+    "small": (10, 4, 5, 6),
+    "medium": (60, 8, 25, 12),
+    "large": (200, 20, 60, 30),
+}
+
+
+def generate_database(departments=60, positions_per_department=8, categories=25,
+                      systems_per_category=12, grant_ratio=0.3, seed=1234):
+    """Build a database document with the same shape as database.json.
+
+    Every position gets random access_permissions over the generated systems,
+    granting roughly grant_ratio of them.
+    """
+    rng = random.Random(seed)
+    db_data = {"departments": [], "system_categories": [], "access_permissions": {}}
+
+    for c in range(1, categories + 1):
+        category = {"id": f"cat_{c:03d}", "name": f"Category {c} Systems", "systems": []}
+        for s in range(1, systems_per_category + 1):
+            category["systems"].append({
+                "id": f"sys_{c:03d}_{s:03d}",
+                "name": f"System {c}.{s} " + rng.choice(["Access", "Reports", "Admin", "Read Only", "Approvals"]),
+            })
+        db_data["system_categories"].append(category)
+
+    for d in range(1, departments + 1):
+        department = {"id": f"dept_{d:03d}", "name": f"Department {d}", "positions": []}
+        dept_access = {}
+        for p in range(1, positions_per_department + 1):
+            position = {"id": f"pos_{d:03d}_{p:03d}", "name": f"Position {d}.{p}"}
+            department["positions"].append(position)
+
+            position_access = {}
+            for category in db_data["system_categories"]:
+                granted = {system["id"]: True for system in category["systems"] if rng.random() < grant_ratio}
+                if granted:
+                    position_access[category["id"]] = granted
+            if position_access:
+                dept_access[position["id"]] = position_access
+        db_data["departments"].append(department)
+        if dept_access:
+            db_data["access_permissions"][department["id"]] = dept_access
+
+    return db_data
+
+
+def generate_profile(name, seed=1234):
+    """Build a database document for one of the named PROFILES"""
+    departments, positions, categories, systems = PROFILES[name]
+    return generate_database(departments, positions, categories, systems, seed=seed)
+
+
+def iter_positions(db_data):
+    """Yield (dept_id, pos_id) for every position in a database document"""
+    for department in db_data["departments"]:
+        for position in department["positions"]:
+            yield department["id"], position["id"]
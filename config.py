@@ -3,6 +3,7 @@ import sys
 from dotenv import load_dotenv
 from enum import Enum
 from typing import Optional
+import startup_trace
 
 # Load environment variables from .env file
 # Check if we're running in a PyInstaller bundle
@@ -14,13 +15,25 @@ else:
     # We're running in a normal Python environment
     env_path = '.env'
 
-load_dotenv(env_path)
+with startup_trace.phase("config.load_dotenv"):
+    load_dotenv(env_path)
 
 class DatabaseType(Enum):
     """Enum for supported database types"""
     LOCAL = "local"
     FIREBASE = "firebase"
 
+def _env_number(name, default, cast=float):
+    """Numeric setting from the environment, the default if it is missing or invalid"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        print(f"Warning: Invalid {name} '{value}'. Defaulting to {default}.")
+        return default
+
 class DatabaseConfig:
     """Centralized database configuration management"""
     
@@ -38,9 +51,30 @@ class DatabaseConfig:
         self.firebase_database_url = os.getenv("FIREBASE_DATABASE_URL")
         self.firebase_service_account_key = os.getenv("FIREBASE_SERVICE_ACCOUNT_KEY")
         
+        # Local copy of the last Firebase download, reused while Firebase reports no change.
+        # Defaults to the user's app data folder; set to an empty value to disable it
+        self.firebase_cache_path = os.getenv("FIREBASE_CACHE_PATH")
+        
+        # Seconds before a Firebase request is abandoned, attempts per call, and the number
+        # of failed calls in a row after which the local copy is used until Firebase recovers
+        self.firebase_timeout = _env_number("FIREBASE_TIMEOUT", 10.0)
+        self.firebase_attempts = _env_number("FIREBASE_ATTEMPTS", 3, int)
+        self.firebase_breaker_threshold = _env_number("FIREBASE_BREAKER_THRESHOLD", 3, int)
+        self.firebase_breaker_reset = _env_number("FIREBASE_BREAKER_RESET", 30.0)
+        
+        # Host of a local Realtime Database emulator or stand-in, used without credentials
+        self.firebase_emulator_host = os.getenv("FIREBASE_DATABASE_EMULATOR_HOST")
+        
         # Local database configuration
         self.local_db_path = os.getenv("LOCAL_DB_PATH", "source/database/database.json")
         
+        # On-disk format of the local database and persons files: pretty, compact, msgpack
+        # or indexed (decoded lazily, one department, category or permission set at a time)
+        self.data_format = os.getenv("DATA_FORMAT", "pretty").lower()
+        if self.data_format not in ("pretty", "compact", "msgpack", "indexed"):
+            print(f"Warning: Invalid DATA_FORMAT '{self.data_format}'. Defaulting to pretty.")
+            self.data_format = "pretty"
+        
         # Validate configuration
         self._validate_configuration()
     
@@ -49,7 +83,7 @@ class DatabaseConfig:
         if self.database_type == DatabaseType.FIREBASE:
             if not self.firebase_database_url:
                 raise ValueError("FIREBASE_DATABASE_URL is required when using Firebase")
-            if not self.firebase_service_account_key:
+            if not self.firebase_service_account_key and not self.firebase_emulator_host:
                 raise ValueError("FIREBASE_SERVICE_ACCOUNT_KEY is required when using Firebase")
         
         elif self.database_type == DatabaseType.LOCAL:
@@ -96,7 +130,8 @@ class DatabaseConfig:
         print("Switched to local database")
 
 # Create a global configuration instance
-db_config = DatabaseConfig()
+with startup_trace.phase("config.db_config"):
+    db_config = DatabaseConfig()
 
 # Backward compatibility - keep the old variable names for existing code
 USING_LOCAL_DB = db_config.is_using_local()
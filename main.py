@@ -1,27 +1,53 @@
+import startup_trace  # Keep first so the startup trace sees every import
 import sys
 import os
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QObject, QEvent
 from PyQt5.QtGui import QIcon
 
 # Add the source directory to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), "source"))
 
+class FirstPaintTracer(QObject):
+    """Marks the first paint of every top-level window in the startup trace"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+        self.painted = set()
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and obj.isWidgetType() and obj.isWindow():
+            name = type(obj).__name__
+            if name not in self.painted:
+                self.painted.add(name)
+                startup_trace.mark(f"first_paint.{name}")
+                if name == "LoginScreen" and startup_trace.exit_after_first_paint():
+                    self.app.quit()
+        return False
+
 def main():
     """Main entry point for the Waldorf Access Form Generator application"""
-    app = QApplication(sys.argv)
-    app.setStyle('Fusion')  # Modern look
-    
+    with startup_trace.phase("qt.application"):
+        app = QApplication(sys.argv)
+        app.setStyle('Fusion')  # Modern look
+
+    if startup_trace.is_enabled():
+        app.installEventFilter(FirstPaintTracer(app))
+
     # Set the application icon
     icon_path = os.path.join(os.path.dirname(__file__), "assets", "waldorf_ico.ico")
     if os.path.exists(icon_path):
         app.setWindowIcon(QIcon(icon_path))
-    
+
     # Import and run the login screen
-    from GUI import login_screen
-    login = login_screen.LoginScreen()
-    login.run()
-    
+    with startup_trace.phase("login.import"):
+        from GUI import login_screen
+    with startup_trace.phase("login.construct"):
+        login = login_screen.LoginScreen()
+        login.run()
+
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
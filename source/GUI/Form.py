@@ -5,20 +5,30 @@ import datetime
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                             QLabel, QPushButton, QMessageBox, QLineEdit, QComboBox,
                             QRadioButton, QButtonGroup, QDateEdit, QFrame, QGroupBox,
-                            QScrollArea, QCheckBox, QFileDialog)
-from PyQt5.QtCore import Qt, QDate, pyqtSignal
-from PyQt5.QtGui import QFont, QIcon
+                            QScrollArea, QCheckBox, QFileDialog, QListWidget, QListWidgetItem)
+from PyQt5.QtCore import Qt, QDate, QModelIndex, QUrl, QTimer, pyqtSignal
+from PyQt5.QtGui import QFont, QIcon, QDesktopServices
 
 # Add the parent directory to the path to import other modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from Templates.access_template_generator import PDF, create_custom_pdf
+from Templates.access_template_generator import TEMPLATE_VERSION as SIGNIN_TEMPLATE_VERSION
 from Templates.departure_template import SeparationChecklistPDF
+from Templates.departure_template import TEMPLATE_VERSION as DEPARTURE_TEMPLATE_VERSION
 
 # Import navigation bar and database manager
 from GUI.navigation_bar import NavigationBar
+from GUI.person_completer import PersonCompleter
 from database.db_manager import db_manager
+from database.roles import PermissionResolver
+from database import codec
+from config import db_config
+from database.forms_archive import FormsArchive, form_content_hash
+from database.person_index import PersonSearchIndex, person_display_text
+from instrumentation import metrics, timed
 
 class FormScreen(QMainWindow):
+    @timed("screen.form.construct")
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Waldorf Access Form Generator - Sign In and Departure Form")
@@ -36,6 +46,8 @@ class FormScreen(QMainWindow):
         self.config_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
         self.generated_forms_dir = None
         self.persons_data = {}
+        self.person_index = PersonSearchIndex()
+        self.forms_archive = None
         
         # Load configuration
         self.load_config()
@@ -84,25 +96,59 @@ class FormScreen(QMainWindow):
     def load_database(self):
         """Load data from the database using the database manager"""
         try:
-            self.db_data = db_manager.load_database()
+            # Read only here, so sections such as permission sets are decoded when used
+            self.db_data = db_manager.load_database_lazy()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load database: {str(e)}")
             self.db_data = {"departments": [], "system_categories": [], "access_permissions": {}}
+        self.permission_resolver = PermissionResolver(self.db_data)
         
         # Load persons data if generated_forms_dir exists
         if self.generated_forms_dir:
             self.load_persons_data()
     
     def load_persons_data(self):
-        """Load persons data from the JSON tracking file"""
+        """Load persons data from the tracking file, in any of the codec formats"""
         try:
             persons_file = os.path.join(self.generated_forms_dir, "persons.json")
             if os.path.exists(persons_file):
-                with open(persons_file, 'r', encoding='utf-8') as f:
-                    self.persons_data = json.load(f)
+                self.persons_data = codec.load_file(persons_file)
         except Exception as e:
             QMessageBox.warning(self, "Data Warning", f"Failed to load persons data: {str(e)}")
             self.persons_data = {}
+        
+        # Rebuild the search index used by the person completer
+        self.person_index.build(self.persons_data)
+        
+        # Open the generated forms catalog and index any forms it doesn't know yet
+        self.load_forms_archive()
+    
+    def load_forms_archive(self):
+        """Open the generated forms catalog for the current directory"""
+        try:
+            self.forms_archive = FormsArchive(self.generated_forms_dir)
+        except Exception as e:
+            QMessageBox.warning(self, "Data Warning", f"Failed to load generated forms index: {str(e)}")
+            self.forms_archive = None
+            return
+        
+        # The folders may be on a slow network share, scan them once the screen is up
+        QTimer.singleShot(0, self.scan_forms_archive)
+    
+    @timed("form.archive.scan")
+    def scan_forms_archive(self):
+        """Index the forms the catalog doesn't know yet and refresh the history panel"""
+        archive = self.forms_archive
+        if not archive:
+            return
+        try:
+            added = archive.scan(self.persons_data)
+        except Exception as e:
+            QMessageBox.warning(self, "Data Warning", f"Failed to load generated forms index: {str(e)}")
+            return
+        # The directory may have changed while the scan was waiting
+        if added and archive is self.forms_archive and hasattr(self, "history_list"):
+            self.update_history_panel()
     
     def create_widgets(self):
         """Create all UI elements for the form screen"""
@@ -138,6 +184,9 @@ class FormScreen(QMainWindow):
         # 5- then two buttons: generate sign in form and next to it the generate departure form
         self.create_action_buttons(form_layout)
         
+        # History of the forms generated for the selected person
+        self.create_history_panel(form_layout)
+        
         scroll_area.setWidget(form_widget)
         self.main_layout.addWidget(scroll_area)
         
@@ -231,14 +280,20 @@ class FormScreen(QMainWindow):
         self.person_combo.setInsertPolicy(QComboBox.NoInsert)  # Don't insert typed text as new item
         # Start with empty combobox
         self.person_combo.setPlaceholderText("Type to search or enter new person name...")
+        # Row of each person in the combobox, so selections don't scan the items
+        self.person_rows = {}
         # Load existing persons if directory is selected
         if self.generated_forms_dir and self.persons_data:
-            for person_id, person_info in self.persons_data.items():
-                display_text = f"{person_info['name']} ({person_info['email']})"
-                self.person_combo.addItem(display_text, person_id)
+            self.populate_person_combo()
+        
+        # Search-as-you-type completer backed by the person search index
+        self.person_combo.setCompleter(None)
+        self.person_completer = PersonCompleter(self.person_index, self)
+        self.person_completer.setWidget(self.person_combo.lineEdit())
+        self.person_completer.activated[QModelIndex].connect(self.on_person_completion_activated)
         
         self.person_combo.currentIndexChanged.connect(self.on_person_changed)
-        self.person_combo.editTextChanged.connect(self.on_person_text_changed)
+        self.person_combo.lineEdit().textEdited.connect(self.on_person_text_changed)
         # Install event filter for key press events
         self.person_combo.installEventFilter(self)
         person_layout.addWidget(self.person_combo)
@@ -432,6 +487,95 @@ class FormScreen(QMainWindow):
         button_layout.addStretch()
         layout.addLayout(button_layout)
     
+    def create_history_panel(self, layout):
+        """Create the generated forms history panel"""
+        history_group = QGroupBox("Form History")
+        history_group.setStyleSheet("""
+            QGroupBox {
+                font-weight: bold;
+                border: 2px solid #3498db;
+                border-radius: 5px;
+                margin-top: 10px;
+                padding-top: 10px;
+            }
+            QGroupBox::title {
+                subcontrol-origin: margin;
+                left: 10px;
+                padding: 0 5px 0 5px;
+                color: #2c3e50;
+            }
+        """)
+        history_layout = QVBoxLayout(history_group)
+        history_layout.setSpacing(10)
+        
+        # List of generated documents, double click opens the PDF
+        self.history_list = QListWidget()
+        self.history_list.setMinimumHeight(120)
+        self.history_list.itemDoubleClicked.connect(self.open_history_item)
+        history_layout.addWidget(self.history_list)
+        
+        # Rescan button to pick up forms added outside the application
+        rescan_layout = QHBoxLayout()
+        rescan_layout.addStretch()
+        self.rescan_button = QPushButton("Rescan Forms Folder")
+        self.rescan_button.setStyleSheet("""
+            QPushButton {
+                background-color: #3498db;
+                color: white;
+                border: none;
+                padding: 8px 15px;
+                border-radius: 4px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #2980b9;
+            }
+        """)
+        self.rescan_button.clicked.connect(self.rescan_forms)
+        rescan_layout.addWidget(self.rescan_button)
+        history_layout.addLayout(rescan_layout)
+        
+        layout.addWidget(history_group)
+    
+    def update_history_panel(self):
+        """Show the generated forms of the selected person"""
+        self.history_list.clear()
+        if not self.forms_archive:
+            return
+        
+        person_id = self.person_combo.currentData()
+        person_name = self.name_input.text().strip()
+        if not person_id and not person_name:
+            return
+        
+        type_labels = {"sign_in": "Sign In Form", "departure": "Departure Form"}
+        for record in self.forms_archive.history(person_id, person_name):
+            generated_at = record.get("generated_at", "").replace("T", " ")
+            label = f"{generated_at}  -  {type_labels.get(record['form_type'], record['form_type'])}"
+            if record.get("form_date"):
+                label += f"  ({record['form_date']})"
+            item = QListWidgetItem(label)
+            item.setData(Qt.UserRole, self.forms_archive.absolute_path(record))
+            item.setToolTip(self.forms_archive.absolute_path(record))
+            self.history_list.addItem(item)
+    
+    def open_history_item(self, item):
+        """Open a generated form from the history panel"""
+        path = item.data(Qt.UserRole)
+        if path and os.path.exists(path):
+            QDesktopServices.openUrl(QUrl.fromLocalFile(path))
+        else:
+            QMessageBox.warning(self, "File Not Found", f"The file no longer exists:\n{path}")
+    
+    def rescan_forms(self):
+        """Index forms found in the generated forms directory"""
+        if not self.forms_archive:
+            QMessageBox.warning(self, "Directory Required", "Please select a directory for generated forms first")
+            return
+        added = self.forms_archive.scan(self.persons_data)
+        self.update_history_panel()
+        QMessageBox.information(self, "Rescan Complete", f"{added} new form(s) added to the history")
+    
     def create_navigation_bar(self):
         """Create the navigation bar at the bottom of the screen"""
         nav_bar = NavigationBar(self, "form")
@@ -456,6 +600,7 @@ class FormScreen(QMainWindow):
                 
                 # Update person combobox
                 self.update_person_combo()
+                self.update_history_panel()
                 
                 QMessageBox.information(self, "Success", f"Directory set to: {self.generated_forms_dir}")
             except Exception as e:
@@ -469,21 +614,36 @@ class FormScreen(QMainWindow):
         self.person_combo.setEditable(True)
         self.person_combo.setInsertPolicy(QComboBox.NoInsert)
         self.person_combo.setPlaceholderText("Type to search or enter new person name...")
+        self.person_combo.setCompleter(None)
+        self.person_rows = {}
         
         if self.persons_data:
-            for person_id, person_info in self.persons_data.items():
-                display_text = f"{person_info['name']} ({person_info['email']})"
-                self.person_combo.addItem(display_text, person_id)
+            self.populate_person_combo()
             
             # Restore previous selection if possible
-            for i in range(self.person_combo.count()):
-                if self.person_combo.itemData(i) == current_selection:
-                    self.person_combo.setCurrentIndex(i)
-                    break
+            if current_selection in self.person_rows:
+                self.person_combo.setCurrentIndex(self.person_rows[current_selection])
             else:
                 # If no matching data found, restore the text
                 self.person_combo.setEditText(current_text)
     
+    def populate_person_combo(self):
+        """Add every registered person to the person combobox"""
+        for person_id, person_info in self.persons_data.items():
+            self.person_rows[person_id] = self.person_combo.count()
+            self.person_combo.addItem(person_display_text(person_info), person_id)
+    
+    def select_person(self, person_id):
+        """Select a person in the combobox and fill the form with their data"""
+        row = self.person_rows.get(person_id)
+        if row is None:
+            return False
+        self.person_combo.blockSignals(True)
+        self.person_combo.setCurrentIndex(row)
+        self.person_combo.blockSignals(False)
+        self.on_person_changed(row)
+        return True
+    
     def on_person_changed(self, index):
         """Handle person selection change"""
         person_id = self.person_combo.itemData(index)
@@ -498,23 +658,24 @@ class FormScreen(QMainWindow):
             self.position_combo.setCurrentIndex(0)
             # For existing users, default to modification date
             self.modification_radio.setChecked(True)
+            self.update_history_panel()
     
     def on_person_text_changed(self, text):
-        """Handle text change in person combobox for searching/filtering"""
+        """Handle text typed in the person combobox by refreshing the suggestions"""
         if not text.strip():
-            # If text is empty, just return - don't reset anything
+            # If text is empty, just hide the suggestions - don't reset anything
+            self.person_completer.popup().hide()
             return
         
-        # Search for matching person
-        text_lower = text.lower()
-        for i in range(self.person_combo.count()):
-            item_text = self.person_combo.itemText(i)
-            if text_lower in item_text.lower():
-                # Found a match, but don't automatically select to allow user to continue typing
-                return
-        
-        # If no exact match found, user might be typing a new person name
-        # We don't automatically clear the form to allow continuous typing
+        # Suggestions are only shown, never auto-selected, so the user can keep
+        # typing a new person name
+        self.person_completer.update_query(text)
+    
+    def on_person_completion_activated(self, index):
+        """Handle a suggestion picked from the person completer popup"""
+        person_id = index.data(Qt.UserRole)
+        if person_id:
+            self.select_person(person_id)
     
     def eventFilter(self, obj, event):
         """Event filter to handle key press events in the person combobox"""
@@ -523,27 +684,15 @@ class FormScreen(QMainWindow):
                 # Get current text
                 current_text = self.person_combo.currentText().strip()
                 
-                # Check if the text matches an existing person
-                for i in range(self.person_combo.count()):
-                    item_text = self.person_combo.itemText(i)
-                    if current_text.lower() == item_text.lower():
-                        # Exact match found, select this person
-                        self.person_combo.blockSignals(True)
-                        self.person_combo.setCurrentIndex(i)
-                        self.person_combo.blockSignals(False)
-                        self.on_person_changed(i)
-                        return True
+                # Exact match first, otherwise the best partial match from the index
+                person_id = self.person_index.find_exact(current_text)
+                if person_id is None:
+                    matches = self.person_index.search(current_text, limit=1)
+                    person_id = matches[0] if matches else None
                 
-                # No exact match, check if it's a partial match
-                for i in range(self.person_combo.count()):
-                    item_text = self.person_combo.itemText(i)
-                    if current_text.lower() in item_text.lower():
-                        # Partial match found, select this person
-                        self.person_combo.blockSignals(True)
-                        self.person_combo.setCurrentIndex(i)
-                        self.person_combo.blockSignals(False)
-                        self.on_person_changed(i)
-                        return True
+                if person_id is not None:
+                    self.person_completer.popup().hide()
+                    self.select_person(person_id)
                 
                 # No match found, just accept the text as is
                 return True
@@ -559,7 +708,7 @@ class FormScreen(QMainWindow):
         self.position_combo.setCurrentIndex(0)
     
     def save_person_data(self, name, email):
-        """Save person data to the JSON tracking file"""
+        """Save person data to the tracking file in the configured format"""
         if not self.generated_forms_dir:
             return None
         
@@ -572,12 +721,12 @@ class FormScreen(QMainWindow):
             'email': email,
             'created_date': datetime.datetime.now().isoformat()
         }
+        self.person_index.add(person_id, self.persons_data[person_id])
         
         # Save to file
         try:
             persons_file = os.path.join(self.generated_forms_dir, "persons.json")
-            with open(persons_file, 'w', encoding='utf-8') as f:
-                json.dump(self.persons_data, f, indent=2)
+            codec.save_file(persons_file, self.persons_data, db_config.data_format)
             return person_id
         except Exception as e:
             QMessageBox.warning(self, "Warning", f"Failed to save person data: {str(e)}")
@@ -598,10 +747,8 @@ class FormScreen(QMainWindow):
             self.position_combo.setEnabled(False)
     
     def get_position_access(self, dept_id, pos_id):
-        """Get the access permissions for a specific position"""
-        access_permissions = self.db_data.get("access_permissions", {})
-        dept_access = access_permissions.get(dept_id, {})
-        return dept_access.get(pos_id, {})
+        """Get the access permissions for a specific position, including its role template's"""
+        return self.permission_resolver.effective_permissions(dept_id, pos_id)
     
     def generate_signin_form(self):
         """Generate the sign in form PDF"""
@@ -649,16 +796,15 @@ class FormScreen(QMainWindow):
                 # Update the person combobox
                 self.update_person_combo()
                 # Select the newly added person
-                for i in range(self.person_combo.count()):
-                    if self.person_combo.itemData(i) == person_id:
-                        self.person_combo.setCurrentIndex(i)
-                        break
+                if person_id in self.person_rows:
+                    self.person_combo.setCurrentIndex(self.person_rows[person_id])
         
         # Generate the PDF
         try:
             output_path = self.create_signin_pdf(name, onq_user, email, dept_data["name"], pos_data["name"],
                                                selected_date, access_permissions, person_id)
             if output_path:
+                self.update_history_panel()
                 QMessageBox.information(self, "Success", f"Sign in form generated successfully for {name}\nSaved to: {output_path}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to generate sign in form: {str(e)}")
@@ -706,10 +852,8 @@ class FormScreen(QMainWindow):
                 # Update the person combobox
                 self.update_person_combo()
                 # Select the newly added person
-                for i in range(self.person_combo.count()):
-                    if self.person_combo.itemData(i) == person_id:
-                        self.person_combo.setCurrentIndex(i)
-                        break
+                if person_id in self.person_rows:
+                    self.person_combo.setCurrentIndex(self.person_rows[person_id])
         
         # Get position access permissions
         access_permissions = self.get_position_access(dept_data["id"], pos_data["id"])
@@ -722,6 +866,7 @@ class FormScreen(QMainWindow):
             output_path = self.create_departure_pdf(name, onq_user, email, dept_data["name"], pos_data["name"],
                                                   selected_date, person_id, access_permissions, system_categories)
             if output_path:
+                self.update_history_panel()
                 QMessageBox.information(self, "Success", f"Departure form generated successfully for {name}\nSaved to: {output_path}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to generate departure form: {str(e)}")
@@ -731,6 +876,16 @@ class FormScreen(QMainWindow):
         # Get system categories from database
         system_categories = self.db_data.get("system_categories", [])
         
+        # Reuse an identical form generated earlier instead of rendering it again
+        fields = {"name": name, "onq_user": onq_user, "email": email,
+                  "department": department, "position": position, "date": date}
+        content_hash = form_content_hash("sign_in", SIGNIN_TEMPLATE_VERSION, fields,
+                                         access_permissions, system_categories)
+        existing_path = self.find_existing_form(content_hash)
+        if existing_path:
+            metrics.increment("forms.reused")
+            return existing_path
+        
         # Create the custom PDF
         pdf = create_custom_pdf(name, onq_user, email, department, position, date,
                              access_permissions, system_categories)
@@ -747,12 +902,24 @@ class FormScreen(QMainWindow):
             output_path = os.path.join(person_folder_path, output_filename)
             
             # Save the PDF
-            pdf.output(output_path)
+            with timed("pdf.signin.output"):
+                pdf.output(output_path)
+            self.record_generated_form("sign_in", output_path, person_id, name, date, access_permissions, content_hash)
             return output_path
         return None
     
     def create_departure_pdf(self, name, onq_user, email, department, position, date, person_id, access_permissions, system_categories):
         """Create the departure form PDF using the departure template"""
+        # Reuse an identical form generated earlier instead of rendering it again
+        fields = {"name": name, "onq_user": onq_user, "email": email,
+                  "department": department, "position": position, "date": date}
+        content_hash = form_content_hash("departure", DEPARTURE_TEMPLATE_VERSION, fields,
+                                         access_permissions, system_categories)
+        existing_path = self.find_existing_form(content_hash)
+        if existing_path:
+            metrics.increment("forms.reused")
+            return existing_path
+        
         # Create the custom departure PDF
         pdf = SeparationChecklistPDF(orientation='P', unit='mm', format='A4')
         
@@ -771,10 +938,24 @@ class FormScreen(QMainWindow):
             pdf.generate_checklist(name, onq_user, department, position, date, access_permissions, system_categories)
             
             # Save the PDF
-            pdf.output(output_path)
+            with timed("pdf.departure.output"):
+                pdf.output(output_path)
+            self.record_generated_form("departure", output_path, person_id, name, date, access_permissions, content_hash)
             return output_path
         return None
     
+    def find_existing_form(self, content_hash):
+        """Return the path of a previously generated identical form, if it still exists"""
+        if self.forms_archive:
+            return self.forms_archive.find_by_content_hash(content_hash)
+        return None
+    
+    def record_generated_form(self, form_type, output_path, person_id, name, date, access_permissions, content_hash=None):
+        """Add a generated document to the forms catalog"""
+        if self.forms_archive:
+            self.forms_archive.record(form_type, output_path, person_id=person_id, person_name=name,
+                                      form_date=date, access_permissions=access_permissions,
+                                      content_hash=content_hash)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
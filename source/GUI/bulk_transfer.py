@@ -0,0 +1,80 @@
+import sys
+import os
+from PyQt5.QtWidgets import QApplication, QFileDialog, QMessageBox
+from PyQt5.QtCore import Qt
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import bulk
+from instrumentation import get_logger, timed
+
+logger = get_logger("gui")
+
+FILE_FILTER = "CSV files (*.csv);;JSON lines files (*.jsonl)"
+
+# Errors listed in the message box when an import is rejected
+ERRORS_SHOWN = 15
+
+
+@timed("bulk.import")
+def import_catalog(parent, catalog, save):
+    """Ask for a CSV/JSONL file and import it into the catalog, saving once.
+
+    save() writes the imported catalog and returns True when it worked; a
+    failed save is expected to keep the import pending. Returns True if
+    anything was imported and saved.
+    """
+    path, _ = QFileDialog.getOpenFileName(parent, "Import Departments, Systems and Permissions", "",
+                                          FILE_FILTER + ";;All files (*)")
+    if not path:
+        return False
+
+    QApplication.setOverrideCursor(Qt.WaitCursor)
+    try:
+        plan = bulk.plan_import(catalog, bulk.read_rows(path))
+        if plan.ok and plan.operations:
+            bulk.apply_import(catalog, plan)
+            saved = save()
+        else:
+            saved = None
+    except Exception as e:
+        QApplication.restoreOverrideCursor()
+        logger.error(f"Error importing {path}: {str(e)}")
+        QMessageBox.critical(parent, "Error", f"Failed to import file: {str(e)}")
+        return False
+    QApplication.restoreOverrideCursor()
+
+    if not plan.ok:
+        shown = "\n".join(plan.errors[:ERRORS_SHOWN])
+        more = f"\n... and {len(plan.errors) - ERRORS_SHOWN} more" if len(plan.errors) > ERRORS_SHOWN else ""
+        QMessageBox.warning(parent, "Import Failed", f"Nothing was imported, please fix these rows:\n\n{shown}{more}")
+        return False
+    if saved is None:
+        QMessageBox.information(parent, "Import", plan.summary())
+        return False
+    if not saved:
+        QMessageBox.critical(parent, "Error", "Failed to save the import to database. It is kept and saved again "
+                                              "when you click Save or leave the screen.")
+        return False
+    QMessageBox.information(parent, "Import Successful", plan.summary())
+    return True
+
+
+@timed("bulk.export")
+def export_catalog(parent, catalog):
+    """Ask for a file name and export the catalog and permissions to it"""
+    path, selected_filter = QFileDialog.getSaveFileName(parent, "Export Departments, Systems and Permissions",
+                                                        "catalog.csv", FILE_FILTER)
+    if not path:
+        return False
+    if not os.path.splitext(path)[1]:
+        path += ".jsonl" if "jsonl" in selected_filter else ".csv"
+
+    try:
+        count = bulk.export_file(catalog, path)
+    except Exception as e:
+        logger.error(f"Error exporting {path}: {str(e)}")
+        QMessageBox.critical(parent, "Error", f"Failed to export file: {str(e)}")
+        return False
+    QMessageBox.information(parent, "Export Successful", f"Exported {count} rows to {path}")
+    return True
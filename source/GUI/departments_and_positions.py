@@ -5,7 +5,8 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                             QHBoxLayout, QLabel, QPushButton, QMessageBox,
                             QTreeWidget, QTreeWidgetItem, QScrollArea, QGroupBox,
                             QCheckBox, QSplitter, QFrame, QTableWidget, QTableWidgetItem,
-                            QInputDialog, QComboBox, QDialog, QLineEdit, QTreeWidgetItemIterator)
+                            QInputDialog, QComboBox, QDialog, QLineEdit, QTreeWidgetItemIterator,
+                            QStackedWidget)
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QFont, QIcon
 
@@ -15,8 +16,13 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Import navigation bar and database manager
 from GUI.navigation_bar import NavigationBar
 from database.db_manager import db_manager
+from GUI import bulk_transfer
+from GUI.edit_history import EditHistory, AddEntryCommand, RenameEntryCommand, RemoveEntryCommand
+from database.catalog import Catalog, DEPARTMENT, POSITION, INSERTED, REMOVED, RENAMED
+from instrumentation import timed
 
 class DepartmentsAndPositionsScreen(QMainWindow):
+    @timed("screen.departments.construct")
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Waldorf Access Form Generator - Departments and Positions")
@@ -77,8 +83,17 @@ class DepartmentsAndPositionsScreen(QMainWindow):
             }
         """)
         
-        # Load data from database
-        self.load_database()
+        # Load data from database; views follow catalog changes instead of rebuilding their trees
+        self.catalog = Catalog(self.load_database())
+        self.catalog.subscribe(self.on_catalog_changed)
+        
+        # Edits are undoable and saved together, see edit_history.py
+        self.history = EditHistory(self, self.save_database)
+        
+        # Tree items by id; position trees are built per department on first view
+        self.department_items = {}
+        self.position_trees = {}
+        self.position_items = {}
         
         # Create central widget and layout
         self.central_widget = QWidget()
@@ -100,13 +115,16 @@ class DepartmentsAndPositionsScreen(QMainWindow):
     def load_database(self):
         """Load data from the database using the database manager"""
         try:
-            self.db_data = db_manager.load_database()
+            return db_manager.load_database()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load database: {str(e)}")
-            self.db_data = {"departments": [], "system_categories": [], "access_permissions": {}}
+            return {"departments": [], "system_categories": [], "access_permissions": {}}
     
     def create_widgets(self):
         """Create all UI elements for the departments and positions screen"""
+        # Undo, Redo and Save
+        self.main_layout.addWidget(self.history.create_toolbar())
+        
         # Create splitter for resizable panels
         splitter = QSplitter(Qt.Horizontal)
         
@@ -147,13 +165,8 @@ class DepartmentsAndPositionsScreen(QMainWindow):
         self.dept_tree_widget.itemClicked.connect(self.on_department_clicked)
         
         # Populate tree with departments
-        for dept in self.db_data.get("departments", []):
-            dept_item = QTreeWidgetItem(self.dept_tree_widget)
-            dept_item.setText(0, dept["name"])
-            dept_item.setData(0, Qt.UserRole, {"id": dept["id"], "name": dept["name"]})
-            
-            # Create buttons for this department
-            self.create_department_buttons(dept_item)
+        for dept in self.catalog.departments():
+            self.create_department_item(dept)
         
         left_layout.addWidget(self.dept_tree_widget)
         
@@ -162,6 +175,16 @@ class DepartmentsAndPositionsScreen(QMainWindow):
         add_dept_btn.clicked.connect(self.add_department)
         left_layout.addWidget(add_dept_btn)
         
+        # Bulk import and export of the whole catalog and its permissions
+        bulk_layout = QHBoxLayout()
+        import_btn = QPushButton("Import...")
+        import_btn.clicked.connect(self.import_catalog)
+        bulk_layout.addWidget(import_btn)
+        export_btn = QPushButton("Export...")
+        export_btn.clicked.connect(self.export_catalog)
+        bulk_layout.addWidget(export_btn)
+        left_layout.addLayout(bulk_layout)
+        
         return left_widget
     
     def create_right_panel(self):
@@ -176,17 +199,11 @@ class DepartmentsAndPositionsScreen(QMainWindow):
         right_title.setStyleSheet("color: #2c3e50; padding: 5px;")
         right_layout.addWidget(right_title)
         
-        # Tree widget for positions
-        self.pos_tree_widget = QTreeWidget()
-        self.pos_tree_widget.setHeaderLabels(["Position", "Actions"])
-        self.pos_tree_widget.setColumnCount(2)
-        self.pos_tree_widget.setColumnWidth(0, 300)  # Set width for position name column
-        self.pos_tree_widget.setColumnWidth(1, 150)  # Set width for actions column
-        self.pos_tree_widget.setEditTriggers(QTreeWidget.DoubleClicked | QTreeWidget.EditKeyPressed)
-        
-        # Connect signals for editing
-        self.pos_tree_widget.itemChanged.connect(self.on_position_changed)
-        self.pos_tree_widget.itemClicked.connect(self.store_original_position_value)
+        # One positions tree per viewed department, the empty tree is shown until one is selected
+        self.pos_stack = QStackedWidget()
+        self.empty_pos_tree_widget = self.create_position_tree()
+        self.pos_stack.addWidget(self.empty_pos_tree_widget)
+        self.pos_tree_widget = self.empty_pos_tree_widget
         
         # Flag to prevent showing message during initialization
         self.is_initialized = False
@@ -194,7 +211,7 @@ class DepartmentsAndPositionsScreen(QMainWindow):
         # Store original values before editing
         self.original_position_values = {}
         
-        right_layout.addWidget(self.pos_tree_widget)
+        right_layout.addWidget(self.pos_stack)
         
         # Add position button
         add_pos_btn = QPushButton("Add Position")
@@ -206,11 +223,55 @@ class DepartmentsAndPositionsScreen(QMainWindow):
         
         return right_widget
     
+    def create_position_tree(self):
+        """Create an empty tree widget for the positions of one department"""
+        pos_tree = QTreeWidget()
+        pos_tree.setHeaderLabels(["Position", "Actions"])
+        pos_tree.setColumnCount(2)
+        pos_tree.setColumnWidth(0, 300)  # Set width for position name column
+        pos_tree.setColumnWidth(1, 150)  # Set width for actions column
+        pos_tree.setEditTriggers(QTreeWidget.DoubleClicked | QTreeWidget.EditKeyPressed)
+        
+        # Connect signals for editing
+        pos_tree.itemChanged.connect(self.on_position_changed)
+        pos_tree.itemClicked.connect(self.store_original_position_value)
+        return pos_tree
+    
     def create_navigation_bar(self):
         """Create the navigation bar at the bottom of the screen"""
         nav_bar = NavigationBar(self, "departments")
         self.main_layout.addWidget(nav_bar)
     
+    def create_department_item(self, dept, index=None):
+        """Add a department row to the departments tree, the item only keeps the department id"""
+        dept_item = QTreeWidgetItem()
+        dept_item.setText(0, dept.name)
+        dept_item.setData(0, Qt.UserRole, (dept.id,))
+        if index is None:
+            self.dept_tree_widget.addTopLevelItem(dept_item)
+        else:
+            self.dept_tree_widget.insertTopLevelItem(index, dept_item)
+        self.department_items[dept.id] = dept_item
+        
+        # Create buttons for this department
+        self.create_department_buttons(dept_item)
+        return dept_item
+    
+    def create_position_item(self, pos_tree, dept_id, position, index=None):
+        """Add a position row to a department's positions tree, the item only keeps the ids"""
+        pos_item = QTreeWidgetItem()
+        pos_item.setText(0, position.name)
+        pos_item.setData(0, Qt.UserRole, (dept_id, position.id))
+        if index is None:
+            pos_tree.addTopLevelItem(pos_item)
+        else:
+            pos_tree.insertTopLevelItem(index, pos_item)
+        self.position_items[dept_id][position.id] = pos_item
+        
+        # Create buttons for this position
+        self.create_position_buttons(pos_item)
+        return pos_item
+    
     
     def create_department_buttons(self, dept_item):
         """Create Edit and Delete buttons for a department item"""
@@ -254,9 +315,6 @@ class DepartmentsAndPositionsScreen(QMainWindow):
             }
         """)
         
-        # Get department data
-        dept_data = dept_item.data(0, Qt.UserRole)
-        
         # Connect button signals
         edit_btn.clicked.connect(lambda checked, item=dept_item: self.edit_department(item))
         delete_btn.clicked.connect(lambda checked, item=dept_item: self.delete_department(item))
@@ -310,9 +368,6 @@ class DepartmentsAndPositionsScreen(QMainWindow):
             }
         """)
         
-        # Get position data
-        pos_data = pos_item.data(0, Qt.UserRole)
-        
         # Connect button signals
         edit_btn.clicked.connect(lambda checked, item=pos_item: self.edit_position(item))
         delete_btn.clicked.connect(lambda checked, item=pos_item: self.delete_position(item))
@@ -322,86 +377,138 @@ class DepartmentsAndPositionsScreen(QMainWindow):
         button_layout.addWidget(delete_btn)
         
         # Set the widget as the item widget for column 1
-        self.pos_tree_widget.setItemWidget(pos_item, 1, button_widget)
+        pos_item.treeWidget().setItemWidget(pos_item, 1, button_widget)
+    
+    def department_of_item(self, item):
+        """Department of a departments tree item, or None if it no longer exists"""
+        data = item.data(0, Qt.UserRole) if item else None
+        if not data:
+            return None
+        return self.catalog.get_department(data[0])
+    
+    def position_of_item(self, item):
+        """(department, position) of a positions tree item, or (None, None)"""
+        data = item.data(0, Qt.UserRole) if item else None
+        if not data:
+            return None, None
+        dept_id, pos_id = data
+        return self.catalog.get_department(dept_id), self.catalog.get_position(dept_id, pos_id)
     
     def on_department_clicked(self, item, column):
         """Handle department click event for selection"""
-        data = item.data(0, Qt.UserRole)
-        if not data:
+        dept = self.department_of_item(item)
+        if dept is None:
             return
-            
-        # Clear positions tree
-        self.pos_tree_widget.clear()
-        
-        # Get department info
-        dept_id = data["id"]
-        dept_name = data["name"]
-        
-        # Find the department in the database
-        for dept in self.db_data.get("departments", []):
-            if dept.get("id") == dept_id:
-                # Add positions to the right panel
-                for position in dept.get("positions", []):
-                    pos_item = QTreeWidgetItem(self.pos_tree_widget)
-                    pos_item.setText(0, position["name"])
-                    pos_item.setData(0, Qt.UserRole, {
-                        "id": position["id"],
-                        "name": position["name"],
-                        "dept_id": dept_id,
-                        "dept_name": dept_name
-                    })
-                    
-                    # Create buttons for this position
-                    self.create_position_buttons(pos_item)
-                break
+        
+        self.show_department_positions(dept.id)
+    
+    def show_department_positions(self, dept_id):
+        """Show the positions of a department, building its tree on first view"""
+        pos_tree = self.position_trees.get(dept_id)
+        if pos_tree is None:
+            dept = self.catalog.get_department(dept_id)
+            if dept is None:
+                return
+            pos_tree = self.create_position_tree()
+            self.position_trees[dept_id] = pos_tree
+            self.position_items[dept_id] = {}
+            for position in dept.positions:
+                self.create_position_item(pos_tree, dept_id, position)
+            self.pos_stack.addWidget(pos_tree)
+        
+        self.pos_stack.setCurrentWidget(pos_tree)
+        self.pos_tree_widget = pos_tree
+    
+    def on_catalog_changed(self, event):
+        """Apply a single catalog change to the trees"""
+        if event.kind == DEPARTMENT:
+            if event.action == INSERTED:
+                self.create_department_item(self.catalog.get_department(event.item_id), event.index)
+            elif event.action == RENAMED:
+                dept_item = self.department_items.get(event.item_id)
+                if dept_item:
+                    dept_item.setText(0, event.name)
+            elif event.action == REMOVED:
+                dept_item = self.department_items.pop(event.item_id, None)
+                if dept_item:
+                    self.dept_tree_widget.invisibleRootItem().removeChild(dept_item)
+                self.position_items.pop(event.item_id, None)
+                pos_tree = self.position_trees.pop(event.item_id, None)
+                if pos_tree is not None:
+                    if pos_tree is self.pos_tree_widget:
+                        self.pos_stack.setCurrentWidget(self.empty_pos_tree_widget)
+                        self.pos_tree_widget = self.empty_pos_tree_widget
+                    self.pos_stack.removeWidget(pos_tree)
+                    pos_tree.deleteLater()
+        
+        elif event.kind == POSITION:
+            pos_tree = self.position_trees.get(event.parent_id)
+            if pos_tree is None:
+                # Not viewed yet, the tree is built from the catalog when it is
+                return
+            items = self.position_items[event.parent_id]
+            if event.action == INSERTED:
+                position = self.catalog.get_position(event.parent_id, event.item_id)
+                self.create_position_item(pos_tree, event.parent_id, position, event.index)
+            elif event.action == RENAMED:
+                pos_item = items.get(event.item_id)
+                if pos_item:
+                    pos_item.setText(0, event.name)
+            elif event.action == REMOVED:
+                pos_item = items.pop(event.item_id, None)
+                if pos_item:
+                    pos_tree.invisibleRootItem().removeChild(pos_item)
     
     def on_position_changed(self, item, column):
         """Handle position name change"""
         # Only process if the tree is fully initialized
         if hasattr(self, 'is_initialized') and self.is_initialized:
             new_value = item.text(0)
-            data = item.data(0, Qt.UserRole)
+            dept, position = self.position_of_item(item)
             
-            if data:
-                original_name = data["name"]
-                dept_id = data["dept_id"]
-                pos_id = data["id"]
+            if position:
+                original_name = position.name
+                dept_id = dept.id
+                pos_id = position.id
                 
                 if new_value != original_name:
-                    # Update the database
-                    if self.update_position_in_database(dept_id, pos_id, new_value):
-                        # Update the stored data
-                        data["name"] = new_value
-                        item.setData(0, Qt.UserRole, data)
-                        QMessageBox.information(self, "Success", "Position name updated successfully")
-                    else:
+                    # Update the database, the item follows through the catalog change
+                    if not self.update_position_in_database(dept_id, pos_id, new_value):
                         # Revert the change if update failed
                         item.setText(0, original_name)
                         QMessageBox.warning(self, "Error", "Failed to update position name")
     
     def update_position_in_database(self, dept_id, pos_id, new_name):
-        """Update position name in the database"""
-        try:
-            # Find the department in the database
-            for dept in self.db_data.get("departments", []):
-                if dept.get("id") == dept_id:
-                    # Find the position within the department
-                    for position in dept.get("positions", []):
-                        if position.get("id") == pos_id:
-                            # Update the position name
-                            position["name"] = new_name
-                            # Save the updated database
-                            return self.save_database()
-                    break
-            return False
-        except Exception as e:
-            print(f"Error updating position in database: {str(e)}")
+        """Rename a position, saved with the other pending changes"""
+        position = self.catalog.get_position(dept_id, pos_id)
+        if position is None:
             return False
+        self.history.push(RenameEntryCommand(self.catalog, POSITION, pos_id, position.name, new_name, dept_id))
+        return True
+    
+    def import_catalog(self):
+        """Import departments, systems and permissions from a CSV or JSONL file"""
+        # The import saves the whole catalog at once and cannot be undone
+        if not self.history.flush():
+            QMessageBox.critical(self, "Error", "Failed to save changes to database")
+            return
+        bulk_transfer.import_catalog(self, self.catalog, self.history.save_unrecorded)
+    
+    def export_catalog(self):
+        """Export departments, systems and permissions to a CSV or JSONL file"""
+        bulk_transfer.export_catalog(self, self.catalog)
+    
+    def closeEvent(self, event):
+        """Save pending changes before the screen closes"""
+        if self.history.save_before_leaving():
+            event.accept()
+        else:
+            event.ignore()
     
     def save_database(self):
         """Save the current database using the database manager"""
         try:
-            return db_manager.save_database(self.db_data)
+            return db_manager.save_database(self.catalog.to_dict())
         except Exception as e:
             print(f"Error saving database: {str(e)}")
             return False
@@ -410,9 +517,9 @@ class DepartmentsAndPositionsScreen(QMainWindow):
     def store_original_position_value(self, item, column):
         """Store the original position value before editing begins"""
         if hasattr(self, 'is_initialized') and self.is_initialized:
-            data = item.data(0, Qt.UserRole)
-            if data:
-                self.original_position_values[data["id"]] = data["name"]
+            dept, position = self.position_of_item(item)
+            if position:
+                self.original_position_values[position.id] = position.name
     
     def add_department(self):
         """Add a new department to the database"""
@@ -421,36 +528,15 @@ class DepartmentsAndPositionsScreen(QMainWindow):
         
         if ok and dept_name.strip():
             # Generate a unique ID for the department
-            dept_id = dept_name.lower().replace(" ", "_").replace("á", "a").replace("é", "e").replace("í", "i").replace("ó", "o").replace("ú", "u").replace("ñ", "n")
+            dept_id = self.catalog.allocate_id(DEPARTMENT)
             
             # Check if department already exists
-            for dept in self.db_data.get("departments", []):
-                if dept.get("name", "").lower() == dept_name.strip().lower():
-                    QMessageBox.warning(self, "Error", f"Department '{dept_name}' already exists!")
-                    return
-            
-            # Add new department to database
-            new_department = {
-                "id": dept_id,
-                "name": dept_name.strip(),
-                "positions": []
-            }
-            
-            self.db_data["departments"].append(new_department)
+            if self.catalog.department_name_taken(dept_name):
+                QMessageBox.warning(self, "Error", f"Department '{dept_name}' already exists!")
+                return
             
-            # Save the updated database
-            if self.save_database():
-                # Add the new department to the tree widget
-                dept_item = QTreeWidgetItem(self.dept_tree_widget)
-                dept_item.setText(0, dept_name.strip())
-                dept_item.setData(0, Qt.UserRole, {"id": dept_id, "name": dept_name.strip()})
-                
-                # Create buttons for the new department
-                self.create_department_buttons(dept_item)
-                
-                QMessageBox.information(self, "Success", f"Department '{dept_name}' added successfully!")
-            else:
-                QMessageBox.critical(self, "Error", "Failed to save changes to database")
+            # Add new department to database, the tree follows through the catalog change
+            self.history.push(AddEntryCommand(self.catalog, DEPARTMENT, dept_id, dept_name.strip()))
     
     def add_position(self):
         """Add a new position to a department"""
@@ -461,95 +547,59 @@ class DepartmentsAndPositionsScreen(QMainWindow):
             QMessageBox.warning(self, "Error", "Please select a department first.")
             return
         
-        dept_data = current_dept_item.data(0, Qt.UserRole)
-        if not dept_data:
+        dept = self.department_of_item(current_dept_item)
+        if dept is None:
             QMessageBox.warning(self, "Error", "Invalid department selected.")
             return
         
-        dept_id = dept_data["id"]
-        dept_name = dept_data["name"]
+        dept_id = dept.id
+        dept_name = dept.name
         
         # Get position name from user input
         pos_name, ok = QInputDialog.getText(self, "Add Position", f"Enter position name for department '{dept_name}':")
         
         if ok and pos_name.strip():
-            # Find the selected department in the database
-            for dept in self.db_data.get("departments", []):
-                if dept.get("id") == dept_id:
-                    # Check if position already exists in this department
-                    for pos in dept.get("positions", []):
-                        if pos.get("name", "").lower() == pos_name.strip().lower():
-                            QMessageBox.warning(self, "Error", f"Position '{pos_name}' already exists in department '{dept_name}'.")
-                            return
-                    
-                    # Generate a unique ID for the position
-                    pos_id = pos_name.lower().replace(" ", "_").replace("á", "a").replace("é", "e").replace("í", "i").replace("ó", "o").replace("ú", "u").replace("ñ", "n")
-                    
-                    # Add new position to the department
-                    new_position = {
-                        "id": pos_id,
-                        "name": pos_name.strip()
-                    }
-                    
-                    dept["positions"].append(new_position)
-                    
-                    # Save the updated database
-                    if self.save_database():
-                        # Refresh the positions tree if this department is currently selected
-                        if self.dept_tree_widget.currentItem() == current_dept_item:
-                            self.on_department_clicked(current_dept_item, 0)
-                        
-                        QMessageBox.information(self, "Success", f"Position '{pos_name}' added to department '{dept_name}' successfully!")
-                    else:
-                        QMessageBox.critical(self, "Error", "Failed to save changes to database")
-                    return
+            # Check if position already exists in this department
+            if self.catalog.position_name_taken(dept_id, pos_name):
+                QMessageBox.warning(self, "Error", f"Position '{pos_name}' already exists in department '{dept_name}'.")
+                return
+            
+            # Generate a unique ID for the position
+            pos_id = self.catalog.allocate_id(POSITION, dept_id)
+            
+            # Add new position to the department, its tree row is inserted through the catalog change
+            self.history.push(AddEntryCommand(self.catalog, POSITION, pos_id, pos_name.strip(), dept_id))
     
     def delete_department(self, item):
         """Delete a department after confirmation"""
-        data = item.data(0, Qt.UserRole)
-        if not data:
+        dept = self.department_of_item(item)
+        if dept is None:
             return
         
-        dept_id = data["id"]
-        dept_name = data["name"]
+        dept_id = dept.id
+        dept_name = dept.name
         
         # Show confirmation dialog
         reply = QMessageBox.question(
             self,
             "Confirm Deletion",
-            f"Are you sure you want to delete the department '{dept_name}'?\n\nThis will also delete all positions within this department.",
+            f"Are you sure you want to delete the department '{dept_name}'?\n\nThis will also delete all positions within this department and their access permissions.",
             QMessageBox.Yes | QMessageBox.No,
             QMessageBox.No
         )
         
         if reply == QMessageBox.Yes:
-            # Find and remove the department from the database
-            for i, dept in enumerate(self.db_data.get("departments", [])):
-                if dept.get("id") == dept_id:
-                    del self.db_data["departments"][i]
-                    break
-            
-            # Save the updated database
-            if self.save_database():
-                # Remove the item from the tree widget
-                root = self.dept_tree_widget.invisibleRootItem()
-                root.removeChild(item)
-                
-                # Clear positions tree since the department is gone
-                self.pos_tree_widget.clear()
-                
-                QMessageBox.information(self, "Success", f"Department '{dept_name}' deleted successfully!")
-            else:
-                QMessageBox.critical(self, "Error", "Failed to save changes to database")
+            # Remove the department with its permissions, its rows and positions tree go through the catalog change
+            self.history.push(RemoveEntryCommand(self.catalog, DEPARTMENT, dept_id, dept_name))
     
     def edit_department(self, item):
         """Edit a department name"""
-        data = item.data(0, Qt.UserRole)
-        if not data:
+        dept = self.department_of_item(item)
+        if dept is None:
             return
         
-        dept_id = data["id"]
-        old_name = data["name"]
+        dept_id = dept.id
+        old_name = dept.name
         
         # Get new department name from user input
         new_name, ok = QInputDialog.getText(
@@ -561,56 +611,23 @@ class DepartmentsAndPositionsScreen(QMainWindow):
         
         if ok and new_name.strip() and new_name.strip() != old_name:
             # Check if department name already exists
-            for dept in self.db_data.get("departments", []):
-                if dept.get("name", "").lower() == new_name.strip().lower() and dept.get("id") != dept_id:
-                    QMessageBox.warning(self, "Error", f"Department '{new_name}' already exists!")
-                    return
-            
-            # Update the department name in the database
-            for dept in self.db_data.get("departments", []):
-                if dept.get("id") == dept_id:
-                    dept["name"] = new_name.strip()
-                    break
+            if self.catalog.department_name_taken(new_name, exclude_id=dept_id):
+                QMessageBox.warning(self, "Error", f"Department '{new_name}' already exists!")
+                return
             
-            # Save the updated database
-            if self.save_database():
-                # Update the item in the tree widget
-                item.setText(0, new_name.strip())
-                data["name"] = new_name.strip()
-                item.setData(0, Qt.UserRole, data)
-                
-                # Update positions that reference this department
-                self.update_positions_dept_name(dept_id, new_name.strip())
-                
-                QMessageBox.information(self, "Success", f"Department name updated to '{new_name}' successfully!")
-            else:
-                QMessageBox.critical(self, "Error", "Failed to save changes to database")
-    
-    def update_positions_dept_name(self, dept_id, new_dept_name):
-        """Update the department name in all positions that reference it"""
-        for dept in self.db_data.get("departments", []):
-            if dept.get("id") == dept_id:
-                for position in dept.get("positions", []):
-                    # Update positions tree if this department is currently selected
-                    root = self.pos_tree_widget.invisibleRootItem()
-                    for i in range(root.childCount()):
-                        pos_item = root.child(i)
-                        pos_data = pos_item.data(0, Qt.UserRole)
-                        if pos_data and pos_data.get("dept_id") == dept_id:
-                            pos_data["dept_name"] = new_dept_name
-                            pos_item.setData(0, Qt.UserRole, pos_data)
-                break
+            # Update the department name in the database, the trees follow through the catalog change
+            self.history.push(RenameEntryCommand(self.catalog, DEPARTMENT, dept_id, old_name, new_name.strip()))
     
     def delete_position(self, item):
         """Delete a position after confirmation"""
-        data = item.data(0, Qt.UserRole)
-        if not data:
+        dept, position = self.position_of_item(item)
+        if position is None:
             return
         
-        dept_id = data["dept_id"]
-        dept_name = data["dept_name"]
-        pos_id = data["id"]
-        pos_name = data["name"]
+        dept_id = dept.id
+        dept_name = dept.name
+        pos_id = position.id
+        pos_name = position.name
         
         # Show confirmation dialog
         reply = QMessageBox.question(
@@ -622,36 +639,19 @@ class DepartmentsAndPositionsScreen(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            # Find the department and position in the database
-            for dept in self.db_data.get("departments", []):
-                if dept.get("id") == dept_id:
-                    # Find and remove the position
-                    for i, position in enumerate(dept.get("positions", [])):
-                        if position.get("id") == pos_id:
-                            del dept["positions"][i]
-                            break
-                    
-                    # Save the updated database
-                    if self.save_database():
-                        # Remove the item from the tree widget
-                        root = self.pos_tree_widget.invisibleRootItem()
-                        root.removeChild(item)
-                        
-                        QMessageBox.information(self, "Success", f"Position '{pos_name}' deleted successfully!")
-                    else:
-                        QMessageBox.critical(self, "Error", "Failed to save changes to database")
-                    return
+            # Remove the position with its permissions, its row goes through the catalog change
+            self.history.push(RemoveEntryCommand(self.catalog, POSITION, pos_id, pos_name, dept_id))
     
     def edit_position(self, item):
         """Edit a position name"""
-        data = item.data(0, Qt.UserRole)
-        if not data:
+        dept, position = self.position_of_item(item)
+        if position is None:
             return
         
-        dept_id = data["dept_id"]
-        dept_name = data["dept_name"]
-        pos_id = data["id"]
-        old_name = data["name"]
+        dept_id = dept.id
+        dept_name = dept.name
+        pos_id = position.id
+        old_name = position.name
         
         # Get new position name from user input
         new_name, ok = QInputDialog.getText(
@@ -663,24 +663,12 @@ class DepartmentsAndPositionsScreen(QMainWindow):
         
         if ok and new_name.strip() and new_name.strip() != old_name:
             # Check if position name already exists in this department
-            for dept in self.db_data.get("departments", []):
-                if dept.get("id") == dept_id:
-                    for position in dept.get("positions", []):
-                        if position.get("name", "").lower() == new_name.strip().lower() and position.get("id") != pos_id:
-                            QMessageBox.warning(self, "Error", f"Position '{new_name}' already exists in department '{dept_name}'.")
-                            return
-                    break
+            if self.catalog.position_name_taken(dept_id, new_name, exclude_id=pos_id):
+                QMessageBox.warning(self, "Error", f"Position '{new_name}' already exists in department '{dept_name}'.")
+                return
             
-            # Update the position name in the database
-            if self.update_position_in_database(dept_id, pos_id, new_name.strip()):
-                # Update the item in the tree widget
-                item.setText(0, new_name.strip())
-                data["name"] = new_name.strip()
-                item.setData(0, Qt.UserRole, data)
-                
-                QMessageBox.information(self, "Success", f"Position name updated to '{new_name}' successfully!")
-            else:
-                QMessageBox.critical(self, "Error", "Failed to save changes to database")
+            # Update the position name in the database, the row follows through the catalog change
+            self.update_position_in_database(dept_id, pos_id, new_name.strip())
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,239 @@
+"""Undo and redo of catalog edits, saved together in one write.
+
+The Departments and Positions and the Hotel Systems screens make every
+change through a command on an EditHistory instead of saving it at once.
+Changes are kept in memory and saved in a single write SAVE_DELAY_MS after
+the last one, when Save is clicked, or before leaving the screen, so a long
+editing session costs a few writes instead of one per click. Undoing back
+to the last saved state saves nothing.
+"""
+import sys
+import os
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QPushButton, QLabel, QMessageBox, QShortcut, QUndoStack, QUndoCommand
+from PyQt5.QtCore import QObject, QTimer, Qt
+from PyQt5.QtGui import QKeySequence
+from PyQt5 import sip
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import get_logger, metrics, timed
+
+logger = get_logger("gui")
+
+# Pause in editing after which pending changes are saved
+SAVE_DELAY_MS = 3000
+
+
+class AddEntryCommand(QUndoCommand):
+    """Add a department, position, category or system"""
+
+    def __init__(self, catalog, kind, item_id, name, parent_id=None):
+        super().__init__(f"Add {kind} '{name}'")
+        self.catalog = catalog
+        self.kind = kind
+        self.item_id = item_id
+        self.name = name
+        self.parent_id = parent_id
+
+    def redo(self):
+        self.catalog.add_entry(self.kind, self.item_id, self.name, self.parent_id)
+
+    def undo(self):
+        self.catalog.remove_entry(self.kind, self.item_id, self.parent_id)
+
+
+class RenameEntryCommand(QUndoCommand):
+    """Rename a department, position, category or system"""
+
+    def __init__(self, catalog, kind, item_id, old_name, new_name, parent_id=None):
+        super().__init__(f"Rename {kind} '{old_name}' to '{new_name}'")
+        self.catalog = catalog
+        self.kind = kind
+        self.item_id = item_id
+        self.old_name = old_name
+        self.new_name = new_name
+        self.parent_id = parent_id
+
+    def redo(self):
+        self.catalog.rename_entry(self.kind, self.item_id, self.new_name, self.parent_id)
+
+    def undo(self):
+        self.catalog.rename_entry(self.kind, self.item_id, self.old_name, self.parent_id)
+
+
+class RemoveEntryCommand(QUndoCommand):
+    """Remove an entry with its positions or systems and the permissions that refer to it"""
+
+    def __init__(self, catalog, kind, item_id, name, parent_id=None):
+        super().__init__(f"Delete {kind} '{name}'")
+        self.catalog = catalog
+        self.kind = kind
+        self.item_id = item_id
+        self.parent_id = parent_id
+        self.entry = None
+        self.index = -1
+        self.dependents = None
+
+    def redo(self):
+        # Undo puts back the same entry object, children included, and what the removal cascaded to
+        self.entry = self.catalog.get_entry(self.kind, self.item_id, self.parent_id)
+        self.index = self.catalog.entry_index(self.kind, self.item_id, self.parent_id)
+        self.dependents = self.catalog.dependents_state()
+        self.catalog.remove_entry(self.kind, self.item_id, self.parent_id)
+
+    def undo(self):
+        if self.entry is None:
+            return
+        self.catalog.insert_entry(self.kind, self.entry, self.index, self.parent_id)
+        self.catalog.restore_dependents(self.dependents)
+
+
+class EditHistory(QObject):
+    """Undo stack of a screen's catalog edits, saving them together when editing pauses.
+
+    save() is the screen's method writing the whole catalog; it returns
+    True when the write worked.
+    """
+
+    def __init__(self, parent, save):
+        super().__init__(parent)
+        self.parent_window = parent
+        self.save = save
+        self.stack = QUndoStack(self)
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(SAVE_DELAY_MS)
+        self.save_timer.timeout.connect(self.save_on_idle)
+        self.stack.indexChanged.connect(self.on_index_changed)
+
+    def push(self, command):
+        """Do a change and remember it for undo"""
+        self.stack.push(command)
+
+    def has_unsaved_changes(self):
+        return not self.stack.isClean()
+
+    def unsaved_count(self):
+        """Number of undo steps between the last save and now"""
+        if self.stack.isClean():
+            return 0
+        clean_index = self.stack.cleanIndex()
+        count = self.stack.count() if clean_index < 0 else abs(self.stack.index() - clean_index)
+        # An unsaved change made outside the history counts as one
+        return max(count, 1)
+
+    def on_index_changed(self, index):
+        if sip.isdeleted(self.stack):
+            return
+        if self.stack.isClean():
+            self.save_timer.stop()
+        else:
+            self.save_timer.start()
+
+    @timed("edits.flush")
+    def flush(self):
+        """Save all pending changes in one write; True if saved or nothing needed saving"""
+        self.save_timer.stop()
+        if self.stack.isClean():
+            return True
+        pending = self.unsaved_count()
+        if not self.save():
+            metrics.increment("edits.flush.failures")
+            return False
+        self.stack.setClean()
+        metrics.increment("edits.flushes")
+        metrics.increment("edits.flushed_changes", pending)
+        return True
+
+    def save_on_idle(self):
+        """Save after a pause in editing; on failure the changes stay pending"""
+        if not self.flush():
+            logger.warning("Saving pending changes failed, they are kept until the next save")
+            QMessageBox.critical(self.parent_window, "Error",
+                                 "Failed to save changes to database. They are kept and saved again with your "
+                                 "next change or when you click Save.")
+
+    def save_before_leaving(self):
+        """Save pending changes before the screen closes; False to keep the screen open"""
+        if self.flush():
+            return True
+        reply = QMessageBox.question(
+            self.parent_window,
+            "Unsaved Changes",
+            "Failed to save changes to database.\n\nLeave anyway and lose them?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return False
+        self.stack.setClean()
+        return True
+
+    def save_unrecorded(self):
+        """Save a change made outside the history, such as an import, which cannot be undone.
+
+        The history is forgotten either way. If the save fails the change
+        stays pending, so Save and leaving the screen still save it.
+        """
+        self.clear()
+        if self.save():
+            return True
+        self.stack.resetClean()
+        return False
+
+    def clear(self):
+        """Forget the history, after the catalog was changed outside of it and saved"""
+        self.save_timer.stop()
+        self.stack.clear()
+
+    def create_toolbar(self):
+        """Undo, Redo and Save buttons with their shortcuts, and the save status"""
+        toolbar = QWidget()
+        layout = QHBoxLayout(toolbar)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        undo_btn = QPushButton("Undo")
+        undo_btn.clicked.connect(self.stack.undo)
+        undo_btn.setEnabled(self.stack.canUndo())
+        self.stack.canUndoChanged.connect(undo_btn.setEnabled)
+        self.stack.undoTextChanged.connect(lambda text: undo_btn.setToolTip(f"Undo {text}" if text else ""))
+        layout.addWidget(undo_btn)
+
+        redo_btn = QPushButton("Redo")
+        redo_btn.clicked.connect(self.stack.redo)
+        redo_btn.setEnabled(self.stack.canRedo())
+        self.stack.canRedoChanged.connect(redo_btn.setEnabled)
+        self.stack.redoTextChanged.connect(lambda text: redo_btn.setToolTip(f"Redo {text}" if text else ""))
+        layout.addWidget(redo_btn)
+
+        save_btn = QPushButton("Save")
+        save_btn.clicked.connect(self.save_clicked)
+        layout.addWidget(save_btn)
+
+        status_label = QLabel()
+        status_label.setStyleSheet("color: #7f8c8d; padding: 5px;")
+        layout.addWidget(status_label)
+        layout.addStretch()
+
+        def update_status():
+            # The stack signals its last change while it is being deleted with the screen
+            if sip.isdeleted(self.stack):
+                return
+            count = self.unsaved_count()
+            save_btn.setEnabled(count > 0)
+            status_label.setText(f"{count} unsaved change{'s' if count != 1 else ''}" if count
+                                 else "All changes saved")
+        self.stack.indexChanged.connect(lambda index: update_status())
+        self.stack.cleanChanged.connect(lambda clean: update_status())
+        update_status()
+
+        for key, slot in ((QKeySequence.Undo, self.stack.undo), (QKeySequence.Redo, self.stack.redo),
+                          (QKeySequence.Save, self.save_clicked)):
+            shortcut = QShortcut(QKeySequence(key), self.parent_window)
+            shortcut.setContext(Qt.WindowShortcut)
+            shortcut.activated.connect(slot)
+        return toolbar
+
+    def save_clicked(self):
+        if not self.flush():
+            QMessageBox.critical(self.parent_window, "Error", "Failed to save changes to database")
@@ -5,7 +5,8 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                             QHBoxLayout, QLabel, QPushButton, QMessageBox,
                             QTreeWidget, QTreeWidgetItem, QScrollArea, QGroupBox,
                             QCheckBox, QSplitter, QFrame, QTableWidget, QTableWidgetItem,
-                            QInputDialog, QComboBox, QDialog, QLineEdit, QTreeWidgetItemIterator)
+                            QInputDialog, QComboBox, QDialog, QLineEdit, QTreeWidgetItemIterator,
+                            QStackedWidget)
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QFont, QIcon
 
@@ -15,8 +16,13 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Import navigation bar and database manager
 from GUI.navigation_bar import NavigationBar
 from database.db_manager import db_manager
+from GUI import bulk_transfer
+from GUI.edit_history import EditHistory, AddEntryCommand, RenameEntryCommand, RemoveEntryCommand
+from database.catalog import Catalog, CATEGORY, SYSTEM, INSERTED, REMOVED, RENAMED
+from instrumentation import timed
 
 class HotelSystemsScreen(QMainWindow):
+    @timed("screen.hotel_systems.construct")
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Waldorf Access Form Generator - Hotel Systems")
@@ -82,8 +88,17 @@ class HotelSystemsScreen(QMainWindow):
             }
         """)
         
-        # Load data from database
-        self.load_database()
+        # Load data from database; views follow catalog changes instead of rebuilding their trees
+        self.catalog = Catalog(self.load_database())
+        self.catalog.subscribe(self.on_catalog_changed)
+        
+        # Edits are undoable and saved together, see edit_history.py
+        self.history = EditHistory(self, self.save_database)
+        
+        # Tree items by id; system trees are built per category on first view
+        self.category_items = {}
+        self.system_trees = {}
+        self.system_items = {}
         
         # Create central widget and layout
         self.central_widget = QWidget()
@@ -105,13 +120,16 @@ class HotelSystemsScreen(QMainWindow):
     def load_database(self):
         """Load data from the database using the database manager"""
         try:
-            self.db_data = db_manager.load_database()
+            return db_manager.load_database()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load database: {str(e)}")
-            self.db_data = {"departments": [], "system_categories": [], "access_permissions": {}}
+            return {"departments": [], "system_categories": [], "access_permissions": {}}
     
     def create_widgets(self):
         """Create all UI elements for the hotel systems screen"""
+        # Undo, Redo and Save
+        self.main_layout.addWidget(self.history.create_toolbar())
+        
         # Create splitter for resizable panels
         splitter = QSplitter(Qt.Horizontal)
         
@@ -152,13 +170,8 @@ class HotelSystemsScreen(QMainWindow):
         self.category_tree_widget.itemClicked.connect(self.on_category_clicked)
         
         # Populate tree with system categories
-        for category in self.db_data.get("system_categories", []):
-            category_item = QTreeWidgetItem(self.category_tree_widget)
-            category_item.setText(0, category["name"])
-            category_item.setData(0, Qt.UserRole, {"id": category["id"], "name": category["name"]})
-            
-            # Create buttons for this category
-            self.create_category_buttons(category_item)
+        for category in self.catalog.categories():
+            self.create_category_item(category)
         
         left_layout.addWidget(self.category_tree_widget)
         
@@ -167,6 +180,16 @@ class HotelSystemsScreen(QMainWindow):
         add_category_btn.clicked.connect(self.add_category)
         left_layout.addWidget(add_category_btn)
         
+        # Bulk import and export of the whole catalog and its permissions
+        bulk_layout = QHBoxLayout()
+        import_btn = QPushButton("Import...")
+        import_btn.clicked.connect(self.import_catalog)
+        bulk_layout.addWidget(import_btn)
+        export_btn = QPushButton("Export...")
+        export_btn.clicked.connect(self.export_catalog)
+        bulk_layout.addWidget(export_btn)
+        left_layout.addLayout(bulk_layout)
+        
         return left_widget
     
     def create_right_panel(self):
@@ -181,17 +204,11 @@ class HotelSystemsScreen(QMainWindow):
         right_title.setStyleSheet("color: #2c3e50; padding: 5px;")
         right_layout.addWidget(right_title)
         
-        # Tree widget for systems
-        self.system_tree_widget = QTreeWidget()
-        self.system_tree_widget.setHeaderLabels(["System", "Actions"])
-        self.system_tree_widget.setColumnCount(2)
-        self.system_tree_widget.setColumnWidth(0, 300)  # Set width for system name column
-        self.system_tree_widget.setColumnWidth(1, 150)  # Set width for actions column
-        self.system_tree_widget.setEditTriggers(QTreeWidget.DoubleClicked | QTreeWidget.EditKeyPressed)
-        
-        # Connect signals for editing
-        self.system_tree_widget.itemChanged.connect(self.on_system_changed)
-        self.system_tree_widget.itemClicked.connect(self.store_original_system_value)
+        # One systems tree per viewed category, the empty tree is shown until one is selected
+        self.system_stack = QStackedWidget()
+        self.empty_system_tree_widget = self.create_system_tree()
+        self.system_stack.addWidget(self.empty_system_tree_widget)
+        self.system_tree_widget = self.empty_system_tree_widget
         
         # Flag to prevent showing message during initialization
         self.is_initialized = False
@@ -199,7 +216,7 @@ class HotelSystemsScreen(QMainWindow):
         # Store original values before editing
         self.original_system_values = {}
         
-        right_layout.addWidget(self.system_tree_widget)
+        right_layout.addWidget(self.system_stack)
         
         # Add system button
         add_system_btn = QPushButton("Add System")
@@ -211,11 +228,55 @@ class HotelSystemsScreen(QMainWindow):
         
         return right_widget
     
+    def create_system_tree(self):
+        """Create an empty tree widget for the systems of one category"""
+        system_tree = QTreeWidget()
+        system_tree.setHeaderLabels(["System", "Actions"])
+        system_tree.setColumnCount(2)
+        system_tree.setColumnWidth(0, 300)  # Set width for system name column
+        system_tree.setColumnWidth(1, 150)  # Set width for actions column
+        system_tree.setEditTriggers(QTreeWidget.DoubleClicked | QTreeWidget.EditKeyPressed)
+        
+        # Connect signals for editing
+        system_tree.itemChanged.connect(self.on_system_changed)
+        system_tree.itemClicked.connect(self.store_original_system_value)
+        return system_tree
+    
     def create_navigation_bar(self):
         """Create the navigation bar at the bottom of the screen"""
         nav_bar = NavigationBar(self, "hotel_systems")
         self.main_layout.addWidget(nav_bar)
     
+    def create_category_item(self, category, index=None):
+        """Add a category row to the categories tree, the item only keeps the category id"""
+        category_item = QTreeWidgetItem()
+        category_item.setText(0, category.name)
+        category_item.setData(0, Qt.UserRole, (category.id,))
+        if index is None:
+            self.category_tree_widget.addTopLevelItem(category_item)
+        else:
+            self.category_tree_widget.insertTopLevelItem(index, category_item)
+        self.category_items[category.id] = category_item
+        
+        # Create buttons for this category
+        self.create_category_buttons(category_item)
+        return category_item
+    
+    def create_system_item(self, system_tree, category_id, system, index=None):
+        """Add a system row to a category's systems tree, the item only keeps the ids"""
+        system_item = QTreeWidgetItem()
+        system_item.setText(0, system.name)
+        system_item.setData(0, Qt.UserRole, (category_id, system.id))
+        if index is None:
+            system_tree.addTopLevelItem(system_item)
+        else:
+            system_tree.insertTopLevelItem(index, system_item)
+        self.system_items[category_id][system.id] = system_item
+        
+        # Create buttons for this system
+        self.create_system_buttons(system_item)
+        return system_item
+    
     
     def create_category_buttons(self, category_item):
         """Create Edit and Delete buttons for a category item"""
@@ -259,9 +320,6 @@ class HotelSystemsScreen(QMainWindow):
             }
         """)
         
-        # Get category data
-        category_data = category_item.data(0, Qt.UserRole)
-        
         # Connect button signals
         edit_btn.clicked.connect(lambda checked, item=category_item: self.edit_category(item))
         delete_btn.clicked.connect(lambda checked, item=category_item: self.delete_category(item))
@@ -315,9 +373,6 @@ class HotelSystemsScreen(QMainWindow):
             }
         """)
         
-        # Get system data
-        system_data = system_item.data(0, Qt.UserRole)
-        
         # Connect button signals
         edit_btn.clicked.connect(lambda checked, item=system_item: self.edit_system(item))
         delete_btn.clicked.connect(lambda checked, item=system_item: self.delete_system(item))
@@ -327,86 +382,138 @@ class HotelSystemsScreen(QMainWindow):
         button_layout.addWidget(delete_btn)
         
         # Set the widget as the item widget for column 1
-        self.system_tree_widget.setItemWidget(system_item, 1, button_widget)
+        system_item.treeWidget().setItemWidget(system_item, 1, button_widget)
+    
+    def category_of_item(self, item):
+        """Category of a categories tree item, or None if it no longer exists"""
+        data = item.data(0, Qt.UserRole) if item else None
+        if not data:
+            return None
+        return self.catalog.get_category(data[0])
+    
+    def system_of_item(self, item):
+        """(category, system) of a systems tree item, or (None, None)"""
+        data = item.data(0, Qt.UserRole) if item else None
+        if not data:
+            return None, None
+        category_id, system_id = data
+        return self.catalog.get_category(category_id), self.catalog.get_system(category_id, system_id)
     
     def on_category_clicked(self, item, column):
         """Handle category click event for selection"""
-        data = item.data(0, Qt.UserRole)
-        if not data:
+        category = self.category_of_item(item)
+        if category is None:
             return
-            
-        # Clear systems tree
-        self.system_tree_widget.clear()
-        
-        # Get category info
-        category_id = data["id"]
-        category_name = data["name"]
-        
-        # Find the category in the database
-        for category in self.db_data.get("system_categories", []):
-            if category.get("id") == category_id:
-                # Add systems to the right panel
-                for system in category.get("systems", []):
-                    system_item = QTreeWidgetItem(self.system_tree_widget)
-                    system_item.setText(0, system["name"])
-                    system_item.setData(0, Qt.UserRole, {
-                        "id": system["id"],
-                        "name": system["name"],
-                        "category_id": category_id,
-                        "category_name": category_name
-                    })
-                    
-                    # Create buttons for this system
-                    self.create_system_buttons(system_item)
-                break
+        
+        self.show_category_systems(category.id)
+    
+    def show_category_systems(self, category_id):
+        """Show the systems of a category, building its tree on first view"""
+        system_tree = self.system_trees.get(category_id)
+        if system_tree is None:
+            category = self.catalog.get_category(category_id)
+            if category is None:
+                return
+            system_tree = self.create_system_tree()
+            self.system_trees[category_id] = system_tree
+            self.system_items[category_id] = {}
+            for system in category.systems:
+                self.create_system_item(system_tree, category_id, system)
+            self.system_stack.addWidget(system_tree)
+        
+        self.system_stack.setCurrentWidget(system_tree)
+        self.system_tree_widget = system_tree
+    
+    def on_catalog_changed(self, event):
+        """Apply a single catalog change to the trees"""
+        if event.kind == CATEGORY:
+            if event.action == INSERTED:
+                self.create_category_item(self.catalog.get_category(event.item_id), event.index)
+            elif event.action == RENAMED:
+                category_item = self.category_items.get(event.item_id)
+                if category_item:
+                    category_item.setText(0, event.name)
+            elif event.action == REMOVED:
+                category_item = self.category_items.pop(event.item_id, None)
+                if category_item:
+                    self.category_tree_widget.invisibleRootItem().removeChild(category_item)
+                self.system_items.pop(event.item_id, None)
+                system_tree = self.system_trees.pop(event.item_id, None)
+                if system_tree is not None:
+                    if system_tree is self.system_tree_widget:
+                        self.system_stack.setCurrentWidget(self.empty_system_tree_widget)
+                        self.system_tree_widget = self.empty_system_tree_widget
+                    self.system_stack.removeWidget(system_tree)
+                    system_tree.deleteLater()
+        
+        elif event.kind == SYSTEM:
+            system_tree = self.system_trees.get(event.parent_id)
+            if system_tree is None:
+                # Not viewed yet, the tree is built from the catalog when it is
+                return
+            items = self.system_items[event.parent_id]
+            if event.action == INSERTED:
+                system = self.catalog.get_system(event.parent_id, event.item_id)
+                self.create_system_item(system_tree, event.parent_id, system, event.index)
+            elif event.action == RENAMED:
+                system_item = items.get(event.item_id)
+                if system_item:
+                    system_item.setText(0, event.name)
+            elif event.action == REMOVED:
+                system_item = items.pop(event.item_id, None)
+                if system_item:
+                    system_tree.invisibleRootItem().removeChild(system_item)
     
     def on_system_changed(self, item, column):
         """Handle system name change"""
         # Only process if the tree is fully initialized
         if hasattr(self, 'is_initialized') and self.is_initialized:
             new_value = item.text(0)
-            data = item.data(0, Qt.UserRole)
+            category, system = self.system_of_item(item)
             
-            if data:
-                original_name = data["name"]
-                category_id = data["category_id"]
-                system_id = data["id"]
+            if system:
+                original_name = system.name
+                category_id = category.id
+                system_id = system.id
                 
                 if new_value != original_name:
-                    # Update the database
-                    if self.update_system_in_database(category_id, system_id, new_value):
-                        # Update the stored data
-                        data["name"] = new_value
-                        item.setData(0, Qt.UserRole, data)
-                        QMessageBox.information(self, "Success", "System name updated successfully")
-                    else:
+                    # Update the database, the item follows through the catalog change
+                    if not self.update_system_in_database(category_id, system_id, new_value):
                         # Revert the change if update failed
                         item.setText(0, original_name)
                         QMessageBox.warning(self, "Error", "Failed to update system name")
     
     def update_system_in_database(self, category_id, system_id, new_name):
-        """Update system name in the database"""
-        try:
-            # Find the category in the database
-            for category in self.db_data.get("system_categories", []):
-                if category.get("id") == category_id:
-                    # Find the system within the category
-                    for system in category.get("systems", []):
-                        if system.get("id") == system_id:
-                            # Update the system name
-                            system["name"] = new_name
-                            # Save the updated database
-                            return self.save_database()
-                    break
-            return False
-        except Exception as e:
-            print(f"Error updating system in database: {str(e)}")
+        """Rename a system, saved with the other pending changes"""
+        system = self.catalog.get_system(category_id, system_id)
+        if system is None:
             return False
+        self.history.push(RenameEntryCommand(self.catalog, SYSTEM, system_id, system.name, new_name, category_id))
+        return True
+    
+    def import_catalog(self):
+        """Import departments, systems and permissions from a CSV or JSONL file"""
+        # The import saves the whole catalog at once and cannot be undone
+        if not self.history.flush():
+            QMessageBox.critical(self, "Error", "Failed to save changes to database")
+            return
+        bulk_transfer.import_catalog(self, self.catalog, self.history.save_unrecorded)
+    
+    def export_catalog(self):
+        """Export departments, systems and permissions to a CSV or JSONL file"""
+        bulk_transfer.export_catalog(self, self.catalog)
+    
+    def closeEvent(self, event):
+        """Save pending changes before the screen closes"""
+        if self.history.save_before_leaving():
+            event.accept()
+        else:
+            event.ignore()
     
     def save_database(self):
         """Save the current database using the database manager"""
         try:
-            return db_manager.save_database(self.db_data)
+            return db_manager.save_database(self.catalog.to_dict())
         except Exception as e:
             print(f"Error saving database: {str(e)}")
             return False
@@ -415,9 +522,9 @@ class HotelSystemsScreen(QMainWindow):
     def store_original_system_value(self, item, column):
         """Store the original system value before editing begins"""
         if hasattr(self, 'is_initialized') and self.is_initialized:
-            data = item.data(0, Qt.UserRole)
-            if data:
-                self.original_system_values[data["id"]] = data["name"]
+            category, system = self.system_of_item(item)
+            if system:
+                self.original_system_values[system.id] = system.name
     
     def add_category(self):
         """Add a new category to the database"""
@@ -426,36 +533,15 @@ class HotelSystemsScreen(QMainWindow):
         
         if ok and category_name.strip():
             # Generate a unique ID for the category
-            category_id = category_name.lower().replace(" ", "_").replace("á", "a").replace("é", "e").replace("í", "i").replace("ó", "o").replace("ú", "u").replace("ñ", "n")
+            category_id = self.catalog.allocate_id(CATEGORY)
             
             # Check if category already exists
-            for category in self.db_data.get("system_categories", []):
-                if category.get("name", "").lower() == category_name.strip().lower():
-                    QMessageBox.warning(self, "Error", f"Category '{category_name}' already exists!")
-                    return
-            
-            # Add new category to database
-            new_category = {
-                "id": category_id,
-                "name": category_name.strip(),
-                "systems": []
-            }
-            
-            self.db_data["system_categories"].append(new_category)
+            if self.catalog.category_name_taken(category_name):
+                QMessageBox.warning(self, "Error", f"Category '{category_name}' already exists!")
+                return
             
-            # Save the updated database
-            if self.save_database():
-                # Add the new category to the tree widget
-                category_item = QTreeWidgetItem(self.category_tree_widget)
-                category_item.setText(0, category_name.strip())
-                category_item.setData(0, Qt.UserRole, {"id": category_id, "name": category_name.strip()})
-                
-                # Create buttons for the new category
-                self.create_category_buttons(category_item)
-                
-                QMessageBox.information(self, "Success", f"Category '{category_name}' added successfully!")
-            else:
-                QMessageBox.critical(self, "Error", "Failed to save changes to database")
+            # Add new category to database, the tree follows through the catalog change
+            self.history.push(AddEntryCommand(self.catalog, CATEGORY, category_id, category_name.strip()))
     
     def add_system(self):
         """Add a new system to a category"""
@@ -466,95 +552,59 @@ class HotelSystemsScreen(QMainWindow):
             QMessageBox.warning(self, "Error", "Please select a category first.")
             return
         
-        category_data = current_category_item.data(0, Qt.UserRole)
-        if not category_data:
+        category = self.category_of_item(current_category_item)
+        if category is None:
             QMessageBox.warning(self, "Error", "Invalid category selected.")
             return
         
-        category_id = category_data["id"]
-        category_name = category_data["name"]
+        category_id = category.id
+        category_name = category.name
         
         # Get system name from user input
         system_name, ok = QInputDialog.getText(self, "Add System", f"Enter system name for category '{category_name}':")
         
         if ok and system_name.strip():
-            # Find the selected category in the database
-            for category in self.db_data.get("system_categories", []):
-                if category.get("id") == category_id:
-                    # Check if system already exists in this category
-                    for system in category.get("systems", []):
-                        if system.get("name", "").lower() == system_name.strip().lower():
-                            QMessageBox.warning(self, "Error", f"System '{system_name}' already exists in category '{category_name}'.")
-                            return
-                    
-                    # Generate a unique ID for the system
-                    system_id = system_name.lower().replace(" ", "_").replace("á", "a").replace("é", "e").replace("í", "i").replace("ó", "o").replace("ú", "u").replace("ñ", "n")
-                    
-                    # Add new system to the category
-                    new_system = {
-                        "id": system_id,
-                        "name": system_name.strip()
-                    }
-                    
-                    category["systems"].append(new_system)
-                    
-                    # Save the updated database
-                    if self.save_database():
-                        # Refresh the systems tree if this category is currently selected
-                        if self.category_tree_widget.currentItem() == current_category_item:
-                            self.on_category_clicked(current_category_item, 0)
-                        
-                        QMessageBox.information(self, "Success", f"System '{system_name}' added to category '{category_name}' successfully!")
-                    else:
-                        QMessageBox.critical(self, "Error", "Failed to save changes to database")
-                    return
+            # Check if system already exists in this category
+            if self.catalog.system_name_taken(category_id, system_name):
+                QMessageBox.warning(self, "Error", f"System '{system_name}' already exists in category '{category_name}'.")
+                return
+            
+            # Generate a unique ID for the system
+            system_id = self.catalog.allocate_id(SYSTEM, category_id)
+            
+            # Add new system to the category, its tree row is inserted through the catalog change
+            self.history.push(AddEntryCommand(self.catalog, SYSTEM, system_id, system_name.strip(), category_id))
     
     def delete_category(self, item):
         """Delete a category after confirmation"""
-        data = item.data(0, Qt.UserRole)
-        if not data:
+        category = self.category_of_item(item)
+        if category is None:
             return
         
-        category_id = data["id"]
-        category_name = data["name"]
+        category_id = category.id
+        category_name = category.name
         
         # Show confirmation dialog
         reply = QMessageBox.question(
             self,
             "Confirm Deletion",
-            f"Are you sure you want to delete the category '{category_name}'?\n\nThis will also delete all systems within this category.",
+            f"Are you sure you want to delete the category '{category_name}'?\n\nThis will also delete all systems within this category and the access permissions to them.",
             QMessageBox.Yes | QMessageBox.No,
             QMessageBox.No
         )
         
         if reply == QMessageBox.Yes:
-            # Find and remove the category from the database
-            for i, category in enumerate(self.db_data.get("system_categories", [])):
-                if category.get("id") == category_id:
-                    del self.db_data["system_categories"][i]
-                    break
-            
-            # Save the updated database
-            if self.save_database():
-                # Remove the item from the tree widget
-                root = self.category_tree_widget.invisibleRootItem()
-                root.removeChild(item)
-                
-                # Clear systems tree since the category is gone
-                self.system_tree_widget.clear()
-                
-                QMessageBox.information(self, "Success", f"Category '{category_name}' deleted successfully!")
-            else:
-                QMessageBox.critical(self, "Error", "Failed to save changes to database")
+            # Remove the category and the permissions to its systems, its rows and systems tree go through the catalog change
+            self.history.push(RemoveEntryCommand(self.catalog, CATEGORY, category_id, category_name))
     
     def edit_category(self, item):
         """Edit a category name"""
-        data = item.data(0, Qt.UserRole)
-        if not data:
+        category = self.category_of_item(item)
+        if category is None:
             return
         
-        category_id = data["id"]
-        old_name = data["name"]
+        category_id = category.id
+        old_name = category.name
         
         # Get new category name from user input
         new_name, ok = QInputDialog.getText(
@@ -566,56 +616,23 @@ class HotelSystemsScreen(QMainWindow):
         
         if ok and new_name.strip() and new_name.strip() != old_name:
             # Check if category name already exists
-            for category in self.db_data.get("system_categories", []):
-                if category.get("name", "").lower() == new_name.strip().lower() and category.get("id") != category_id:
-                    QMessageBox.warning(self, "Error", f"Category '{new_name}' already exists!")
-                    return
-            
-            # Update the category name in the database
-            for category in self.db_data.get("system_categories", []):
-                if category.get("id") == category_id:
-                    category["name"] = new_name.strip()
-                    break
+            if self.catalog.category_name_taken(new_name, exclude_id=category_id):
+                QMessageBox.warning(self, "Error", f"Category '{new_name}' already exists!")
+                return
             
-            # Save the updated database
-            if self.save_database():
-                # Update the item in the tree widget
-                item.setText(0, new_name.strip())
-                data["name"] = new_name.strip()
-                item.setData(0, Qt.UserRole, data)
-                
-                # Update systems that reference this category
-                self.update_systems_category_name(category_id, new_name.strip())
-                
-                QMessageBox.information(self, "Success", f"Category name updated to '{new_name}' successfully!")
-            else:
-                QMessageBox.critical(self, "Error", "Failed to save changes to database")
-    
-    def update_systems_category_name(self, category_id, new_category_name):
-        """Update the category name in all systems that reference it"""
-        for category in self.db_data.get("system_categories", []):
-            if category.get("id") == category_id:
-                for system in category.get("systems", []):
-                    # Update systems tree if this category is currently selected
-                    root = self.system_tree_widget.invisibleRootItem()
-                    for i in range(root.childCount()):
-                        system_item = root.child(i)
-                        system_data = system_item.data(0, Qt.UserRole)
-                        if system_data and system_data.get("category_id") == category_id:
-                            system_data["category_name"] = new_category_name
-                            system_item.setData(0, Qt.UserRole, system_data)
-                break
+            # Update the category name in the database, the trees follow through the catalog change
+            self.history.push(RenameEntryCommand(self.catalog, CATEGORY, category_id, old_name, new_name.strip()))
     
     def delete_system(self, item):
         """Delete a system after confirmation"""
-        data = item.data(0, Qt.UserRole)
-        if not data:
+        category, system = self.system_of_item(item)
+        if system is None:
             return
         
-        category_id = data["category_id"]
-        category_name = data["category_name"]
-        system_id = data["id"]
-        system_name = data["name"]
+        category_id = category.id
+        category_name = category.name
+        system_id = system.id
+        system_name = system.name
         
         # Show confirmation dialog
         reply = QMessageBox.question(
@@ -627,36 +644,19 @@ class HotelSystemsScreen(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            # Find the category and system in the database
-            for category in self.db_data.get("system_categories", []):
-                if category.get("id") == category_id:
-                    # Find and remove the system
-                    for i, system in enumerate(category.get("systems", [])):
-                        if system.get("id") == system_id:
-                            del category["systems"][i]
-                            break
-                    
-                    # Save the updated database
-                    if self.save_database():
-                        # Remove the item from the tree widget
-                        root = self.system_tree_widget.invisibleRootItem()
-                        root.removeChild(item)
-                        
-                        QMessageBox.information(self, "Success", f"System '{system_name}' deleted successfully!")
-                    else:
-                        QMessageBox.critical(self, "Error", "Failed to save changes to database")
-                    return
+            # Remove the system and the permissions to it, its row goes through the catalog change
+            self.history.push(RemoveEntryCommand(self.catalog, SYSTEM, system_id, system_name, category_id))
     
     def edit_system(self, item):
         """Edit a system name"""
-        data = item.data(0, Qt.UserRole)
-        if not data:
+        category, system = self.system_of_item(item)
+        if system is None:
             return
         
-        category_id = data["category_id"]
-        category_name = data["category_name"]
-        system_id = data["id"]
-        old_name = data["name"]
+        category_id = category.id
+        category_name = category.name
+        system_id = system.id
+        old_name = system.name
         
         # Get new system name from user input
         new_name, ok = QInputDialog.getText(
@@ -668,24 +668,12 @@ class HotelSystemsScreen(QMainWindow):
         
         if ok and new_name.strip() and new_name.strip() != old_name:
             # Check if system name already exists in this category
-            for category in self.db_data.get("system_categories", []):
-                if category.get("id") == category_id:
-                    for system in category.get("systems", []):
-                        if system.get("name", "").lower() == new_name.strip().lower() and system.get("id") != system_id:
-                            QMessageBox.warning(self, "Error", f"System '{new_name}' already exists in category '{category_name}'.")
-                            return
-                    break
+            if self.catalog.system_name_taken(category_id, new_name, exclude_id=system_id):
+                QMessageBox.warning(self, "Error", f"System '{new_name}' already exists in category '{category_name}'.")
+                return
             
-            # Update the system name in the database
-            if self.update_system_in_database(category_id, system_id, new_name.strip()):
-                # Update the item in the tree widget
-                item.setText(0, new_name.strip())
-                data["name"] = new_name.strip()
-                item.setData(0, Qt.UserRole, data)
-                
-                QMessageBox.information(self, "Success", f"System name updated to '{new_name}' successfully!")
-            else:
-                QMessageBox.critical(self, "Error", "Failed to save changes to database")
+            # Update the system name in the database, the row follows through the catalog change
+            self.update_system_in_database(category_id, system_id, new_name.strip())
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -3,13 +3,16 @@ import os
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QLineEdit, QPushButton, 
                             QMessageBox, QFrame)
-from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtCore import Qt, QSize, QTimer
 from PyQt5.QtGui import QFont, QPixmap, QIcon
 
 # Add the parent directory to the path to import other modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import timed
+from GUI.startup_prefetch import StartupPrefetchThread
 
 class LoginScreen(QMainWindow):
+    @timed("screen.login.construct")
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Waldorf Access Form Generator")
@@ -61,6 +64,11 @@ class LoginScreen(QMainWindow):
         self.main_layout.setSpacing(10)
         self.main_layout.setContentsMargins(20, 20, 20, 20)
         
+        # Background loading of the database and screens, started once the login is shown
+        self.prefetch_thread = None
+        self.login_pending = False
+        self.main_window = None
+        
         # Create UI elements
         self.create_widgets()
         
@@ -134,9 +142,15 @@ class LoginScreen(QMainWindow):
         self.main_layout.addWidget(self.password_entry)
         
         # Login button
-        login_button = QPushButton("Login")
-        login_button.clicked.connect(self.login)
-        self.main_layout.addWidget(login_button)
+        self.login_button = QPushButton("Login")
+        self.login_button.clicked.connect(self.login)
+        self.main_layout.addWidget(self.login_button)
+        
+        # Background loading status
+        self.status_label = QLabel("")
+        self.status_label.setAlignment(Qt.AlignCenter)
+        self.status_label.setStyleSheet("color: #7f8c8d; font-size: 9pt;")
+        self.main_layout.addWidget(self.status_label)
         
         # Set focus to username field
         self.username_entry.setFocus()
@@ -158,21 +172,69 @@ class LoginScreen(QMainWindow):
             self.password_entry.clear()
             self.password_entry.setFocus()
             
+    def start_prefetch(self):
+        """Load the database and import the screens in the background"""
+        if self.prefetch_thread is not None:
+            return
+        self.status_label.setText("Loading data...")
+        self.prefetch_thread = StartupPrefetchThread(self)
+        self.prefetch_thread.data_ready.connect(self.on_prefetch_ready)
+        self.prefetch_thread.data_refreshed.connect(self.on_prefetch_refreshed)
+        # Let the thread finish its imports before the application exits
+        QApplication.instance().aboutToQuit.connect(self.prefetch_thread.wait)
+        self.prefetch_thread.start()
+    
+    def on_prefetch_ready(self):
+        """Background database load finished"""
+        if self.prefetch_thread.error:
+            self.status_label.setText("Data will be loaded after login")
+        else:
+            self.status_label.setText("Ready")
+        if self.login_pending:
+            self.login_pending = False
+            self.show_main_screen()
+    
+    def on_prefetch_refreshed(self):
+        """Firebase had changes that were not in the cached copy shown so far"""
+        if self.main_window is not None:
+            self.main_window.refresh_data(self.prefetch_thread.db_data)
+    
     def open_main_screen(self):
-        """Open the main application screen"""
+        """Open the main application screen, waiting for the background load if needed"""
+        if self.prefetch_thread is not None and not self.prefetch_thread.is_data_ready:
+            self.login_pending = True
+            self.login_button.setEnabled(False)
+            self.status_label.setText("Loading data...")
+            return
+        self.show_main_screen()
+    
+    @timed("screen.login_to_main")
+    def show_main_screen(self):
+        """Create and show the main screen with the prefetched data"""
+        db_data = None
+        if self.prefetch_thread is not None and not self.prefetch_thread.error:
+            db_data = self.prefetch_thread.db_data
         try:
             from GUI import main_screen
             self.hide()  # Hide instead of close
-            self.main_window = main_screen.MainScreen()
+            self.main_window = main_screen.MainScreen(db_data=db_data)
             self.main_window.show()
         except ImportError as e:
             # If main_screen is not implemented yet, just show a message
             QMessageBox.warning(self, "Import Error", f"Failed to import main screen: {str(e)}")
+            self.login_button.setEnabled(True)
             self.show()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error opening main screen: {str(e)}")
+            self.login_button.setEnabled(True)
             self.show()  # Show login screen again if there's an error
             
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        # Start loading in the background once the login has been painted
+        if self.prefetch_thread is None:
+            QTimer.singleShot(0, self.start_prefetch)
+    
     def run(self):
         """Start the login screen"""
         self.show()
@@ -1,10 +1,10 @@
 import sys
 import os
-import json
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                             QHBoxLayout, QLabel, QPushButton, QMessageBox,
                             QTreeWidget, QTreeWidgetItem, QScrollArea, QGroupBox,
-                            QCheckBox, QSplitter, QFrame)
+                            QCheckBox, QSplitter, QFrame, QTreeWidgetItemIterator,
+                            QComboBox, QInputDialog)
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QFont, QIcon
 
@@ -14,9 +14,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Import navigation bar and database manager
 from GUI.navigation_bar import NavigationBar
 from database.db_manager import db_manager
+from database.roles import PermissionResolver
+from database.ids import new_id
+from database.catalog import normalize_name
+from instrumentation import timed
 
 class MainScreen(QMainWindow):
-    def __init__(self):
+    @timed("screen.main.construct")
+    def __init__(self, db_data=None):
         super().__init__()
         self.setWindowTitle("Waldorf Access Form Generator - Access Matrix")
         self.setGeometry(100, 100, 1200, 800)
@@ -84,8 +89,11 @@ class MainScreen(QMainWindow):
             }
         """)
         
-        # Load data from database
-        self.load_database()
+        # Load data from database, unless it was already loaded during login
+        if db_data is not None:
+            self.set_db_data(db_data)
+        else:
+            self.load_database()
         
         # Store access permissions
         self.access_permissions = {}
@@ -110,77 +118,48 @@ class MainScreen(QMainWindow):
     def load_database(self):
         """Load data from the database using the database manager"""
         try:
-            self.db_data = db_manager.load_database()
+            self.set_db_data(db_manager.load_database())
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load database: {str(e)}")
-            self.db_data = {"departments": [], "system_categories": [], "access_permissions": {}}
+            self.set_db_data({"departments": [], "system_categories": [], "access_permissions": {}})
     
-    def save_permissions_to_database(self, dept_id, position_id, category_id, system_id, is_checked):
-        """Save or remove permission in the database"""
+    def set_db_data(self, db_data):
+        """Use a newly loaded database, with a resolver for its role templates"""
+        self.db_data = db_data
+        self.permission_resolver = PermissionResolver(db_data)
+    
+    def save_change_to_database(self, change):
+        """Apply change(resolver) to the current database and save it; returns True if saved"""
         try:
-            db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database", "database.json")
-            
-            # Load current database
-            with open(db_path, 'r', encoding='utf-8') as f:
-                db_data = json.load(f)
-            
-            # Initialize access_permissions if not exists
-            if "access_permissions" not in db_data:
-                db_data["access_permissions"] = {}
-            
-            # Create department key if not exists
-            if dept_id not in db_data["access_permissions"]:
-                db_data["access_permissions"][dept_id] = {}
-            
-            # Create position key if not exists
-            if position_id not in db_data["access_permissions"][dept_id]:
-                db_data["access_permissions"][dept_id][position_id] = {}
-            
-            # Create category key if not exists
-            if category_id not in db_data["access_permissions"][dept_id][position_id]:
-                db_data["access_permissions"][dept_id][position_id][category_id] = {}
-            
-            if is_checked:
-                # Add the system permission
-                db_data["access_permissions"][dept_id][position_id][category_id][system_id] = True
-            else:
-                # Remove the system permission if it exists
-                if system_id in db_data["access_permissions"][dept_id][position_id][category_id]:
-                    del db_data["access_permissions"][dept_id][position_id][category_id][system_id]
-                
-                # Clean up empty structures
-                if not db_data["access_permissions"][dept_id][position_id][category_id]:
-                    del db_data["access_permissions"][dept_id][position_id][category_id]
-                
-                if not db_data["access_permissions"][dept_id][position_id]:
-                    del db_data["access_permissions"][dept_id][position_id]
-                
-                if not db_data["access_permissions"][dept_id]:
-                    del db_data["access_permissions"][dept_id]
-            
-            # Save updated database
-            with open(db_path, 'w', encoding='utf-8') as f:
-                json.dump(db_data, f, indent=2, ensure_ascii=False)
-            
-            # Update in-memory data
-            self.db_data = db_data
-            
+            # The resolver only forgets the cached permissions the change affects;
+            # the save merges with edits made elsewhere since the database was loaded
+            change(self.permission_resolver)
+            if db_manager.save_database(self.db_data):
+                return True
+            QMessageBox.critical(self, "Error", "Failed to save permissions to database")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save permissions to database: {str(e)}")
+        
+        # Drop the change that was not saved
+        self.load_database()
+        return False
+    
+    def save_permissions_to_database(self, dept_id, position_id, category_id, system_id, is_checked):
+        """Save or remove permission in the database"""
+        # A position with a role template only stores how it differs from the template
+        return self.save_change_to_database(lambda resolver: resolver.set_position_permission(
+            dept_id, position_id, category_id, system_id, is_checked))
+    
+    def save_template_permission_to_database(self, template_id, category_id, system_id, is_checked):
+        """Save or remove a permission of a role template, for every position using it"""
+        return self.save_change_to_database(lambda resolver: resolver.set_template_permission(
+            template_id, category_id, system_id, is_checked))
     
     def load_permissions_from_database(self, dept_id, position_id):
         """Load permissions for a specific position from the database"""
         try:
-            if "access_permissions" not in self.db_data:
-                return {}
-            
-            if dept_id not in self.db_data["access_permissions"]:
-                return {}
-            
-            if position_id not in self.db_data["access_permissions"][dept_id]:
-                return {}
-            
-            return self.db_data["access_permissions"][dept_id][position_id]
+            # Role templates are merged in, so this is the access the position really has
+            return self.permission_resolver.effective_permissions(dept_id, position_id)
             
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load permissions from database: {str(e)}")
@@ -224,7 +203,24 @@ class MainScreen(QMainWindow):
         self.tree_widget.setHeaderLabel("Organization Structure")
         self.tree_widget.itemClicked.connect(self.on_tree_item_clicked)
         
-        # Populate tree with departments and positions
+        self.populate_tree()
+        left_layout.addWidget(self.tree_widget)
+        
+        # Role templates: positions using one get its access plus their own changes
+        template_layout = QHBoxLayout()
+        new_template_btn = QPushButton("New Template")
+        new_template_btn.clicked.connect(self.new_template)
+        template_layout.addWidget(new_template_btn)
+        delete_template_btn = QPushButton("Delete Template")
+        delete_template_btn.clicked.connect(self.delete_template)
+        template_layout.addWidget(delete_template_btn)
+        left_layout.addLayout(template_layout)
+        
+        return left_widget
+    
+    def populate_tree(self):
+        """Fill the tree with the departments and positions in the database"""
+        self.tree_widget.clear()
         for dept in self.db_data.get("departments", []):
             dept_item = QTreeWidgetItem(self.tree_widget)
             dept_item.setText(0, dept["name"])
@@ -235,10 +231,44 @@ class MainScreen(QMainWindow):
                 pos_item.setText(0, position["name"])
                 pos_item.setData(0, Qt.UserRole, {"type": "position", "id": position["id"], "dept_id": dept["id"]})
         
+        templates = self.permission_resolver.templates()
+        if templates:
+            templates_item = QTreeWidgetItem(self.tree_widget)
+            templates_item.setText(0, "Role Templates")
+            templates_item.setData(0, Qt.UserRole, {"type": "templates", "id": None})
+            for template_id, name in templates:
+                template_item = QTreeWidgetItem(templates_item)
+                template_item.setText(0, name)
+                template_item.setData(0, Qt.UserRole, {"type": "template", "id": template_id})
+        
         self.tree_widget.expandAll()
-        left_layout.addWidget(self.tree_widget)
+    
+    def select_tree_item(self, data):
+        """Select the tree item with the given data and show its permissions"""
+        iterator = QTreeWidgetItemIterator(self.tree_widget)
+        while iterator.value():
+            if iterator.value().data(0, Qt.UserRole) == data:
+                self.tree_widget.setCurrentItem(iterator.value())
+                self.on_tree_item_clicked(iterator.value(), 0)
+                return True
+            iterator += 1
+        return False
+    
+    def selected_item_data(self):
+        """Data of the selected tree item, or None"""
+        current_item = self.tree_widget.currentItem()
+        return current_item.data(0, Qt.UserRole) if current_item else None
+    
+    def refresh_data(self, db_data):
+        """Show changes made to the database after this screen was built"""
+        selected = self.selected_item_data()
+        self.set_db_data(db_data)
+        self.populate_tree()
         
-        return left_widget
+        # Select the same department, position or template again and show its new state
+        if not selected or not self.select_tree_item(selected):
+            self.show_permissions({})
+            self.update_template_combo(None)
         
     def create_right_panel(self):
         """Create the right panel with system categories and checkboxes"""
@@ -252,6 +282,18 @@ class MainScreen(QMainWindow):
         right_title.setStyleSheet("color: #2c3e50; padding: 5px;")
         right_layout.addWidget(right_title)
         
+        # Role template of the selected position
+        template_row = QHBoxLayout()
+        template_label = QLabel("Role template:")
+        template_row.addWidget(template_label)
+        self.template_combo = QComboBox()
+        self.template_combo.setMinimumWidth(250)
+        self.template_combo.currentIndexChanged.connect(self.on_template_selected)
+        template_row.addWidget(self.template_combo)
+        template_row.addStretch()
+        right_layout.addLayout(template_row)
+        self.update_template_combo(None)
+        
         # Scroll area for system categories
         scroll_area = QScrollArea()
         scroll_area.setWidgetResizable(True)
@@ -316,31 +358,39 @@ class MainScreen(QMainWindow):
         data = item.data(0, Qt.UserRole)
         if not data:
             return
-            
-        # Clear all checkboxes first
-        for category_checkboxes in self.system_checkboxes.values():
-            for checkbox in category_checkboxes.values():
-                checkbox.setChecked(False)
-        
-        # Load permissions for the selected item
-        item_id = data["id"]
-        item_type = data["type"]
-        
-        # If it's a position, load saved permissions from database
-        if item_type == "position":
-            dept_id = data.get('dept_id')
-            position_id = item_id
-            
-            # Load permissions from database
-            permissions = self.load_permissions_from_database(dept_id, position_id)
-            
-            # Apply permissions to checkboxes
-            for category_id, systems in permissions.items():
-                if category_id in self.system_checkboxes:
-                    for system_id, is_enabled in systems.items():
-                        if system_id in self.system_checkboxes[category_id]:
-                            self.system_checkboxes[category_id][system_id].setChecked(is_enabled)
-            
+        
+        # Show the permissions of a position or template; only clicking a checkbox saves
+        if data["type"] == "position":
+            permissions = self.load_permissions_from_database(data["dept_id"], data["id"])
+        elif data["type"] == "template":
+            permissions = self.permission_resolver.template_permissions(data["id"])
+        else:
+            permissions = {}
+        self.show_permissions(permissions)
+        self.update_template_combo(data)
+    
+    def show_permissions(self, permissions):
+        """Tick the checkboxes of the granted systems without saving anything"""
+        for category_id, category_checkboxes in self.system_checkboxes.items():
+            for system_id, checkbox in category_checkboxes.items():
+                checkbox.blockSignals(True)
+                checkbox.setChecked(bool(permissions.get(category_id, {}).get(system_id, False)))
+                checkbox.blockSignals(False)
+    
+    def update_template_combo(self, data):
+        """List the role templates and select the one of the selected position"""
+        self.template_combo.blockSignals(True)
+        self.template_combo.clear()
+        self.template_combo.addItem("(none)", None)
+        for template_id, name in self.permission_resolver.templates():
+            self.template_combo.addItem(name, template_id)
+        is_position = bool(data) and data["type"] == "position"
+        if is_position:
+            template_id = self.permission_resolver.template_of(data["dept_id"], data["id"])
+            self.template_combo.setCurrentIndex(max(0, self.template_combo.findData(template_id)))
+        self.template_combo.setEnabled(is_position)
+        self.template_combo.blockSignals(False)
+    
     def on_checkbox_changed(self, state):
         """Handle checkbox state change"""
         checkbox = self.sender()
@@ -355,7 +405,9 @@ class MainScreen(QMainWindow):
             current_item = self.tree_widget.currentItem()
             if current_item:
                 item_data = current_item.data(0, Qt.UserRole)
-                if item_data and item_data['type'] == 'position':
+                if item_data and item_data['type'] == 'template':
+                    self.save_template_permission_to_database(item_data['id'], category_id, system_id, is_checked)
+                elif item_data and item_data['type'] == 'position':
                     dept_id = item_data.get('dept_id')
                     position_id = item_data['id']
                     
@@ -371,7 +423,70 @@ class MainScreen(QMainWindow):
                         self.access_permissions[item_key][category_id] = {}
                     
                     self.access_permissions[item_key][category_id][system_id] = is_checked
-                
+    
+    def on_template_selected(self, index):
+        """Make the selected position use the chosen role template, or none"""
+        data = self.selected_item_data()
+        if not data or data["type"] != "position":
+            return
+        template_id = self.template_combo.itemData(index)
+        
+        if template_id is not None:
+            reply = QMessageBox.question(
+                self, "Use Role Template",
+                f"'{self.tree_widget.currentItem().text(0)}' will get the access of the template "
+                f"'{self.template_combo.itemText(index)}' and lose the permissions set on it directly.\n\n"
+                f"Continue?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                self.update_template_combo(data)
+                return
+        
+        self.save_change_to_database(lambda resolver: resolver.assign_template(data["dept_id"], data["id"], template_id))
+        self.on_tree_item_clicked(self.tree_widget.currentItem(), 0)
+    
+    def new_template(self):
+        """Create a role template, starting from the access of the selected position"""
+        name, ok = QInputDialog.getText(self, "New Template", "Enter role template name:")
+        if not ok or not name.strip():
+            return
+        name = name.strip()
+        
+        if any(normalize_name(existing) == normalize_name(name) for _, existing in self.permission_resolver.templates()):
+            QMessageBox.warning(self, "Error", f"Role template '{name}' already exists!")
+            return
+        template_id = new_id()
+        
+        permissions = {}
+        data = self.selected_item_data()
+        if data and data["type"] == "position":
+            permissions = self.load_permissions_from_database(data["dept_id"], data["id"])
+        
+        if not self.save_change_to_database(lambda resolver: resolver.add_template(template_id, name, permissions)):
+            return
+        self.populate_tree()
+        self.select_tree_item({"type": "template", "id": template_id})
+    
+    def delete_template(self):
+        """Delete the selected role template; its positions keep their access"""
+        data = self.selected_item_data()
+        if not data or data["type"] != "template":
+            QMessageBox.warning(self, "Delete Template", "Select a role template in the tree first")
+            return
+        
+        reply = QMessageBox.question(
+            self, "Delete Template",
+            f"Delete the role template '{self.tree_widget.currentItem().text(0)}'?\n\n"
+            f"Positions using it keep their access as their own permissions.",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        
+        if self.save_change_to_database(lambda resolver: resolver.remove_template(data["id"])):
+            self.populate_tree()
+            self.show_permissions({})
+            self.update_template_combo(None)
+    
     def create_navigation_bar(self):
         """Create the navigation bar at the bottom of the screen"""
         nav_bar = NavigationBar(self, "main")
@@ -0,0 +1,115 @@
+import sys
+import os
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                            QTableWidget, QTableWidgetItem, QHeaderView)
+from PyQt5.QtCore import Qt, QTimer
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import metrics
+
+# Keyboard shortcut that shows or hides the overlay on every screen
+OVERLAY_SHORTCUT = "Ctrl+Shift+M"
+
+
+class MetricsOverlay(QWidget):
+    """Debug window listing the recorded timings and counters"""
+
+    REFRESH_INTERVAL_MS = 1000
+
+    def __init__(self):
+        super().__init__(None, Qt.Tool | Qt.WindowStaysOnTopHint)
+        self.setWindowTitle("Performance Metrics")
+        self.resize(640, 420)
+        # Closing the last screen must still quit the application
+        self.setAttribute(Qt.WA_QuitOnClose, False)
+
+        layout = QVBoxLayout(self)
+
+        self.timings_table = QTableWidget(0, 6)
+        self.timings_table.setHorizontalHeaderLabels(["Timing", "Count", "Mean ms", "p50 ms", "p95 ms", "Max ms"])
+        self.timings_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.timings_table.verticalHeader().setVisible(False)
+        self.timings_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.timings_table)
+
+        self.counters_label = QLabel()
+        self.counters_label.setWordWrap(True)
+        self.counters_label.setStyleSheet("color: #2c3e50; font-size: 9pt;")
+        layout.addWidget(self.counters_label)
+
+        buttons_layout = QHBoxLayout()
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #7f8c8d; font-size: 9pt;")
+        buttons_layout.addWidget(self.status_label, 1)
+
+        export_button = QPushButton("Export Snapshot")
+        export_button.clicked.connect(self.export_snapshot)
+        buttons_layout.addWidget(export_button)
+
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset_metrics)
+        buttons_layout.addWidget(reset_button)
+        layout.addLayout(buttons_layout)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.refresh_timer.start(self.REFRESH_INTERVAL_MS)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        """Reload the table from the metrics registry"""
+        snapshot = metrics.snapshot()
+        timings = snapshot["timings"]
+        self.timings_table.setRowCount(len(timings))
+        for row, (name, summary) in enumerate(timings.items()):
+            values = [name, str(summary["count"])] + [
+                f"{summary[key]:.1f}" for key in ("mean_ms", "p50_ms", "p95_ms", "max_ms")
+            ]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.timings_table.setItem(row, col, item)
+
+        counters = snapshot["counters"]
+        if counters:
+            self.counters_label.setText("Counters: " + ", ".join(f"{name} = {value}" for name, value in sorted(counters.items())))
+        else:
+            self.counters_label.setText("Counters: none")
+
+    def export_snapshot(self):
+        """Write the metrics to a JSON file next to the log"""
+        try:
+            path = metrics.export_json()
+            self.status_label.setText(f"Saved to {path}")
+        except Exception as e:
+            self.status_label.setText(f"Error exporting metrics: {str(e)}")
+
+    def reset_metrics(self):
+        """Clear the recorded metrics"""
+        metrics.reset()
+        self.status_label.setText("")
+        self.refresh()
+
+
+_overlay = None
+
+
+def toggle_metrics_overlay():
+    """Show the metrics overlay, or hide it when it is already visible"""
+    global _overlay
+    if _overlay is None:
+        _overlay = MetricsOverlay()
+    if _overlay.isVisible():
+        _overlay.hide()
+    else:
+        _overlay.show()
+        _overlay.raise_()
@@ -1,7 +1,12 @@
 import sys
-from PyQt5.QtWidgets import QFrame, QHBoxLayout, QPushButton
+import os
+from PyQt5.QtWidgets import QFrame, QHBoxLayout, QPushButton, QShortcut
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont
+from PyQt5.QtGui import QFont, QKeySequence
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import timed
 
 class NavigationBar(QFrame):
     """Shared navigation bar component for all screens"""
@@ -23,6 +28,7 @@ class NavigationBar(QFrame):
         
         self.create_layout()
         self.create_buttons()
+        self.create_shortcuts()
     
     def create_layout(self):
         """Create the navigation bar layout"""
@@ -75,6 +81,13 @@ class NavigationBar(QFrame):
         # Set button styles based on current screen
         self.update_button_styles()
     
+    def create_shortcuts(self):
+        """Install the debug shortcuts on the hosting screen"""
+        from GUI.metrics_overlay import OVERLAY_SHORTCUT, toggle_metrics_overlay
+        self.metrics_shortcut = QShortcut(QKeySequence(OVERLAY_SHORTCUT), self.parent_window or self)
+        self.metrics_shortcut.setContext(Qt.WindowShortcut)
+        self.metrics_shortcut.activated.connect(toggle_metrics_overlay)
+    
     def update_button_styles(self):
         """Update button styles based on the current screen"""
         # Common button style for inactive buttons
@@ -157,51 +170,68 @@ class NavigationBar(QFrame):
         # Exit button always has the same style
         self.exit_button.setStyleSheet(exit_style)
     
+    def save_pending_edits(self):
+        """Let the current screen save its pending edits before the next one loads the database"""
+        history = getattr(self.parent_window, "history", None)
+        return history is None or history.save_before_leaving()
+    
     def go_to_main(self):
         """Navigate to main screen"""
         if self.current_screen != "main":
+            if not self.save_pending_edits():
+                return
             try:
-                from GUI.main_screen import MainScreen
-                main_screen = MainScreen()
-                main_screen.show()
-                if self.parent_window:
-                    self.parent_window.close()
+                with timed("screen.switch.main"):
+                    from GUI.main_screen import MainScreen
+                    main_screen = MainScreen()
+                    main_screen.show()
+                    if self.parent_window:
+                        self.parent_window.close()
             except ImportError as e:
                 print(f"Failed to import main screen: {str(e)}")
     
     def go_to_departments(self):
         """Navigate to departments and positions screen"""
         if self.current_screen != "departments":
+            if not self.save_pending_edits():
+                return
             try:
-                from GUI.departments_and_positions import DepartmentsAndPositionsScreen
-                departments_screen = DepartmentsAndPositionsScreen()
-                departments_screen.show()
-                if self.parent_window:
-                    self.parent_window.close()
+                with timed("screen.switch.departments"):
+                    from GUI.departments_and_positions import DepartmentsAndPositionsScreen
+                    departments_screen = DepartmentsAndPositionsScreen()
+                    departments_screen.show()
+                    if self.parent_window:
+                        self.parent_window.close()
             except ImportError as e:
                 print(f"Failed to import departments screen: {str(e)}")
     
     def go_to_hotel_systems(self):
         """Navigate to hotel systems screen"""
         if self.current_screen != "hotel_systems":
+            if not self.save_pending_edits():
+                return
             try:
-                from GUI.hotel_systems import HotelSystemsScreen
-                hotel_systems_screen = HotelSystemsScreen()
-                hotel_systems_screen.show()
-                if self.parent_window:
-                    self.parent_window.close()
+                with timed("screen.switch.hotel_systems"):
+                    from GUI.hotel_systems import HotelSystemsScreen
+                    hotel_systems_screen = HotelSystemsScreen()
+                    hotel_systems_screen.show()
+                    if self.parent_window:
+                        self.parent_window.close()
             except ImportError as e:
                 print(f"Failed to import hotel systems screen: {str(e)}")
     
     def go_to_form(self):
         """Navigate to form screen"""
         if self.current_screen != "form":
+            if not self.save_pending_edits():
+                return
             try:
-                from GUI.Form import FormScreen
-                form_screen = FormScreen()
-                form_screen.show()
-                if self.parent_window:
-                    self.parent_window.close()
+                with timed("screen.switch.form"):
+                    from GUI.Form import FormScreen
+                    form_screen = FormScreen()
+                    form_screen.show()
+                    if self.parent_window:
+                        self.parent_window.close()
             except ImportError as e:
                 print(f"Failed to import form screen: {str(e)}")
     
@@ -0,0 +1,90 @@
+from PyQt5.QtWidgets import QCompleter
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class PersonCompletionModel(QAbstractListModel):
+    """List model over person search results, populated lazily in batches"""
+
+    BATCH_SIZE = 25
+
+    def __init__(self, search_index, parent=None):
+        super().__init__(parent)
+        self.search_index = search_index
+        self._matches = []
+        self._pending = iter(())
+        self._exhausted = True
+        self._fetching = False
+
+    def set_query(self, text):
+        """Restart the search for a new query"""
+        self.beginResetModel()
+        self._matches = []
+        self._pending = self.search_index.iter_matches(text)
+        self._exhausted = False
+        self.endResetModel()
+        # Load the first batch right away so the popup has something to show
+        self.fetchMore(QModelIndex())
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._matches)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._matches):
+            return None
+        person_id = self._matches[index.row()]
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.search_index.display_text(person_id)
+        if role == Qt.UserRole:
+            return person_id
+        return None
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent):
+        # Views may ask for more rows while a batch is being inserted
+        if parent.isValid() or self._exhausted or self._fetching:
+            return
+        self._fetching = True
+        try:
+            self._fetch_batch()
+        finally:
+            self._fetching = False
+
+    def _fetch_batch(self):
+        """Pull the next batch of matches from the search"""
+        batch = []
+        for person_id in self._pending:
+            batch.append(person_id)
+            if len(batch) >= self.BATCH_SIZE:
+                break
+        else:
+            self._exhausted = True
+        if batch:
+            first = len(self._matches)
+            self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+            self._matches.extend(batch)
+            self.endInsertRows()
+
+
+class PersonCompleter(QCompleter):
+    """Completer for the person combobox backed by a PersonSearchIndex"""
+
+    def __init__(self, search_index, parent=None):
+        super().__init__(parent)
+        self.completion_model = PersonCompletionModel(search_index, self)
+        self.setModel(self.completion_model)
+        # The model already filters and ranks, so show its rows unchanged
+        self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.setCaseSensitivity(Qt.CaseInsensitive)
+        self.setMaxVisibleItems(10)
+
+    def update_query(self, text):
+        """Refresh the suggestions for the typed text and show the popup"""
+        self.completion_model.set_query(text)
+        if self.completion_model.rowCount() > 0:
+            self.complete()
+        else:
+            self.popup().hide()
@@ -0,0 +1,67 @@
+import sys
+import os
+import importlib
+from PyQt5.QtCore import QThread, pyqtSignal
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import get_logger, timed
+
+logger = get_logger("startup")
+
+# Screens opened after the login, warmed up once the database is loaded
+SCREEN_MODULES = [
+    "GUI.Form",
+    "GUI.departments_and_positions",
+    "GUI.hotel_systems",
+]
+
+
+class StartupPrefetchThread(QThread):
+    """Loads the database and imports the heavy screens while the user logs in.
+
+    data_ready is emitted as soon as the main screen module is imported and
+    the database is loaded (or failed to load); the remaining screen modules
+    are imported afterwards so later screen switches skip the import cost.
+    With Firebase the cached copy of the last download is used first and
+    data_refreshed is emitted if Firebase turns out to have changed since.
+    """
+
+    data_ready = pyqtSignal()
+    data_refreshed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.db_data = None
+        self.error = None
+        self.is_data_ready = False
+
+    def run(self):
+        try:
+            with timed("startup.prefetch.database"):
+                # Importing main_screen also initializes db_manager (and Firebase)
+                importlib.import_module("GUI.main_screen")
+                from database.db_manager import db_manager
+                self.db_data = db_manager.load_cached_database()
+                from_cache = self.db_data is not None
+                if not from_cache:
+                    self.db_data = db_manager.load_database()
+        except Exception as e:
+            from_cache = False
+            self.error = e
+            logger.error(f"Error prefetching database: {str(e)}")
+        self.is_data_ready = True
+        self.data_ready.emit()
+
+        if from_cache:
+            fresh_data = db_manager.refresh_cached_database()
+            if fresh_data is not None:
+                self.db_data = fresh_data
+                self.data_refreshed.emit()
+
+        with timed("startup.prefetch.screens"):
+            for module_name in SCREEN_MODULES:
+                try:
+                    importlib.import_module(module_name)
+                except Exception as e:
+                    logger.error(f"Error prefetching {module_name}: {str(e)}")
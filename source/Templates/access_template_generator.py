@@ -1,7 +1,17 @@
 import datetime
+import math
 import os
 import sys
-from fpdf import FPDF
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Templates.text_metrics import CachedWidthFPDF, FIXED_CREATION_DATE
+from instrumentation import get_logger, timed
+
+logger = get_logger("templates")
+
+# Bump whenever the layout changes so previously generated forms are not reused
+TEMPLATE_VERSION = "1"
 
 # Function to get the absolute path to resources, works for both development and PyInstaller
 def resource_path(relative_path):
@@ -14,15 +24,26 @@ def resource_path(relative_path):
     
     return os.path.join(base_path, relative_path)
 
-class PDF(FPDF):
+class PDF(CachedWidthFPDF):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.set_font('Helvetica', '', 10)
         self.set_auto_page_break(auto=True, margin=15)
+        self.set_creation_date(FIXED_CREATION_DATE)
         self.form_cell_h = 7  # Height for input-like cells
         self.label_gap = 1    # Space between label and field
         self.section_gap = 4  # Space between form sections
         
+        # System section grid
+        self.system_header_h = 6    # Height of the blue section header bar
+        self.system_row_h = 5       # Height of one row of checkboxes
+        self.system_top_pad = 2     # Space between the header and the first row
+        self.system_max_cols = 4    # Columns used when the labels fit
+        self.system_padding = 4     # Horizontal padding inside the section border
+        
+        # Signatures block is anchored this far from the bottom of the page
+        self.signatures_offset = 55
+        
         # Define colors (R, G, B)
         self.col_red_600 = (220, 38, 38)
         self.col_blue_900 = (30, 58, 138)
@@ -38,7 +59,7 @@ class PDF(FPDF):
             # Logo - Adjust x, y, w, h as needed
             self.image(logo_path, x=10, y=10, w=40)
         except RuntimeError as e:
-            print(f"Error loading logo: {e}. Displaying placeholder.")
+            logger.warning(f"Error loading logo: {e}. Displaying placeholder.")
             self.set_fill_color(*self.col_gray_100)
             self.set_draw_color(*self.col_gray_400)
             self.rect(10, 10, 40, 20, 'FD')
@@ -183,23 +204,98 @@ class PDF(FPDF):
         
         self.ln(self.form_cell_h + self.section_gap) # Move down
 
-    def draw_system_section(self, title, options, checked_options=None):
+    def system_section_columns(self, options):
+        """Return how many grid columns fit the widest option label of a section"""
+        self.set_font('Helvetica', '', 8)
+        page_w = self.w - self.l_margin - self.r_margin - (2 * self.system_padding)
+        widest = max((self.get_string_width(option) for option in options), default=0)
+        for cols in range(self.system_max_cols, 1, -1):
+            # Label starts 4mm after the checkbox, keep 2mm before the next column
+            if widest + 6 <= page_w / cols:
+                return cols
+        return 1
+
+    def system_section_height(self, option_count, cols):
+        """Return the height of a system section, without the trailing gap"""
+        rows = max(1, math.ceil(option_count / cols))
+        return self.system_header_h + self.system_top_pad + rows * self.system_row_h
+
+    def signatures_top(self):
+        """Return the Y position where the signatures block starts"""
+        return self.h - self.signatures_offset
+
+    def plan_system_sections(self, sections):
+        """Measure all system sections and decide where the page breaks go.
+        
+        Args:
+            sections: List of (title, options, checked_options) tuples
+        
+        Returns:
+            List of pages, each a list of (title, options, checked_options, cols, continued)
+            chunks. A section that does not fit is split by rows and continued on the
+            next page with a repeated header.
+        """
+        pages = [[]]
+        y = self.get_y()
+        bottom = self.page_break_trigger
+        fixed_h = self.system_header_h + self.system_top_pad
+        
+        for title, options, checked_options in sections:
+            cols = self.system_section_columns(options)
+            remaining = list(options)
+            continued = False
+            while True:
+                free_rows = int((bottom - y - fixed_h) // self.system_row_h)
+                needed_rows = max(1, math.ceil(len(remaining) / cols))
+                if free_rows < min(needed_rows, 2) and y > self.t_margin:
+                    # Don't leave a header with a single row at the bottom of a page
+                    pages.append([])
+                    y = self.t_margin
+                    continue
+                rows = min(free_rows, needed_rows)
+                chunk = remaining[:rows * cols]
+                remaining = remaining[rows * cols:]
+                pages[-1].append((title, chunk, checked_options, cols, continued))
+                y += self.system_section_height(len(chunk), cols) + self.section_gap
+                if not remaining:
+                    break
+                # The rest of the section continues on the next page
+                pages.append([])
+                y = self.t_margin
+                continued = True
+        return pages
+
+    def draw_system_sections_layout(self, sections):
+        """Draw system sections across as many pages as they need"""
+        pages = self.plan_system_sections(sections)
+        for page_index, chunks in enumerate(pages):
+            if page_index > 0:
+                self.add_page()
+            for title, options, checked_options, cols, continued in chunks:
+                self.draw_system_section(title, options, checked_options, cols=cols, continued=continued)
+
+    def draw_system_section(self, title, options, checked_options=None, cols=None, continued=False):
         """Draws a bordered section for a system.
         
         Args:
             title: Section title
             options: List of system options
             checked_options: List of options that should be checked (optional)
+            cols: Number of grid columns (optional, measured from the labels when omitted)
+            continued: Whether this continues a section from the previous page
         """
         if checked_options is None:
             checked_options = []
+        if cols is None:
+            cols = self.system_section_columns(options)
             
         self.set_font('Helvetica', 'B', 9)
         self.set_fill_color(*self.col_blue_900)
         self.set_text_color(255, 255, 255)
         
         # Header bar
-        self.cell(0, 6, f"  {title.upper()}", fill=True, border=0, new_x="LMARGIN", new_y="NEXT")
+        header = f"  {title.upper()} (CONT.)" if continued else f"  {title.upper()}"
+        self.cell(0, self.system_header_h, header, fill=True, border=0, new_x="LMARGIN", new_y="NEXT")
         
         # Reset color
         self.set_text_color(0, 0, 0)
@@ -210,20 +306,19 @@ class PDF(FPDF):
         
         # Draw options
         self.set_font('Helvetica', '', 8)
-        padding = 4
+        padding = self.system_padding
         self.set_x(self.get_x() + padding)
         
-        # Calculate max columns
-        max_cols = 4
+        # Column width for the measured number of columns
         page_w = self.w - self.l_margin - self.r_margin - (2 * padding)
-        col_w = page_w / max_cols
+        col_w = page_w / cols
         
-        y_pos = self.get_y() + 2 # Start Y for checkboxes
+        y_pos = self.get_y() + self.system_top_pad # Start Y for checkboxes
         
         for i, option in enumerate(options):
-            col_index = i % max_cols
+            col_index = i % cols
             if col_index == 0 and i > 0:
-                y_pos += 5 # Move to next row
+                y_pos += self.system_row_h # Move to next row
                 
             x_pos = self.l_margin + padding + (col_w * col_index)
             self.set_xy(x_pos, y_pos)
@@ -245,7 +340,7 @@ class PDF(FPDF):
             self.cell(col_w - 4, 3, option)
 
         # Move Y down
-        self.set_y(y_pos + 5) # Move below the last row of checkboxes
+        self.set_y(y_pos + self.system_row_h) # Move below the last row of checkboxes
         
         # Draw border around the content
         end_y = self.get_y()
@@ -254,6 +349,23 @@ class PDF(FPDF):
         self.ln(self.section_gap)
 
 
+    ACKNOWLEDGEMENT_TEXT = "Yo, ____________________, he entendido y reconozco la responsabilidad de mi login name y password, así como también recibí y acepté el contenido de Las Políticas de seguridad de la información (HWI-IT-001)."
+    
+    # Height of draw_observations: label row, checkboxes and trailing space
+    OBSERVATIONS_HEIGHT = 21
+
+    def closing_sections_height(self):
+        """Return the height of the acknowledgement and observations sections"""
+        self.set_font('Helvetica', '', 7)
+        text_w = self.w - self.r_margin - (self.l_margin + 5)
+        ack_h = self.multi_cell(text_w, 3.5, self.ACKNOWLEDGEMENT_TEXT, dry_run=True, output="HEIGHT")
+        return ack_h + self.section_gap + self.OBSERVATIONS_HEIGHT
+
+    def ensure_closing_sections_space(self):
+        """Start a new page if the closing sections would run into the signatures block"""
+        if self.get_y() + self.closing_sections_height() > self.signatures_top():
+            self.add_page()
+
     def draw_acknowledgement(self):
         """Draws the acknowledgement checkbox and text."""
         self.set_font('Helvetica', '', 7)
@@ -264,8 +376,7 @@ class PDF(FPDF):
         
         # Text
         self.set_x(self.l_margin + 5)
-        ack_text = "Yo, ____________________, he entendido y reconozco la responsabilidad de mi login name y password, así como también recibí y acepté el contenido de Las Políticas de seguridad de la información (HWI-IT-001)."
-        self.multi_cell(0, 3.5, ack_text)
+        self.multi_cell(0, 3.5, self.ACKNOWLEDGEMENT_TEXT)
         
         self.ln(self.section_gap)
 
@@ -313,7 +424,10 @@ class PDF(FPDF):
 
     def draw_footer_signatures(self):
         """Draws the 5-column signature block with improved text handling and spacing."""
-        self.set_y(-55) # Position from bottom
+        # The block is always placed last; move to a new page if content already reaches it
+        if self.get_y() > self.signatures_top():
+            self.add_page()
+        self.set_y(-self.signatures_offset) # Position from bottom
         
         # Draw top border line
         self.set_draw_color(*self.col_gray_300)
@@ -433,6 +547,7 @@ def create_solicitud_pdf():
         print(f"An error occurred: {e}")
 
 
+@timed("pdf.signin.layout")
 def create_custom_pdf(name, onq_user, email, department, position, date, access_permissions, system_categories):
     """Create a custom PDF with user-provided data and access permissions."""
     
@@ -453,7 +568,8 @@ def create_custom_pdf(name, onq_user, email, department, position, date, access_
         # Draw system sections based on access permissions
         draw_system_sections(pdf, access_permissions, system_categories)
         
-        # Draw other sections
+        # Draw other sections, keeping them above the signatures block
+        pdf.ensure_closing_sections_space()
         pdf.draw_acknowledgement()
         pdf.draw_observations()
         pdf.draw_footer_signatures()
@@ -461,7 +577,7 @@ def create_custom_pdf(name, onq_user, email, department, position, date, access_
         return pdf
         
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logger.error(f"An error occurred: {e}")
         return None
 
 
@@ -578,6 +694,9 @@ def draw_form_with_data(pdf, name, onq_user, email, department, position, date):
 
 def draw_system_sections(pdf, access_permissions, system_categories):
     """Draw system sections based on access permissions"""
+    # Collect every section first so the layout pass can plan the page breaks
+    sections = []
+    
     # For each system category, check if there are access permissions
     for category in system_categories:
         category_id = category["id"]
@@ -600,7 +719,9 @@ def draw_system_sections(pdf, access_permissions, system_categories):
         # If there are accessible systems in this category, draw the section
         # with all accessible systems marked with 'x' for stylistic purposes
         if accessible_systems:
-            pdf.draw_system_section(category_name, accessible_systems, accessible_systems)
+            sections.append((category_name, accessible_systems, accessible_systems))
+    
+    pdf.draw_system_sections_layout(sections)
 
 
 if __name__ == "__main__":
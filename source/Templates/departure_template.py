@@ -1,6 +1,15 @@
-import fpdf
+import os
+import sys
 
-class SeparationChecklistPDF(fpdf.FPDF):
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Templates.text_metrics import CachedWidthFPDF, FIXED_CREATION_DATE
+from instrumentation import timed
+
+# Bump whenever the layout changes so previously generated forms are not reused
+TEMPLATE_VERSION = "1"
+
+class SeparationChecklistPDF(CachedWidthFPDF):
     """
     Custom PDF class to generate the Employee Separation Checklist.
     It recreates the structure from the provided image.
@@ -17,6 +26,7 @@ class SeparationChecklistPDF(fpdf.FPDF):
         super().__init__(*args, **kwargs)
         self.set_auto_page_break(True, margin=15)
         self.set_margins(10, 10, 10)
+        self.set_creation_date(FIXED_CREATION_DATE)
 
     def draw_section_header(self, text, subtitle='', thicker=False):
         """Draws the main blue section headers."""
@@ -81,6 +91,7 @@ class SeparationChecklistPDF(fpdf.FPDF):
         self.cell(0, self.FIELD_HEIGHT, label, border=0, ln=1, align='L')
 
 
+    @timed("pdf.departure.layout")
     def generate_checklist(self, name="", onq_user="", department="", position="", date="", access_permissions=None, system_categories=None):
         """Main method to build the entire PDF document with employee data and access permissions."""
         if access_permissions is None:
@@ -249,6 +260,8 @@ class SeparationChecklistPDF(fpdf.FPDF):
         
         # Set font for the systems list
         self.set_font('Helvetica', '', 9)
+        # Widths are measured once per name; the separator space is added on top
+        space_width = self.get_string_width(" ")
         
         # Start position
         start_x = self.get_x()
@@ -262,13 +275,12 @@ class SeparationChecklistPDF(fpdf.FPDF):
         for i, system_name in enumerate(accessible_systems):
             # Format the system name with hyphen
             system_text = f"-{system_name}"
+            text_width = self.get_string_width(system_text)
             
             # Add space between systems (except for the first one)
             if i > 0:
                 system_text = f" {system_text}"
-            
-            # Get the width of this text
-            text_width = self.get_string_width(system_text)
+                text_width += space_width
             
             # Check if we need to move to the next line
             if current_x + text_width > start_x + max_width:
@@ -276,8 +288,9 @@ class SeparationChecklistPDF(fpdf.FPDF):
                 current_x = start_x
                 current_y += line_height
                 # Remove the leading space for the first item on a new line
-                system_text = system_text.lstrip()
-                text_width = self.get_string_width(system_text)
+                if i > 0:
+                    system_text = system_text[1:]
+                    text_width -= space_width
             
             # Set position and write the text
             self.set_xy(current_x, current_y)
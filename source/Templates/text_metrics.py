@@ -0,0 +1,60 @@
+import datetime
+
+from fpdf import FPDF
+
+# Creation date of every generated PDF, fixed so identical inputs always
+# render to identical bytes
+FIXED_CREATION_DATE = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+
+# Process-wide cache of string widths, shared by every PDF document instance.
+# Keys include the font, size, stretching and spacing, so a cached width is
+# only reused when it would be measured identically.
+_width_cache = {}
+_width_cache_hits = 0
+_width_cache_misses = 0
+
+# Upper bound on cached entries; the cache is simply cleared when it is full
+WIDTH_CACHE_MAX_ENTRIES = 20000
+
+
+def width_cache_stats():
+    """Return hit/miss counters of the shared string width cache"""
+    lookups = _width_cache_hits + _width_cache_misses
+    return {
+        "hits": _width_cache_hits,
+        "misses": _width_cache_misses,
+        "entries": len(_width_cache),
+        "hit_rate": _width_cache_hits / lookups if lookups else 0.0,
+    }
+
+
+def clear_width_cache():
+    """Empty the shared string width cache and reset its counters"""
+    global _width_cache_hits, _width_cache_misses
+    _width_cache.clear()
+    _width_cache_hits = 0
+    _width_cache_misses = 0
+
+
+class CachedWidthFPDF(FPDF):
+    """FPDF base class whose get_string_width results are memoized per font and size"""
+
+    def get_string_width(self, s, normalized=False, markdown=False):
+        global _width_cache_hits, _width_cache_misses
+        # TrueType fonts are per-document and shaped, only cache the core fonts
+        if self.is_ttf_font or not self.font_family:
+            return super().get_string_width(s, normalized, markdown)
+
+        key = (self.current_font.fontkey, self.k, self.font_size_pt, self.font_stretching,
+               self.char_spacing, s, normalized, markdown)
+        width = _width_cache.get(key)
+        if width is not None:
+            _width_cache_hits += 1
+            return width
+
+        _width_cache_misses += 1
+        width = super().get_string_width(s, normalized, markdown)
+        if len(_width_cache) >= WIDTH_CACHE_MAX_ENTRIES:
+            _width_cache.clear()
+        _width_cache[key] = width
+        return width
@@ -0,0 +1,273 @@
+"""Bulk import and export of the catalog and permissions.
+
+Files are CSV (opens in Excel) or JSON lines (.jsonl), one row per
+department, position, system category, system or granted permission:
+
+    type        department | position | category | system | permission
+    department_id, department, position_id, position,
+    category_id, category, system_id, system
+
+Rows refer to entries by id or, when the id column is empty, by name
+(case-insensitive). Departments and categories named by a position, system
+or permission row are created if they do not exist, new entries without an
+id in the file get a new one (see ids.py), and rows for entries that
+already exist are counted as duplicates and skipped. Files are read and
+written one row at a time.
+
+An import is planned on a copy of the catalog first; if any row is invalid
+nothing is changed, otherwise the planned changes are applied to the
+catalog in one go and the caller saves once.
+"""
+import os
+import sys
+import csv
+from collections import Counter
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import codec
+from database.catalog import Catalog, DEPARTMENT, POSITION, CATEGORY, SYSTEM, normalize_name
+from database.roles import PermissionResolver
+
+PERMISSION = "permission"
+ROW_TYPES = (DEPARTMENT, POSITION, CATEGORY, SYSTEM, PERMISSION)
+FIELDS = ["type", "department_id", "department", "position_id", "position",
+          "category_id", "category", "system_id", "system"]
+
+CSV = "csv"
+JSONL = "jsonl"
+
+# Errors reported before an import gives up reading the file
+MAX_ERRORS = 50
+
+
+def file_format(path):
+    """CSV or JSONL, from the file extension"""
+    return JSONL if os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson") else CSV
+
+
+# --- Export ---
+
+def iter_rows(catalog):
+    """Rows describing the whole catalog and every position's effective permissions"""
+    for dept in catalog.departments():
+        yield {"type": DEPARTMENT, "department_id": dept.id, "department": dept.name}
+        for position in dept.positions:
+            yield {"type": POSITION, "department_id": dept.id, "department": dept.name,
+                   "position_id": position.id, "position": position.name}
+    for category in catalog.categories():
+        yield {"type": CATEGORY, "category_id": category.id, "category": category.name}
+        for system in category.systems:
+            yield {"type": SYSTEM, "category_id": category.id, "category": category.name,
+                   "system_id": system.id, "system": system.name}
+    # Role templates are written out as the access they give each position
+    resolver = PermissionResolver(catalog.to_dict())
+    for dept in catalog.departments():
+        for position in dept.positions:
+            for category_id, systems in resolver.effective_permissions(dept.id, position.id).items():
+                category = catalog.get_category(category_id)
+                for system_id in systems:
+                    system = catalog.get_system(category_id, system_id)
+                    # Permissions left behind by deleted systems would not import again
+                    if category is None or system is None:
+                        continue
+                    yield {"type": PERMISSION, "department_id": dept.id, "department": dept.name,
+                           "position_id": position.id, "position": position.name,
+                           "category_id": category_id, "category": category.name,
+                           "system_id": system_id, "system": system.name}
+
+
+def export_file(catalog, path):
+    """Write the catalog and permissions to a CSV or JSONL file; returns the number of rows"""
+    count = 0
+    if file_format(path) == JSONL:
+        with open(path, "wb") as f:
+            for row in iter_rows(catalog):
+                f.write(codec.dumps(row, codec.COMPACT) + b"\n")
+                count += 1
+    else:
+        # utf-8-sig so Excel shows accented names correctly
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            for row in iter_rows(catalog):
+                writer.writerow(row)
+                count += 1
+    return count
+
+
+# --- Import ---
+
+class BulkImportError(ValueError):
+    """A row that cannot be imported"""
+
+
+class ImportPlan:
+    """Changes an import would make, with counts and the rows that failed"""
+
+    def __init__(self):
+        self.operations = []
+        self.added = Counter()
+        self.duplicates = 0
+        self.errors = []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def summary(self):
+        parts = [f"{count} {_plural(kind, count)}" for kind, count in self.added.items() if count]
+        text = f"Added {', '.join(parts)}." if parts else "Nothing new to add."
+        if self.duplicates:
+            text += f" Skipped {self.duplicates} row{'s' if self.duplicates != 1 else ''} already in the database."
+        return text
+
+
+def _plural(word, count):
+    if count == 1:
+        return word
+    return word[:-1] + "ies" if word.endswith("y") else word + "s"
+
+
+def read_rows(path):
+    """Yield (line number, row dict) from a CSV or JSONL file"""
+    if file_format(path) == JSONL:
+        with open(path, "rb") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = codec.loads(line)
+                except Exception as e:
+                    raise BulkImportError(f"Line {line_number}: not valid JSON ({str(e)})")
+                if not isinstance(row, dict):
+                    raise BulkImportError(f"Line {line_number}: expected an object")
+                yield line_number, row
+    else:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            if "type" not in (reader.fieldnames or []):
+                raise BulkImportError("The file has no 'type' column")
+            for row in reader:
+                yield reader.line_num, row
+
+
+def plan_import(catalog, rows):
+    """Validate rows against a copy of the catalog and plan the changes"""
+    document = catalog.to_dict()
+    staged = Catalog(document)
+    # Access positions already have, through their role template or their own permissions
+    resolver = PermissionResolver(document)
+    plan = ImportPlan()
+    try:
+        for line_number, row in rows:
+            try:
+                _plan_row(staged, resolver, plan, _clean(row))
+            except BulkImportError as e:
+                plan.errors.append(f"Line {line_number}: {str(e)}")
+                if len(plan.errors) >= MAX_ERRORS:
+                    plan.errors.append("Too many errors, stopped reading the file")
+                    break
+    except BulkImportError as e:
+        plan.errors.append(str(e))
+    return plan
+
+
+def apply_import(catalog, plan):
+    """Make the planned changes to the catalog"""
+    for method, args in plan.operations:
+        getattr(catalog, method)(*args)
+
+
+def import_file(catalog, path):
+    """Plan an import from a file and apply it if every row is valid; returns the plan"""
+    plan = plan_import(catalog, read_rows(path))
+    if plan.ok:
+        apply_import(catalog, plan)
+    return plan
+
+
+def _clean(row):
+    row = {key: (value.strip() if isinstance(value, str) else value) for key, value in row.items() if key}
+    row["type"] = (row.get("type") or "").lower()
+    if row["type"] not in ROW_TYPES:
+        raise BulkImportError(f"unknown type '{row['type']}', expected one of {', '.join(ROW_TYPES)}")
+    return row
+
+
+def _plan_row(staged, resolver, plan, row):
+    row_type = row["type"]
+    if row_type in (DEPARTMENT, POSITION, PERMISSION):
+        dept, created = _department(staged, plan, row, create=row_type != PERMISSION)
+        if row_type == DEPARTMENT:
+            plan.duplicates += not created
+            return
+        position, created = _position(staged, plan, dept, row, create=row_type == POSITION)
+        if row_type == POSITION:
+            plan.duplicates += not created
+            return
+    category, created = _category(staged, plan, row, create=row_type != PERMISSION)
+    if row_type == CATEGORY:
+        plan.duplicates += not created
+        return
+    system, created = _system(staged, plan, category, row, create=row_type == SYSTEM)
+    if row_type == SYSTEM:
+        plan.duplicates += not created
+        return
+
+    args = (dept.id, position.id, category.id, system.id)
+    if system.id in resolver.effective_permissions(dept.id, position.id).get(category.id, {}):
+        plan.duplicates += 1
+    elif staged.grant_permission(*args):
+        plan.operations.append(("grant_permission", args))
+        plan.added[PERMISSION] += 1
+    else:
+        plan.duplicates += 1
+
+
+def _resolve(label, entry_id, name, get, find, create, add, allocate, plan, kind, parent_args=()):
+    """Existing entry by id or name, or a new one; returns (entry, created)"""
+    if entry_id:
+        entry = get(*parent_args, entry_id)
+        if entry is not None:
+            if name and normalize_name(entry.name) != normalize_name(name):
+                raise BulkImportError(f"{label} id '{entry_id}' is '{entry.name}' in the database, not '{name}'")
+            return entry, False
+        if name and find(*parent_args, name) is not None:
+            raise BulkImportError(f"{label} '{name}' already exists with the id '{find(*parent_args, name).id}'")
+    elif name:
+        entry = find(*parent_args, name)
+        if entry is not None:
+            return entry, False
+    else:
+        raise BulkImportError(f"{label} id or name is missing")
+
+    if not create:
+        raise BulkImportError(f"{label} '{entry_id or name}' does not exist")
+    if not name:
+        raise BulkImportError(f"{label} '{entry_id}' does not exist and the row has no name for it")
+    args = parent_args + (entry_id or allocate(kind, *parent_args), name)
+    entry = add(*args)
+    plan.operations.append((add.__name__, args))
+    plan.added[kind] += 1
+    return entry, True
+
+
+def _department(staged, plan, row, create):
+    return _resolve("Department", row.get("department_id"), row.get("department"), staged.get_department,
+                    staged.find_department, create, staged.add_department, staged.allocate_id, plan, DEPARTMENT)
+
+
+def _position(staged, plan, dept, row, create):
+    return _resolve("Position", row.get("position_id"), row.get("position"), staged.get_position,
+                    staged.find_position, create, staged.add_position, staged.allocate_id, plan, POSITION, (dept.id,))
+
+
+def _category(staged, plan, row, create):
+    return _resolve("Category", row.get("category_id"), row.get("category"), staged.get_category,
+                    staged.find_category, create, staged.add_category, staged.allocate_id, plan, CATEGORY)
+
+
+def _system(staged, plan, category, row, create):
+    return _resolve("System", row.get("system_id"), row.get("system"), staged.get_system,
+                    staged.find_system, create, staged.add_system, staged.allocate_id, plan, SYSTEM, (category.id,))
@@ -0,0 +1,639 @@
+import sys
+import os
+from collections import namedtuple, Counter
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.models import (Department, Position, SystemCategory, System, PermissionSet, intern_id,
+                             load_permissions, dump_permissions)
+from database.roles import TEMPLATES_KEY, ASSIGNMENTS_KEY
+from database import ids
+
+# Change actions
+INSERTED = "inserted"
+REMOVED = "removed"
+RENAMED = "renamed"
+
+# Entity kinds
+DEPARTMENT = "department"
+POSITION = "position"
+CATEGORY = "category"
+SYSTEM = "system"
+
+# A single change to the catalog. parent_id is the department or category of
+# a position or system; index is the list position of an inserted entry.
+CatalogEvent = namedtuple("CatalogEvent", ["action", "kind", "item_id", "parent_id", "index", "name"])
+
+# Kinds of dependent entries removed with a catalog entry, see Catalog.purge_orphans()
+PERMISSIONS = "permissions"
+TEMPLATE_LINKS = "template links"
+TEMPLATE_PERMISSIONS = "template permissions"
+EMPTY_CATEGORIES = "empty categories"
+
+# Top level kind -> (database key, child list attribute, child kind, group class, child class)
+_GROUPS = {
+    DEPARTMENT: ("departments", "positions", POSITION, Department, Position),
+    CATEGORY: ("system_categories", "systems", SYSTEM, SystemCategory, System),
+}
+# Child kind -> top level kind
+_PARENTS = {POSITION: DEPARTMENT, SYSTEM: CATEGORY}
+
+
+def normalize_name(name):
+    """Key used to compare names, matching the case-insensitive duplicate checks"""
+    return (name or "").strip().lower()
+
+
+class _Index:
+    """Entries of one list by id and by normalized name.
+
+    Names map to the set of ids using them, so existing duplicates in the
+    database do not hide each other when one of them is removed or renamed.
+    """
+
+    def __init__(self, entries):
+        self.by_id = {}
+        self.by_name = {}
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        # Keep the first entry when the database has duplicate ids, like the old list scans
+        self.by_id.setdefault(entry.id, entry)
+        self.by_name.setdefault(normalize_name(entry.name), set()).add(entry.id)
+
+    def discard(self, entry):
+        if self.by_id.get(entry.id) is entry:
+            del self.by_id[entry.id]
+        self._discard_name(entry.name, entry.id)
+
+    def rename(self, entry, name):
+        self._discard_name(entry.name, entry.id)
+        self.by_name.setdefault(normalize_name(name), set()).add(entry.id)
+
+    def name_taken(self, name, exclude_id=None):
+        ids = self.by_name.get(normalize_name(name), ())
+        return any(entry_id != exclude_id for entry_id in ids)
+
+    def find_by_name(self, name):
+        ids = self.by_name.get(normalize_name(name))
+        # Lowest id when the database has duplicate names, so lookups are repeatable
+        return self.by_id.get(min(ids, key=str)) if ids else None
+
+    def _discard_name(self, name, entry_id):
+        key = normalize_name(name)
+        ids = self.by_name.get(key)
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self.by_name[key]
+
+
+class Catalog:
+    """Departments/positions and system categories/systems of a database document.
+
+    All mutations go through this class, which notifies subscribed listeners
+    with one CatalogEvent per change so views can update only the affected
+    rows instead of rebuilding their trees.
+
+    Every list is indexed by id and by normalized name, and the indexes are
+    kept in sync by the mutations, so lookups and duplicate checks do not
+    scan the lists. New entries get their id from allocate_id(), and adding
+    an entry with an id that is already used raises ValueError.
+
+    The document is parsed once into the slotted classes of database.models;
+    to_dict() turns it back into the stored JSON shape for saving.
+
+    Removing a department, position, category or system also removes what
+    refers to it by id: access permissions, role template links and role
+    template permissions, so they are saved together.
+    """
+
+    def __init__(self, db_data):
+        # Keys this class does not model are kept as they are and saved back unchanged
+        self._key_order = list(db_data) or ["departments", "system_categories", "access_permissions"]
+        self._extra = {key: value for key, value in db_data.items()
+                       if key not in ("departments", "system_categories", "access_permissions")}
+        self._lists = {
+            DEPARTMENT: [Department.from_dict(dept) for dept in db_data.get("departments", [])],
+            CATEGORY: [SystemCategory.from_dict(category) for category in db_data.get("system_categories", [])],
+        }
+        self.permissions = load_permissions(db_data.get("access_permissions"))
+        self._listeners = []
+        self.rebuild_indexes()
+
+    def rebuild_indexes(self):
+        """Index the current lists, needed only if they were changed outside the catalog"""
+        self._group_index = {}
+        self._child_index = {}
+        for kind, (_, child_key, _, _, _) in _GROUPS.items():
+            groups = self._groups(kind)
+            self._group_index[kind] = _Index(groups)
+            self._child_index[kind] = {}
+            for group in groups:
+                self._child_index[kind].setdefault(group.id, _Index(getattr(group, child_key)))
+
+    def to_dict(self):
+        """Serialize the catalog to the database JSON shape"""
+        values = {
+            "departments": [dept.to_dict() for dept in self._lists[DEPARTMENT]],
+            "system_categories": [category.to_dict() for category in self._lists[CATEGORY]],
+            "access_permissions": dump_permissions(self.permissions),
+        }
+        values.update(self._extra)
+        ordered = {key: values[key] for key in self._key_order if key in values}
+        ordered.update(values)
+        return ordered
+
+    # --- Change notification ---
+
+    def subscribe(self, listener):
+        """Call listener(event) after every change"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """Stop notifying a listener"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _emit(self, action, kind, item_id, parent_id=None, index=None, name=None):
+        event = CatalogEvent(action, kind, item_id, parent_id, index, name)
+        for listener in list(self._listeners):
+            listener(event)
+
+    # --- Generic helpers ---
+
+    def _groups(self, kind):
+        return self._lists[kind]
+
+    def _find_group(self, kind, group_id):
+        return self._group_index[kind].by_id.get(group_id)
+
+    def _find_child(self, kind, group_id, child_id):
+        children = self._child_index[kind].get(group_id)
+        if children is None:
+            return None
+        return children.by_id.get(child_id)
+
+    @staticmethod
+    def _list_index(entries, entry):
+        # Identity match, dataclass entries with the same fields compare equal
+        for i, candidate in enumerate(entries):
+            if candidate is entry:
+                return i
+        return -1
+
+    def _add_group(self, kind, group_id, name):
+        group_cls = _GROUPS[kind][3]
+        if self._find_group(kind, group_id) is not None:
+            raise ValueError(f"The {kind} id '{group_id}' is already used")
+        group = group_cls(intern_id(group_id), name, [])
+        return self._insert_group(kind, group, len(self._groups(kind)))
+
+    def _insert_group(self, kind, group, index):
+        groups = self._groups(kind)
+        index = min(index, len(groups))
+        groups.insert(index, group)
+        self._group_index[kind].add(group)
+        self._child_index[kind].setdefault(group.id, _Index(getattr(group, _GROUPS[kind][1])))
+        self._emit(INSERTED, kind, group.id, index=index, name=group.name)
+        return group
+
+    def _rename_group(self, kind, group_id, name):
+        group = self._find_group(kind, group_id)
+        if group is None:
+            return False
+        self._group_index[kind].rename(group, name)
+        group.name = name
+        self._emit(RENAMED, kind, group_id, name=name)
+        return True
+
+    def _remove_group(self, kind, group_id):
+        group = self._find_group(kind, group_id)
+        if group is None:
+            return False
+        groups = self._groups(kind)
+        i = self._list_index(groups, group)
+        del groups[i]
+        self._group_index[kind].discard(group)
+        self._child_index[kind].pop(group_id, None)
+        # Index a remaining entry with the same id, if the database had duplicates
+        for other in groups:
+            if other.id == group_id:
+                self._group_index[kind].add(other)
+                self._child_index[kind][group_id] = _Index(getattr(other, _GROUPS[kind][1]))
+                break
+        self._emit(REMOVED, kind, group_id, index=i)
+        return True
+
+    def _add_child(self, kind, group_id, child_id, name):
+        child_key, child_kind, child_cls = _GROUPS[kind][1], _GROUPS[kind][2], _GROUPS[kind][4]
+        group = self._find_group(kind, group_id)
+        if group is None:
+            return None
+        if self._find_child(kind, group_id, child_id) is not None:
+            raise ValueError(f"The {child_kind} id '{child_id}' is already used in '{group_id}'")
+        child = child_cls(intern_id(child_id), name)
+        return self._insert_child(kind, group_id, child, len(getattr(group, child_key)))
+
+    def _insert_child(self, kind, group_id, child, index):
+        children = getattr(self._find_group(kind, group_id), _GROUPS[kind][1])
+        index = min(index, len(children))
+        children.insert(index, child)
+        self._child_index[kind][group_id].add(child)
+        self._emit(INSERTED, _GROUPS[kind][2], child.id, parent_id=group_id, index=index, name=child.name)
+        return child
+
+    def _rename_child(self, kind, group_id, child_id, name):
+        child = self._find_child(kind, group_id, child_id)
+        if child is None:
+            return False
+        self._child_index[kind][group_id].rename(child, name)
+        child.name = name
+        self._emit(RENAMED, _GROUPS[kind][2], child_id, parent_id=group_id, name=name)
+        return True
+
+    def _remove_child(self, kind, group_id, child_id):
+        child_key, child_kind = _GROUPS[kind][1], _GROUPS[kind][2]
+        child = self._find_child(kind, group_id, child_id)
+        if child is None:
+            return False
+        children = getattr(self._find_group(kind, group_id), child_key)
+        i = self._list_index(children, child)
+        del children[i]
+        index = self._child_index[kind][group_id]
+        index.discard(child)
+        for other in children:
+            if other.id == child_id:
+                index.add(other)
+                break
+        self._emit(REMOVED, child_kind, child_id, parent_id=group_id, index=i)
+        return True
+
+    def allocate_id(self, kind, parent_id=None):
+        """New id for a department, category, or a position or system of parent_id"""
+        if kind in _GROUPS:
+            return ids.new_id(lambda candidate: self._find_group(kind, candidate) is not None)
+        group_kind = DEPARTMENT if kind == POSITION else CATEGORY
+        return ids.new_id(lambda candidate: self._find_child(group_kind, parent_id, candidate) is not None)
+
+    def _find_group_by_name(self, kind, name):
+        return self._group_index[kind].find_by_name(name)
+
+    def _find_child_by_name(self, kind, group_id, name):
+        children = self._child_index[kind].get(group_id)
+        return children.find_by_name(name) if children is not None else None
+
+    def _group_name_taken(self, kind, name, exclude_id=None):
+        return self._group_index[kind].name_taken(name, exclude_id)
+
+    def _child_name_taken(self, kind, group_id, name, exclude_id=None):
+        children = self._child_index[kind].get(group_id)
+        return children is not None and children.name_taken(name, exclude_id)
+
+    # --- Departments and positions ---
+
+    def departments(self):
+        return self._lists[DEPARTMENT]
+
+    def get_department(self, dept_id):
+        return self._find_group(DEPARTMENT, dept_id)
+
+    def get_position(self, dept_id, pos_id):
+        return self._find_child(DEPARTMENT, dept_id, pos_id)
+
+    def find_department(self, name):
+        """Department with this name (case-insensitive), or None"""
+        return self._find_group_by_name(DEPARTMENT, name)
+
+    def find_position(self, dept_id, name):
+        """Position of the department with this name (case-insensitive), or None"""
+        return self._find_child_by_name(DEPARTMENT, dept_id, name)
+
+    def department_name_taken(self, name, exclude_id=None):
+        """True if another department already uses this name (case-insensitive)"""
+        return self._group_name_taken(DEPARTMENT, name, exclude_id)
+
+    def position_name_taken(self, dept_id, name, exclude_id=None):
+        """True if another position of the department already uses this name"""
+        return self._child_name_taken(DEPARTMENT, dept_id, name, exclude_id)
+
+    def add_department(self, dept_id, name):
+        return self._add_group(DEPARTMENT, dept_id, name)
+
+    def rename_department(self, dept_id, name):
+        return self._rename_group(DEPARTMENT, dept_id, name)
+
+    def remove_department(self, dept_id):
+        if not self._remove_group(DEPARTMENT, dept_id):
+            return False
+        # Keep the permissions of a remaining department with the same id
+        if self.get_department(dept_id) is None:
+            self._drop_position_entries(dept_id)
+        return True
+
+    def add_position(self, dept_id, pos_id, name):
+        return self._add_child(DEPARTMENT, dept_id, pos_id, name)
+
+    def rename_position(self, dept_id, pos_id, name):
+        return self._rename_child(DEPARTMENT, dept_id, pos_id, name)
+
+    def remove_position(self, dept_id, pos_id):
+        if not self._remove_child(DEPARTMENT, dept_id, pos_id):
+            return False
+        if self.get_position(dept_id, pos_id) is None:
+            self._drop_position_entries(dept_id, pos_id)
+        return True
+
+    # --- System categories and systems ---
+
+    def categories(self):
+        return self._lists[CATEGORY]
+
+    def get_category(self, category_id):
+        return self._find_group(CATEGORY, category_id)
+
+    def get_system(self, category_id, system_id):
+        return self._find_child(CATEGORY, category_id, system_id)
+
+    def find_category(self, name):
+        """Category with this name (case-insensitive), or None"""
+        return self._find_group_by_name(CATEGORY, name)
+
+    def find_system(self, category_id, name):
+        """System of the category with this name (case-insensitive), or None"""
+        return self._find_child_by_name(CATEGORY, category_id, name)
+
+    def category_name_taken(self, name, exclude_id=None):
+        """True if another category already uses this name (case-insensitive)"""
+        return self._group_name_taken(CATEGORY, name, exclude_id)
+
+    def system_name_taken(self, category_id, name, exclude_id=None):
+        """True if another system of the category already uses this name"""
+        return self._child_name_taken(CATEGORY, category_id, name, exclude_id)
+
+    def add_category(self, category_id, name):
+        return self._add_group(CATEGORY, category_id, name)
+
+    def rename_category(self, category_id, name):
+        return self._rename_group(CATEGORY, category_id, name)
+
+    def remove_category(self, category_id):
+        if not self._remove_group(CATEGORY, category_id):
+            return False
+        if self.get_category(category_id) is None:
+            self._drop_system_entries(category_id)
+        return True
+
+    def add_system(self, category_id, system_id, name):
+        return self._add_child(CATEGORY, category_id, system_id, name)
+
+    def rename_system(self, category_id, system_id, name):
+        return self._rename_child(CATEGORY, category_id, system_id, name)
+
+    def remove_system(self, category_id, system_id):
+        if not self._remove_child(CATEGORY, category_id, system_id):
+            return False
+        if self.get_system(category_id, system_id) is None:
+            self._drop_system_entries(category_id, system_id)
+        return True
+
+    # --- Any kind of entry, for undo ---
+
+    def get_entry(self, kind, item_id, parent_id=None):
+        """Department, position, category or system; parent_id is the group of a position or system"""
+        if kind in _GROUPS:
+            return self._find_group(kind, item_id)
+        return self._find_child(_PARENTS[kind], parent_id, item_id)
+
+    def entry_index(self, kind, item_id, parent_id=None):
+        """List position of an entry, or -1"""
+        entry = self.get_entry(kind, item_id, parent_id)
+        if entry is None:
+            return -1
+        if kind in _GROUPS:
+            return self._list_index(self._groups(kind), entry)
+        parent_kind = _PARENTS[kind]
+        return self._list_index(getattr(self._find_group(parent_kind, parent_id), _GROUPS[parent_kind][1]), entry)
+
+    def add_entry(self, kind, item_id, name, parent_id=None):
+        return getattr(self, f"add_{kind}")(*_entry_args(item_id, parent_id), name)
+
+    def rename_entry(self, kind, item_id, name, parent_id=None):
+        return getattr(self, f"rename_{kind}")(*_entry_args(item_id, parent_id), name)
+
+    def remove_entry(self, kind, item_id, parent_id=None):
+        return getattr(self, f"remove_{kind}")(*_entry_args(item_id, parent_id))
+
+    def insert_entry(self, kind, entry, index, parent_id=None):
+        """Put back a removed entry, with its positions or systems, at its list position"""
+        if kind in _GROUPS:
+            return self._insert_group(kind, entry, index)
+        return self._insert_child(_PARENTS[kind], parent_id, entry, index)
+
+    def dependents_state(self):
+        """Copy of the permissions and role template entries, for restore_dependents()"""
+        permissions = {dept_id: {pos_id: PermissionSet(dict(permission_set.grants), dict(permission_set.revokes))
+                                 for pos_id, permission_set in positions.items()}
+                       for dept_id, positions in self.permissions.items()}
+        # The template dicts are replaced, never changed in place, so keeping them is enough
+        return permissions, self._extra.get(TEMPLATES_KEY), self._extra.get(ASSIGNMENTS_KEY)
+
+    def restore_dependents(self, state):
+        """Put back the permissions and role template entries saved by dependents_state()"""
+        permissions, templates, assignments = state
+        self.permissions = permissions
+        for key, value in ((TEMPLATES_KEY, templates), (ASSIGNMENTS_KEY, assignments)):
+            if value is None:
+                self._extra.pop(key, None)
+            else:
+                self._extra[key] = value
+
+    # --- Access permissions ---
+
+    def get_permissions(self, dept_id, pos_id):
+        """PermissionSet of a position, or None if it has no permissions stored"""
+        return self.permissions.get(dept_id, {}).get(pos_id)
+
+    def grant_permission(self, dept_id, pos_id, category_id, system_id):
+        """Give a position access to a system; False if it already had it"""
+        positions = self.permissions.setdefault(intern_id(dept_id), {})
+        permission_set = positions.get(pos_id)
+        if permission_set is None:
+            permission_set = positions[intern_id(pos_id)] = PermissionSet({}, {})
+        if permission_set.allows(category_id, system_id):
+            return False
+        revoked = permission_set.revokes.get(category_id, ())
+        if system_id in revoked:
+            # Granting undoes taking the system away from the role template
+            permission_set.revokes[category_id] = tuple(other for other in revoked if other != system_id)
+            if not permission_set.revokes[category_id]:
+                del permission_set.revokes[category_id]
+            return True
+        systems = permission_set.grants.get(category_id, ())
+        permission_set.grants[intern_id(category_id)] = systems + (intern_id(system_id),)
+        return True
+
+    # --- Dependent entries ---
+
+    def _drop_position_entries(self, dept_id, pos_id=None):
+        """Remove the permissions and template links of a department, or of one of its positions"""
+        removed = Counter()
+        positions = self.permissions.get(dept_id)
+        if positions is not None:
+            for doomed_id in (list(positions) if pos_id is None else [pos_id] if pos_id in positions else []):
+                permission_set = positions.pop(doomed_id)
+                removed[PERMISSIONS] += _count_systems(permission_set.grants) + _count_systems(permission_set.revokes)
+            if not positions:
+                del self.permissions[dept_id]
+
+        assignments = self._extra.get(ASSIGNMENTS_KEY)
+        if assignments and dept_id in assignments:
+            # Copied rather than changed in place, the dict may still be shared with the loaded document
+            kept = {} if pos_id is None else {other_id: template_id for other_id, template_id
+                                              in assignments[dept_id].items() if other_id != pos_id}
+            removed[TEMPLATE_LINKS] += len(assignments[dept_id]) - len(kept)
+            assignments = dict(assignments)
+            if kept:
+                assignments[dept_id] = kept
+            else:
+                del assignments[dept_id]
+            self._set_extra(ASSIGNMENTS_KEY, assignments)
+        return removed
+
+    def _drop_template_link(self, dept_id, pos_id):
+        """Remove the role template link of a position, keeping its permissions"""
+        positions = dict(self._extra[ASSIGNMENTS_KEY][dept_id])
+        del positions[pos_id]
+        assignments = dict(self._extra[ASSIGNMENTS_KEY])
+        if positions:
+            assignments[dept_id] = positions
+        else:
+            del assignments[dept_id]
+        self._set_extra(ASSIGNMENTS_KEY, assignments)
+        return Counter({TEMPLATE_LINKS: 1})
+
+    def _set_extra(self, key, value):
+        """Store a role template dict, leaving the key out of the document once it is empty"""
+        if value:
+            self._extra[key] = value
+        else:
+            self._extra.pop(key, None)
+
+    def _drop_system_entries(self, category_id, system_id=None):
+        """Remove a category, or one of its systems, from every permission set and role template"""
+        removed = Counter()
+        for dept_id, positions in list(self.permissions.items()):
+            for pos_id, permission_set in list(positions.items()):
+                if category_id not in permission_set.grants and category_id not in permission_set.revokes:
+                    continue
+                removed[PERMISSIONS] += (_drop_systems(permission_set.grants, category_id, system_id)
+                                         + _drop_systems(permission_set.revokes, category_id, system_id))
+                if not permission_set.grants and not permission_set.revokes:
+                    del positions[pos_id]
+            if not positions:
+                del self.permissions[dept_id]
+
+        templates = self._extra.get(TEMPLATES_KEY)
+        for template_id, template in list((templates or {}).items()):
+            systems = (template.get("permissions") or {}).get(category_id)
+            if systems is None or (system_id is not None and system_id not in systems):
+                continue
+            permissions = dict(template["permissions"])
+            if system_id is None:
+                del permissions[category_id]
+                removed[TEMPLATE_PERMISSIONS] += len(systems)
+            else:
+                permissions[category_id] = {other_id: value for other_id, value in systems.items() if other_id != system_id}
+                if not permissions[category_id]:
+                    del permissions[category_id]
+                removed[TEMPLATE_PERMISSIONS] += 1
+            templates = dict(templates)
+            templates[template_id] = dict(template, permissions=permissions)
+            self._extra[TEMPLATES_KEY] = templates
+        return removed
+
+    def purge_orphans(self):
+        """Remove entries left behind by deletions made before they cascaded.
+
+        Returns a Counter of what was removed, by kind (PERMISSIONS,
+        TEMPLATE_LINKS, TEMPLATE_PERMISSIONS, EMPTY_CATEGORIES).
+        """
+        removed = Counter()
+        for dept_id, positions in list(self.permissions.items()):
+            if self.get_department(dept_id) is None:
+                removed += self._drop_position_entries(dept_id)
+                continue
+            for pos_id in list(positions):
+                if self.get_position(dept_id, pos_id) is None:
+                    removed += self._drop_position_entries(dept_id, pos_id)
+
+        for dept_id, positions in list((self._extra.get(ASSIGNMENTS_KEY) or {}).items()):
+            templates = self._extra.get(TEMPLATES_KEY) or {}
+            if self.get_department(dept_id) is None:
+                removed += self._drop_position_entries(dept_id)
+                continue
+            for pos_id, template_id in positions.items():
+                if self.get_position(dept_id, pos_id) is None:
+                    removed += self._drop_position_entries(dept_id, pos_id)
+                elif template_id not in templates:
+                    # The position is still there, only its link to the deleted template goes
+                    removed += self._drop_template_link(dept_id, pos_id)
+
+        referenced = {}
+        for positions in self.permissions.values():
+            for permission_set in positions.values():
+                for systems_by_category in (permission_set.grants, permission_set.revokes):
+                    for category_id, system_ids in systems_by_category.items():
+                        referenced.setdefault(category_id, set()).update(system_ids)
+        for template in (self._extra.get(TEMPLATES_KEY) or {}).values():
+            for category_id, systems in (template.get("permissions") or {}).items():
+                referenced.setdefault(category_id, set()).update(systems)
+        for category_id, system_ids in referenced.items():
+            if self.get_category(category_id) is None:
+                removed += self._drop_system_entries(category_id)
+                continue
+            for system_id in system_ids:
+                if self.get_system(category_id, system_id) is None:
+                    removed += self._drop_system_entries(category_id, system_id)
+
+        # Positions and categories stored without any system
+        for dept_id, positions in list(self.permissions.items()):
+            for pos_id, permission_set in list(positions.items()):
+                for category_id in [category_id for category_id, systems in permission_set.grants.items() if not systems]:
+                    del permission_set.grants[category_id]
+                    removed[EMPTY_CATEGORIES] += 1
+                if not permission_set.grants and not permission_set.revokes:
+                    del positions[pos_id]
+            if not positions:
+                del self.permissions[dept_id]
+        for key in (TEMPLATES_KEY, ASSIGNMENTS_KEY):
+            self._set_extra(key, self._extra.get(key))
+        return removed
+
+
+def _entry_args(item_id, parent_id):
+    return (item_id,) if parent_id is None else (parent_id, item_id)
+
+
+def _count_systems(systems_by_category):
+    return sum(len(system_ids) for system_ids in systems_by_category.values())
+
+
+def _drop_systems(systems_by_category, category_id, system_id=None):
+    """Remove a category, or one of its systems, from {category_id: (system_id, ...)}; returns how many went"""
+    system_ids = systems_by_category.get(category_id)
+    if system_ids is None:
+        return 0
+    if system_id is None:
+        del systems_by_category[category_id]
+        return len(system_ids)
+    if system_id not in system_ids:
+        return 0
+    kept = tuple(other_id for other_id in system_ids if other_id != system_id)
+    if kept:
+        systems_by_category[category_id] = kept
+    else:
+        del systems_by_category[category_id]
+    return 1
@@ -0,0 +1,200 @@
+"""Serialization of the database and persons files.
+
+Uses the fastest JSON library available (orjson, then msgspec, then the
+standard library) and supports these on-disk formats:
+
+    pretty   indented JSON, readable and diff-friendly (the default)
+    compact  JSON without whitespace
+    msgpack  binary MessagePack, needs the msgpack package
+    indexed  sections with an offset index, so the local database can be
+             memory-mapped and decoded lazily (see lazy_document.py)
+
+Reading detects the format from the file contents, so a file written in any
+format can be loaded whatever the current setting is. To get a readable copy
+of a compact or msgpack file:
+
+    python source/database/codec.py export database.json database_readable.json
+"""
+import os
+import sys
+import json
+import argparse
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PRETTY = "pretty"
+COMPACT = "compact"
+MSGPACK = "msgpack"
+INDEXED = "indexed"
+FORMATS = (PRETTY, COMPACT, MSGPACK, INDEXED)
+
+# JSON libraries in order of preference
+BACKENDS = ("orjson", "msgspec", "json")
+
+_backend = None
+
+
+def _import_backend(name):
+    """Return the module for a JSON backend, or None if it is not installed"""
+    try:
+        if name == "orjson":
+            import orjson
+            return orjson
+        if name == "msgspec":
+            import msgspec.json
+            return msgspec.json
+        return json
+    except ImportError:
+        return None
+
+
+def get_backend():
+    """Name of the JSON backend in use, chosen on first call"""
+    global _backend
+    if _backend is None:
+        preferred = os.getenv("WALDORF_JSON_BACKEND")
+        for name in ([preferred] if preferred in BACKENDS else []) + list(BACKENDS):
+            if _import_backend(name) is not None:
+                _backend = name
+                break
+    return _backend
+
+
+def set_backend(name):
+    """Force a JSON backend, e.g. to compare them in the benchmarks"""
+    global _backend
+    if name not in BACKENDS or _import_backend(name) is None:
+        raise ValueError(f"JSON backend '{name}' is not available")
+    _backend = name
+
+
+def available_backends():
+    """Names of the installed JSON backends"""
+    return [name for name in BACKENDS if _import_backend(name) is not None]
+
+
+def _encode_json(obj, pretty):
+    backend = get_backend()
+    if backend == "orjson":
+        import orjson
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if backend == "msgspec":
+        import msgspec.json
+        encoded = msgspec.json.encode(obj)
+        return msgspec.json.format(encoded, indent=2) if pretty else encoded
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decode_json(data):
+    backend = get_backend()
+    if backend == "orjson":
+        import orjson
+        return orjson.loads(data)
+    if backend == "msgspec":
+        import msgspec.json
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+
+def is_msgpack(data):
+    """True if the bytes look like MessagePack rather than JSON text"""
+    # JSON documents start with '{', '[', whitespace or a UTF-8 BOM; a msgpack
+    # map or array starts with a fixmap/fixarray/map16/map32/array16/array32 byte
+    return bool(data) and (0x80 <= data[0] <= 0x9f or data[0] in (0xdc, 0xdd, 0xde, 0xdf))
+
+
+def dumps(obj, fmt=PRETTY):
+    """Serialize obj to bytes in the given format"""
+    from database import lazy_document
+    if isinstance(obj, lazy_document.LazyDocument):
+        obj = obj.to_dict()
+    if fmt == INDEXED:
+        return lazy_document.dump_indexed(obj)
+    if fmt == MSGPACK:
+        import msgpack
+        return msgpack.packb(obj, use_bin_type=True)
+    return _encode_json(obj, pretty=(fmt != COMPACT))
+
+
+def loads(data):
+    """Deserialize bytes written by dumps() in any format"""
+    from database import lazy_document
+    if lazy_document.is_indexed(data):
+        return lazy_document.LazyDocument(data).to_dict()
+    if is_msgpack(data):
+        import msgpack
+        return msgpack.unpackb(data, raw=False)
+    if data.startswith(b"\xef\xbb\xbf"):
+        data = data[3:]
+    return _decode_json(data)
+
+
+def load_file(path):
+    """Read and deserialize a file written in any format"""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def open_lazy(path):
+    """Open a file for reading without decoding it up front when possible.
+
+    Indexed files are memory-mapped and returned as a read-only
+    LazyDocument; files in the other formats are loaded as usual.
+    """
+    from database import lazy_document
+    with open(path, "rb") as f:
+        header = f.read(len(lazy_document.MAGIC))
+    if lazy_document.is_indexed(header):
+        return lazy_document.open_mapped(path)
+    return load_file(path)
+
+
+def save_file(path, obj, fmt=PRETTY):
+    """Serialize obj and write it to path.
+
+    The data is written to a temporary file that then replaces path, so
+    other processes reading the file never see it half written.
+    """
+    from database import lazy_document
+    data = dumps(obj, fmt)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    # A lazy document still reading this file must let go of it first
+    lazy_document.release(path)
+    os.replace(temp_path, path)
+
+
+def export_readable(source_path, dest_path):
+    """Write an indented JSON copy of a file stored in any format"""
+    save_file(dest_path, load_file(source_path), PRETTY)
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Convert the database and persons files between formats")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write a readable indented JSON copy")
+    export_parser.add_argument("source")
+    export_parser.add_argument("dest")
+
+    convert_parser = subparsers.add_parser("convert", help="Rewrite a file in another format")
+    convert_parser.add_argument("source")
+    convert_parser.add_argument("dest")
+    convert_parser.add_argument("--format", choices=FORMATS, default=COMPACT)
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        export_readable(args.source, args.dest)
+    else:
+        save_file(args.dest, load_file(args.source), args.format)
+    print(f"Wrote {args.dest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
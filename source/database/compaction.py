@@ -0,0 +1,74 @@
+"""One-off removal of entries that refer to deleted catalog entries.
+
+Deleting a department, position, category or system removes the access
+permissions and role template entries that refer to it (see Catalog), but
+databases edited by older builds still hold the ones their deletions left
+behind. This removes them and reports what was reclaimed:
+
+    python source/database/compaction.py [--dry-run]
+
+The compacted document is saved like any other edit, so changes made
+elsewhere in the meantime are merged and kept.
+"""
+import os
+import sys
+import argparse
+from collections import namedtuple
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import codec
+from database.catalog import Catalog
+from database.concurrency import META_KEY
+
+# removed is a Counter by kind, the sizes are bytes of compact JSON
+CompactionReport = namedtuple("CompactionReport", ["removed", "size_before", "size_after"])
+
+
+def document_size(document):
+    """Bytes of a document as compact JSON, leaving out the _meta bookkeeping"""
+    return len(codec.dumps({key: value for key, value in document.items() if key != META_KEY}, codec.COMPACT))
+
+
+def compact(document):
+    """(compacted document, CompactionReport); the document passed in is not changed"""
+    catalog = Catalog(document)
+    removed = catalog.purge_orphans()
+    compacted = catalog.to_dict()
+    return compacted, CompactionReport(removed, document_size(document), document_size(compacted))
+
+
+def describe(report):
+    """One line summary of a compaction"""
+    if not report.removed:
+        return "No orphaned entries found"
+    parts = ", ".join(f"{kind}: {count}" for kind, count in report.removed.items() if count)
+    return (f"Removed {parts}; {report.size_before - report.size_after} bytes reclaimed "
+            f"({report.size_before} -> {report.size_after} bytes)")
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Remove permissions and role template entries "
+                                                 "that refer to deleted departments, positions or systems")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be removed without saving")
+    args = parser.parse_args(argv)
+
+    # db_manager imports config from the project root, which main.py puts on the path
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from database.db_manager import db_manager
+    compacted, report = compact(db_manager.load_database())
+    print(describe(report))
+    if not report.removed:
+        return 0
+    if args.dry_run:
+        print("Dry run, nothing was saved")
+        return 0
+    if not db_manager.save_database(compacted):
+        print("Failed to save the compacted database")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import os
+import time
+import uuid
+import socket
+import threading
+from collections import namedtuple
+
+# Key of the bookkeeping entry stored with a local database document
+META_KEY = "_meta"
+
+_MISSING = object()
+
+# Path element for an entry of a list of {"id": ...} dicts; index is where
+# the entry was in the document the path was computed from
+EntryKey = namedtuple("EntryKey", ["id", "index"])
+
+
+class LockTimeoutError(Exception):
+    """Raised when the database lock could not be acquired in time"""
+
+
+class FileLock:
+    """Cross-process lock based on exclusively creating a lock file.
+
+    Exclusive creation is atomic on local disks and on SMB network shares,
+    where fcntl/msvcrt byte-range locks are not reliable. While the lock is
+    held a background thread touches the file every stale_after / 3
+    seconds, so a slow save keeps it fresh; a lock file older than
+    stale_after seconds therefore belongs to a crashed process and is
+    removed.
+    """
+
+    def __init__(self, path, timeout=10.0, stale_after=30.0, poll_interval=0.05):
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self._fd = None
+        self._token = None
+        self._stop_heartbeat = None
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                self._fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                self._token = f"{socket.gethostname()} {os.getpid()} {uuid.uuid4().hex}".encode("utf-8")
+                os.write(self._fd, self._token)
+                self._start_heartbeat()
+                return
+            except FileExistsError:
+                self._remove_if_stale()
+            if time.monotonic() >= deadline:
+                raise LockTimeoutError(f"Timed out waiting for lock {self.path}")
+            time.sleep(self.poll_interval)
+
+    def release(self):
+        if self._fd is not None:
+            self._stop_heartbeat.set()
+            os.close(self._fd)
+            self._fd = None
+            try:
+                # Leave the file alone if another process broke the lock and holds it now
+                with open(self.path, "rb") as f:
+                    owned = f.read() == self._token
+                if owned:
+                    os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _start_heartbeat(self):
+        stop = self._stop_heartbeat = threading.Event()
+
+        def touch():
+            while not stop.wait(self.stale_after / 3):
+                try:
+                    os.utime(self.path)
+                except OSError:
+                    pass  # Removed by a process that took it as stale, release() notices
+
+        threading.Thread(target=touch, name="lock-heartbeat", daemon=True).start()
+
+    def _remove_if_stale(self):
+        try:
+            if time.time() - os.path.getmtime(self.path) > self.stale_after:
+                os.remove(self.path)
+        except OSError:
+            pass  # Released or removed by another process in the meantime
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
+
+
+def document_version(data):
+    """Version counter stored with a document, 0 if it has none"""
+    meta = data.get(META_KEY) if isinstance(data, dict) else None
+    return meta.get("version", 0) if isinstance(meta, dict) else 0
+
+
+def three_way_merge(base, ours, theirs):
+    """Merge our changes and theirs, both made from base.
+
+    Dicts are merged key by key and lists of {"id": ...} entries entry by
+    entry, so edits to different departments, positions or permissions
+    combine. When both sides changed the same value differently ours is
+    kept. Returns (merged, conflict_paths).
+    """
+    conflicts = []
+    merged = _merge(base, ours, theirs, (), conflicts)
+    return ({} if merged is _MISSING else merged), conflicts
+
+
+def merge_values(base, ours, theirs):
+    """three_way_merge for a single value where None means the value is absent.
+
+    Returns (merged or None, conflict_paths).
+    """
+    conflicts = []
+    merged = _merge(_MISSING if base is None else base, _MISSING if ours is None else ours,
+                    _MISSING if theirs is None else theirs, (), conflicts)
+    return (None if merged is _MISSING else merged), conflicts
+
+
+def changed_subtrees(base, ours, path=()):
+    """Yield (path, base_value, our_value) for the smallest subtrees that differ.
+
+    Dicts are compared key by key. Lists of {"id": ...} entries with the same
+    ids in the same order are compared entry by entry and a changed entry is
+    yielded whole, with an EntryKey as the last path element. Anything else
+    that differs (values, reordered or resized lists) is yielded as a whole.
+    Absent values are None.
+    """
+    if base == ours:
+        return
+    if isinstance(base, dict) and isinstance(ours, dict):
+        for key in list(base) + [key for key in ours if key not in base]:
+            yield from changed_subtrees(base.get(key), ours.get(key), path + (key,))
+        return
+    if (_is_id_list(base) and _is_id_list(ours)
+            and [entry["id"] for entry in base] == [entry["id"] for entry in ours]):
+        for index, (base_entry, our_entry) in enumerate(zip(base, ours)):
+            if base_entry != our_entry:
+                yield path + (EntryKey(our_entry["id"], index),), base_entry, our_entry
+        return
+    yield path, base, ours
+
+
+def _merge(base, ours, theirs, path, conflicts):
+    if ours == theirs:
+        return ours
+    if ours == base:
+        return theirs
+    if theirs == base:
+        return ours
+    if isinstance(ours, dict) and isinstance(theirs, dict):
+        base = base if isinstance(base, dict) else {}
+        return _merge_dicts(base, ours, theirs, path, conflicts)
+    if _is_id_list(ours) and _is_id_list(theirs):
+        base = base if _is_id_list(base) else []
+        return _merge_id_lists(base, ours, theirs, path, conflicts)
+    conflicts.append("/".join(str(part) for part in path))
+    return ours
+
+
+def _merge_dicts(base, ours, theirs, path, conflicts):
+    merged = {}
+    # Their key order first, then keys only we added
+    keys = list(theirs) + [key for key in ours if key not in theirs]
+    for key in keys:
+        value = _merge(base.get(key, _MISSING), ours.get(key, _MISSING),
+                       theirs.get(key, _MISSING), path + (key,), conflicts)
+        if value is not _MISSING:
+            merged[key] = value
+    return merged
+
+
+def _merge_id_lists(base, ours, theirs, path, conflicts):
+    base_by_id = {entry["id"]: entry for entry in base}
+    ours_by_id = {entry["id"]: entry for entry in ours}
+    theirs_by_id = {entry["id"]: entry for entry in theirs}
+    merged = []
+    ids = list(theirs_by_id) + [entry_id for entry_id in ours_by_id if entry_id not in theirs_by_id]
+    for entry_id in ids:
+        value = _merge(base_by_id.get(entry_id, _MISSING), ours_by_id.get(entry_id, _MISSING),
+                       theirs_by_id.get(entry_id, _MISSING), path + (entry_id,), conflicts)
+        if value is not _MISSING:
+            merged.append(value)
+    return merged
+
+
+def _is_id_list(value):
+    if not isinstance(value, list):
+        return False
+    ids = set()
+    for entry in value:
+        if not isinstance(entry, dict) or "id" not in entry or entry["id"] in ids:
+            return False
+        ids.add(entry["id"])
+    return True
@@ -1,38 +1,79 @@
 import os
 import sys
-import json
-import firebase_admin
-from firebase_admin import credentials
-from firebase_admin import db
+from collections import OrderedDict
 import config
+import startup_trace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import get_logger, metrics, timed
+from database import codec, firebase_layout, resilience
+from database.firebase_cache import SnapshotCache, CACHE_FILE_NAME, get_cache_dir
+from database.concurrency import (FileLock, EntryKey, META_KEY, document_version, three_way_merge,
+                                  merge_values, changed_subtrees)
+
+logger = get_logger("database")
 
 class DatabaseManager:
+    # Local snapshots kept as merge bases for documents loaded or saved by this process
+    MAX_LOCAL_SNAPSHOTS = 4
+    
+    # Conditional Firebase writes retried before the save gives up
+    MAX_FIREBASE_WRITE_ATTEMPTS = 10
+    
     def __init__(self):
         self.firebase_app = None
         self.firebase_initialized = False
         
+        # version -> (encoded document, file stat while the file held exactly that document or None)
+        self._local_snapshots = OrderedDict()
+        
+        # Every Firebase request goes through these, see resilience.py
+        self.firebase_retry_policy = resilience.RetryPolicy(config.db_config.firebase_attempts)
+        self.firebase_breaker = resilience.CircuitBreaker(config.db_config.firebase_breaker_threshold,
+                                                          config.db_config.firebase_breaker_reset,
+                                                          probe=self._probe_firebase)
+        
         # Initialize Firebase if needed
         if config.db_config.is_using_firebase():
             self._initialize_firebase()
     
+    @timed("db.firebase.init")
     def _initialize_firebase(self):
         """Initialize Firebase connection with service account credentials"""
         try:
             if not self.firebase_initialized:
+                # The Firebase SDK is only imported when Firebase is actually used
+                with timed("db.firebase.import"):
+                    import firebase_admin
+                    from firebase_admin import credentials
+                
                 # Check if Firebase is already initialized
                 try:
                     app = firebase_admin.get_app('waldorf_db')
                     if app:
                         self.firebase_app = app
                         self.firebase_initialized = True
-                        print("Firebase already initialized")
+                        logger.info("Firebase already initialized")
                         return
                 except ValueError:
                     pass  # App not initialized, continue with initialization
                 
                 # Initialize Firebase with service account credentials
+                service_account_path = None
                 try:
                     firebase_config = config.db_config.get_firebase_config()
+                    options = {
+                        'databaseURL': firebase_config["databaseURL"],
+                        # The SDK would otherwise wait up to two minutes for a response
+                        'httpTimeout': config.db_config.firebase_timeout
+                    }
+                    
+                    if config.db_config.firebase_emulator_host:
+                        # Requests to an emulator or local stand-in are sent without credentials
+                        self.firebase_app = firebase_admin.initialize_app(None, options, name='waldorf_db')
+                        self.firebase_initialized = True
+                        logger.info(f"Firebase initialized against {config.db_config.firebase_emulator_host}")
+                        return
                     
                     # Get the path to the service account key
                     service_account_path = firebase_config["serviceAccountKey"]
@@ -52,21 +93,16 @@ class DatabaseManager:
                     
                     # Initialize Firebase with service account credentials
                     cred = credentials.Certificate(service_account_path)
-                    self.firebase_app = firebase_admin.initialize_app(
-                        cred,
-                        {
-                            'databaseURL': firebase_config["databaseURL"]
-                        },
-                        name='waldorf_db'
-                    )
+                    self.firebase_app = firebase_admin.initialize_app(cred, options, name='waldorf_db')
                     self.firebase_initialized = True
-                    print("Firebase initialized successfully with service account")
+                    logger.info("Firebase initialized successfully with service account")
                 except Exception as auth_error:
-                    print(f"Firebase authentication failed: {str(auth_error)}")
-                    print(f"Service account path: {service_account_path}")
+                    metrics.increment("db.firebase.init.failures")
+                    logger.error(f"Firebase authentication failed: {str(auth_error)}")
+                    logger.error(f"Service account path: {service_account_path}")
                     self.firebase_initialized = False
         except Exception as e:
-            print(f"Error initializing Firebase: {str(e)}")
+            logger.error(f"Error initializing Firebase: {str(e)}")
             self.firebase_initialized = False
     
     def load_database(self):
@@ -78,26 +114,147 @@ class DatabaseManager:
         else:
             raise ValueError("No database configuration is enabled")
     
+    def _resolve_local_db_path(self):
+        """Absolute path of the local database file"""
+        db_path = config.db_config.get_local_db_path()
+        # If path is relative, make it relative to project root
+        if not os.path.isabs(db_path):
+            # Check if we're running in a PyInstaller bundle
+            if getattr(sys, 'frozen', False):
+                # We're running in a PyInstaller bundle, use the current working directory
+                db_path = os.path.join(os.getcwd(), db_path)
+            else:
+                # We're running in a normal Python environment
+                db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), db_path)
+        return db_path
+    
+    def load_database_lazy(self):
+        """Load the database for reading only, decoding sections on first use.
+
+        With the local backend and the indexed format this returns a
+        read-only mapping over the memory-mapped file; otherwise it is the
+        same as load_database().
+        """
+        if config.db_config.is_using_local():
+            return self._open_local_lazy()
+        if config.db_config.is_using_firebase():
+            return self._open_firebase_lazy()
+        return self.load_database()
+    
+    def load_cached_database(self):
+        """Last database downloaded from Firebase, possibly out of date, or None.
+
+        Lets the app start without waiting for Firebase; load_database()
+        afterwards brings it up to date.
+        """
+        if not config.db_config.is_using_firebase():
+            return None
+        cache = self._firebase_cache()
+        tree = cache.load()[0] if cache is not None else None
+        if not tree:
+            return None
+        metrics.increment("db.load.firebase.cache_starts")
+        return self._firebase_document(tree)
+    
+    @timed("db.load.firebase.refresh")
+    def refresh_cached_database(self):
+        """Check Firebase for changes since the cached copy was saved.
+
+        Returns the up to date database if it changed, otherwise None.
+        """
+        try:
+            root = self.firebase_root()
+            if root is None:
+                return None
+            tree, from_cache = self._fetch_firebase_tree(root)
+            if from_cache or not tree:
+                return None
+            return self._firebase_document(tree)
+        except Exception as e:
+            metrics.increment("db.load.firebase.failures")
+            logger.error(f"Error refreshing from Firebase: {str(e)}")
+            return None
+    
+    @timed("db.load.local.lazy")
+    def _open_local_lazy(self):
+        """Open the local database file without decoding it up front"""
+        try:
+            return codec.open_lazy(self._resolve_local_db_path())
+        except Exception as e:
+            metrics.increment("db.load.local.failures")
+            logger.error(f"Error opening local database: {str(e)}")
+            return {"departments": [], "system_categories": [], "access_permissions": {}}
+    
+    @timed("db.load.firebase.lazy")
+    def _open_firebase_lazy(self):
+        """Load the catalog from Firebase and, with the sharded layout, permissions on first use"""
+        try:
+            cache = self._firebase_cache()
+            root = self.firebase_root()
+            # With a cached copy one conditional request is cheaper than several small ones
+            if root is not None and not (cache is not None and cache.exists()):
+                if self._detect_firebase_layout(root) == firebase_layout.SHARDED:
+                    return firebase_layout.open_sharded(root, self._get_firebase)
+        except Exception as e:
+            metrics.increment("db.load.firebase.failures")
+            logger.error(f"Error opening Firebase database: {str(e)}")
+        return self._load_from_firebase()
+    
+    def firebase_root(self):
+        """Reference to the Firebase root, or None if Firebase is unavailable"""
+        if not self.firebase_initialized:
+            self._initialize_firebase()
+        if not self.firebase_initialized:
+            return None
+        from firebase_admin import db
+        return db.reference('/', app=self.firebase_app)
+    
+    def _call_firebase(self, name, operation):
+        """Run a Firebase request with retries, unless Firebase is known to be down"""
+        return resilience.call(operation, name, self.firebase_retry_policy, self.firebase_breaker)
+    
+    def _get_firebase(self, ref, **kwargs):
+        """ref.get() with retries"""
+        return self._call_firebase(f"get {ref.path}", lambda: ref.get(**kwargs))
+    
+    def _detect_firebase_layout(self, root):
+        return self._call_firebase("layout check", lambda: firebase_layout.detect_layout(root))
+    
+    def _probe_firebase(self):
+        """Cheap request the circuit breaker uses to see whether Firebase is back"""
+        root = self.firebase_root()
+        if root is None:
+            raise resilience.CircuitOpenError("Firebase is not initialized")
+        root.get(shallow=True)
+    
+    def _load_local_replica(self):
+        """Data to show while Firebase is unreachable: the cached download, else the local file"""
+        cached = self.load_cached_database()
+        if cached is not None:
+            logger.warning("Using the last data downloaded from Firebase")
+            return cached
+        logger.warning("Falling back to local database")
+        return self._load_from_local()
+    
+    @timed("db.load.local")
     def _load_from_local(self):
-        """Load database from local JSON file"""
+        """Load database from the local file, in any of the codec formats"""
         try:
-            db_path = config.db_config.get_local_db_path()
-            # If path is relative, make it relative to project root
-            if not os.path.isabs(db_path):
-                # Check if we're running in a PyInstaller bundle
-                if getattr(sys, 'frozen', False):
-                    # We're running in a PyInstaller bundle, use the current working directory
-                    db_path = os.path.join(os.getcwd(), db_path)
-                else:
-                    # We're running in a normal Python environment
-                    db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), db_path)
+            db_path = self._resolve_local_db_path()
+            
+            data, raw, file_stat = self._read_local(db_path)
             
-            with open(db_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            # Remember what was loaded, it is the merge base when this document is saved
+            version = document_version(data)
+            data.setdefault(META_KEY, {})["version"] = version
+            self._remember_local_snapshot(version, raw, file_stat)
+            return data
         except Exception as e:
-            print(f"Error loading local database: {str(e)}")
+            metrics.increment("db.load.local.failures")
+            logger.error(f"Error loading local database: {str(e)}")
             return {"departments": [], "system_categories": [], "access_permissions": {}}
     
+    @timed("db.load.firebase")
     def _load_from_firebase(self):
         """Load database from Firebase Realtime Database"""
         try:
@@ -105,20 +262,24 @@ class DatabaseManager:
                 self._initialize_firebase()
             
             if self.firebase_initialized:
+                from firebase_admin import db
                 ref = db.reference('/', app=self.firebase_app)
-                data = ref.get()
+                data, _ = self._fetch_firebase_tree(ref)
                 if data:
-                    return data
+                    return self._firebase_document(data)
                 else:
-                    print("No data found in Firebase, returning empty structure")
+                    logger.warning("No data found in Firebase, returning empty structure")
                     return {"departments": [], "system_categories": [], "access_permissions": {}}
             else:
-                print("Firebase not initialized, falling back to local database")
-                return self._load_from_local()
+                logger.warning("Firebase not initialized")
+                return self._load_local_replica()
+        except resilience.CircuitOpenError as e:
+            logger.info(str(e))
+            return self._load_local_replica()
         except Exception as e:
-            print(f"Error loading from Firebase: {str(e)}")
-            print("Falling back to local database")
-            return self._load_from_local()
+            metrics.increment("db.load.firebase.failures")
+            logger.error(f"Error loading from Firebase: {str(e)}")
+            return self._load_local_replica()
     
     def save_database(self, data):
         """Save database to either local file or Firebase"""
@@ -129,54 +290,251 @@ class DatabaseManager:
         else:
             raise ValueError("No database configuration is enabled")
     
+    @timed("db.save.local")
     def _save_to_local(self, data):
-        """Save database to local JSON file"""
+        """Save database to the local file in the configured format.
+
+        The file may be shared by several PCs. The save holds a lock file and,
+        if another process saved since this document was loaded, merges the
+        changes made here into the current file instead of overwriting it.
+        The document's version is updated in place.
+        """
         try:
-            db_path = config.db_config.get_local_db_path()
-            # If path is relative, make it relative to project root
-            if not os.path.isabs(db_path):
-                # Check if we're running in a PyInstaller bundle
-                if getattr(sys, 'frozen', False):
-                    # We're running in a PyInstaller bundle, use the current working directory
-                    db_path = os.path.join(os.getcwd(), db_path)
-                else:
-                    # We're running in a normal Python environment
-                    db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), db_path)
+            db_path = self._resolve_local_db_path()
             
             # Ensure directory exists
             os.makedirs(os.path.dirname(db_path), exist_ok=True)
             
-            with open(db_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with FileLock(db_path + ".lock"):
+                merged, current_version, merged_is_ours = self._merge_with_current(db_path, data)
+                new_version = current_version + 1
+                merged[META_KEY] = dict(data.get(META_KEY) or {}, version=new_version)
+                merged[META_KEY].pop("snapshot", None)
+                codec.save_file(db_path, merged, config.db_config.data_format)
+                file_stat = self._stat_local(db_path)
+            
+            data.setdefault(META_KEY, {})["version"] = new_version
+            # The next save of this document diffs against what it held now
+            self._remember_local_snapshot(new_version, codec.dumps(
+                                              {key: value for key, value in data.items() if key != META_KEY},
+                                              codec.COMPACT),
+                                          file_stat if merged_is_ours else None)
             return True
         except Exception as e:
-            print(f"Error saving local database: {str(e)}")
+            metrics.increment("db.save.local.failures")
+            logger.error(f"Error saving local database: {str(e)}")
             return False
     
-    def _save_to_firebase(self, data):
-        """Save database to Firebase Realtime Database"""
+    def _merge_with_current(self, db_path, data):
+        """Return (document to write, version of the file on disk, whether it is data unchanged)"""
+        base_version = data.get(META_KEY, {}).get("version") if isinstance(data.get(META_KEY), dict) else None
+        snapshot = self._local_snapshots.get(base_version)
+        file_stat = self._stat_local(db_path)
+        ours = {key: value for key, value in data.items() if key != META_KEY}
+        
+        if file_stat is None:
+            return ours, 0, True
+        if snapshot is not None and snapshot[1] is not None and snapshot[1] == file_stat:
+            # Nobody wrote the file since it held this document's base
+            return ours, base_version, True
+        
+        current, _, _ = self._read_local(db_path)
+        current_version = document_version(current)
+        if snapshot is None:
+            if base_version is not None and base_version != current_version:
+                metrics.increment("db.save.local.unmerged")
+                logger.warning(f"No merge base for version {base_version}, overwriting version {current_version}")
+            return ours, current_version, True
+        
+        theirs = {key: value for key, value in current.items() if key != META_KEY}
+        base = {key: value for key, value in codec.loads(snapshot[0]).items() if key != META_KEY}
+        with timed("db.save.local.merge"):
+            merged, conflicts = three_way_merge(base, ours, theirs)
+        metrics.increment("db.save.local.merges")
+        if conflicts:
+            metrics.increment("db.save.local.conflicts", len(conflicts))
+            logger.warning(f"Concurrent edits to the same values, keeping this PC's: {', '.join(conflicts[:20])}")
+        return merged, current_version, merged == ours
+    
+    def _read_local(self, db_path):
+        """Read the local file, returning (document, raw bytes, file stat)"""
+        with open(db_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            raw = f.read()
+        return codec.loads(raw), raw, (stat.st_mtime_ns, stat.st_size)
+    
+    def _stat_local(self, db_path):
+        """(mtime, size) of the local file, or None if it does not exist"""
+        try:
+            stat = os.stat(db_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _remember_local_snapshot(self, version, raw, file_stat):
+        """Keep a document as the merge base for its version"""
+        self._local_snapshots[version] = (raw, file_stat)
+        self._local_snapshots.move_to_end(version)
+        while len(self._local_snapshots) > self.MAX_LOCAL_SNAPSHOTS:
+            self._local_snapshots.popitem(last=False)
+    
+    def _fetch_firebase_tree(self, ref):
+        """Download the Firebase tree unless the cached copy is still current.
+
+        Returns (tree, True if it is the cached copy).
+        """
+        cache = self._firebase_cache()
+        tree, etag = cache.load() if cache is not None else (None, None)
+        if tree is not None:
+            changed, new_tree, new_etag = self._call_firebase("load", lambda: ref.get_if_changed(etag))
+            if not changed:
+                metrics.increment("db.load.firebase.cache_hits")
+                return tree, True
+            tree, etag = new_tree, new_etag
+        else:
+            tree, etag = self._call_firebase("load", lambda: ref.get(etag=True))
+        
+        metrics.increment("db.load.firebase.downloads")
+        if cache is not None and tree:
+            cache.store(tree, etag)
+        return tree, False
+    
+    def _firebase_document(self, tree):
+        """Database document of a Firebase tree in either layout"""
+        data = firebase_layout.from_sharded(tree) if firebase_layout.is_sharded(tree) else tree
+        # Later saves send only what changed since this snapshot, which the document keeps with it
+        data[META_KEY] = {"snapshot": self._firebase_snapshot(data)}
+        return data
+    
+    def _firebase_cache(self):
+        """Cache of the last Firebase download, or None if it is disabled"""
+        path = config.db_config.firebase_cache_path
+        if path is None:
+            path = os.path.join(get_cache_dir(), CACHE_FILE_NAME)
+        if not path:
+            return None
+        return SnapshotCache(path, config.db_config.firebase_database_url)
+    
+    @timed("db.save.firebase")
+    def _save_to_firebase(self, data, overwrite=False):
+        """Save database to Firebase Realtime Database.
+
+        Only what changed since the document was loaded is written, merged
+        with concurrent edits. With overwrite a document not loaded from
+        Firebase replaces the whole tree; without it such a save fails.
+        """
         try:
             if not self.firebase_initialized:
                 self._initialize_firebase()
             
             if self.firebase_initialized:
+                from firebase_admin import db
                 ref = db.reference('/', app=self.firebase_app)
-                ref.set(data)
+                ours = {key: value for key, value in data.items() if key != META_KEY}
+                meta = data.get(META_KEY)
+                snapshot = meta.get("snapshot") if isinstance(meta, dict) else None
+                
+                # Another PC may have migrated the layout since this document was loaded
+                layout = self._detect_firebase_layout(ref)
+                
+                if snapshot is None:
+                    # Not loaded from Firebase, nothing to diff against
+                    if not overwrite:
+                        metrics.increment("db.save.firebase.unmerged")
+                        logger.error("Document was not loaded from Firebase, refusing to overwrite the whole "
+                                     "database; reload it and make the changes again")
+                        return False
+                    tree = firebase_layout.to_sharded(ours) if layout == firebase_layout.SHARDED else ours
+                    self._call_firebase("save", lambda: ref.set(tree))
+                else:
+                    # Write only the changed subtrees, each atomically
+                    base = {key: value for key, value in codec.loads(snapshot).items() if key != META_KEY}
+                    for path, base_value, our_value in changed_subtrees(base, ours):
+                        # A retry redoes the read and merge, so it is safe after a partial attempt
+                        self._call_firebase(f"save {self._firebase_path(path, layout)}",
+                                            lambda: self._write_firebase_subtree(ref, path, base_value,
+                                                                                 our_value, layout))
+                
+                data.setdefault(META_KEY, {})["snapshot"] = self._firebase_snapshot(ours)
                 return True
             else:
-                print("Firebase not initialized, cannot save")
+                logger.error("Firebase not initialized, cannot save")
                 return False
         except Exception as e:
-            print(f"Error saving to Firebase: {str(e)}")
+            metrics.increment("db.save.firebase.failures")
+            logger.error(f"Error saving to Firebase: {str(e)}")
             return False
     
+    def _write_firebase_subtree(self, root, path, base_value, our_value, layout):
+        """Apply one changed subtree to Firebase without overwriting concurrent edits"""
+        ref = root.child(self._firebase_path(path, layout))
+        
+        if not isinstance(path[-1], EntryKey) and not isinstance(base_value, (dict, list)) \
+                and not isinstance(our_value, (dict, list)):
+            # A single value: a plain set or delete is already atomic
+            metrics.increment("db.save.firebase.value_writes")
+            if our_value is None:
+                ref.delete()
+            else:
+                ref.set(our_value)
+            return
+        
+        # A subtree: read it with its ETag, re-apply the local change on top of the
+        # current value and write it back only if nobody changed it in between
+        entry_key = path[-1] if isinstance(path[-1], EntryKey) else None
+        value, etag = ref.get(etag=True)
+        for attempt in range(self.MAX_FIREBASE_WRITE_ATTEMPTS):
+            if entry_key is not None and (not isinstance(value, dict) or value.get("id") != entry_key.id):
+                # The list changed shape remotely, find where the entry is now
+                ref = self._locate_firebase_entry(root, path, layout)
+                if ref is None:
+                    logger.warning(f"{self._firebase_path(path[:-1], layout)}/{entry_key.id} was deleted remotely, "
+                                   f"dropping the local change")
+                    return
+                value, etag = ref.get(etag=True)
+                continue
+            
+            merged, conflicts = merge_values(base_value, our_value, value)
+            if conflicts:
+                metrics.increment("db.save.firebase.conflicts", len(conflicts))
+                paths = [f"{ref.path}/{conflict}" if conflict else ref.path for conflict in conflicts[:20]]
+                logger.warning(f"Concurrent edits to {ref.path}, keeping this PC's: {', '.join(paths)}")
+            
+            # Writing an empty object removes the node
+            success, value, etag = ref.set_if_unchanged(etag, merged if merged is not None else {})
+            metrics.increment("db.save.firebase.conditional_writes")
+            if success:
+                return
+            metrics.increment("db.save.firebase.retries")
+        
+        raise RuntimeError(f"Gave up writing {ref.path} after {self.MAX_FIREBASE_WRITE_ATTEMPTS} attempts")
+    
+    def _locate_firebase_entry(self, root, path, layout):
+        """Reference to a list entry by id after it moved, or None if it is gone"""
+        entries = root.child(self._firebase_path(path[:-1], layout)).get()
+        if isinstance(entries, dict):
+            entries = [entries[key] for key in sorted(entries, key=int)] if all(k.isdigit() for k in entries) else []
+        for index, entry in enumerate(entries or []):
+            if isinstance(entry, dict) and entry.get("id") == path[-1].id:
+                return root.child(self._firebase_path(path[:-1] + (EntryKey(entry["id"], index),), layout))
+        return None
+    
+    def _firebase_path(self, path, layout):
+        """Firebase path of a changed subtree, list entries by their index"""
+        path = firebase_layout.storage_path(path, layout)
+        return "/".join(str(part.index) if isinstance(part, EntryKey) else str(part) for part in path)
+    
+    def _firebase_snapshot(self, data):
+        """Encoded copy of a Firebase document, the base of its next save"""
+        return codec.dumps({key: value for key, value in data.items() if key != META_KEY}, codec.COMPACT)
+    
     def sync_to_firebase(self):
         """Sync local database to Firebase"""
         if config.db_config.is_using_firebase():
             local_data = self._load_from_local()
-            return self._save_to_firebase(local_data)
+            return self._save_to_firebase(local_data, overwrite=True)
         else:
-            print("Firebase is not enabled in configuration")
+            logger.warning("Firebase is not enabled in configuration")
             return False
     
     def sync_from_firebase(self):
@@ -185,7 +543,7 @@ class DatabaseManager:
             firebase_data = self._load_from_firebase()
             return self._save_to_local(firebase_data)
         else:
-            print("Firebase is not enabled in configuration")
+            logger.warning("Firebase is not enabled in configuration")
             return False
     
     def switch_database(self, db_type: str):
@@ -195,17 +553,17 @@ class DatabaseManager:
                 config.db_config.switch_to_local()
                 # Reinitialize if needed
                 if self.firebase_initialized:
-                    print("Note: Firebase connection remains active but local database will be used")
+                    logger.info("Note: Firebase connection remains active but local database will be used")
             elif db_type.lower() == "firebase":
                 config.db_config.switch_to_firebase()
                 if not self.firebase_initialized:
                     self._initialize_firebase()
             else:
-                print(f"Unknown database type: {db_type}")
+                logger.error(f"Unknown database type: {db_type}")
                 return False
             return True
         except Exception as e:
-            print(f"Error switching database: {str(e)}")
+            logger.error(f"Error switching database: {str(e)}")
             return False
     
     def get_current_database_type(self) -> str:
@@ -213,4 +571,5 @@ class DatabaseManager:
         return config.db_config.database_type.value
 
 # Create a singleton instance
-db_manager = DatabaseManager()
\ No newline at end of file
+with startup_trace.phase("db.init"):
+    db_manager = DatabaseManager()
\ No newline at end of file
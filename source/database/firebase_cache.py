@@ -0,0 +1,63 @@
+"""Local copy of the last database downloaded from Firebase.
+
+The copy is stored with the ETag Firebase returned for it, so a later load
+asks Firebase whether the database changed since and only downloads it
+again if it did. It is kept in the user's app data folder, apart from the
+local database file, and is never written back to Firebase.
+"""
+import os
+import sys
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import get_logger
+from database import codec
+
+logger = get_logger("database")
+
+CACHE_FILE_NAME = "firebase_snapshot.json"
+
+
+def get_cache_dir():
+    """Return the directory for cached copies of remote data"""
+    base_dir = os.getenv("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base_dir, "WaldorfAccessFormGenerator", "cache")
+
+
+class SnapshotCache:
+    """The cached Firebase tree of one database URL and its ETag"""
+
+    def __init__(self, path, database_url):
+        self.path = path
+        self.database_url = database_url
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        """Return (tree, etag), or (None, None) if there is no usable copy"""
+        if not self.exists():
+            return None, None
+        try:
+            entry = codec.load_file(self.path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable Firebase cache {self.path}: {str(e)}")
+            return None, None
+        if entry.get("database_url") != self.database_url or not entry.get("etag"):
+            return None, None
+        return entry.get("tree"), entry["etag"]
+
+    def store(self, tree, etag):
+        """Replace the cached copy; failures only cost the next load a download"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            codec.save_file(self.path, {"database_url": self.database_url, "etag": etag, "tree": tree},
+                            codec.COMPACT)
+        except Exception as e:
+            logger.warning(f"Could not update the Firebase cache {self.path}: {str(e)}")
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,214 @@
+"""Layouts of the database in Firebase and migration between them.
+
+single   the database document is the Firebase root, as it always was:
+         /departments, /system_categories, /access_permissions/...
+sharded  the catalog and the permissions are stored apart, with each
+         position's permissions at its own path:
+             /schema                          {"layout": "sharded"}
+             /catalog/departments, /catalog/system_categories, ...
+             /permissions/{dept_id}/{pos_id}  {category_id: {system_id: true}}
+
+With the sharded layout the Form screen reads the catalog and then only the
+permissions of the position it generates a form for, and lists departments
+and positions that have permissions with shallow queries instead of
+downloading every permission set. The layout in use is read from /schema,
+so every PC follows a migration on its next load. Update all PCs to a build
+that knows the sharded layout before migrating:
+
+    python source/database/firebase_layout.py migrate --to sharded
+    python source/database/firebase_layout.py migrate --to single
+"""
+import os
+import sys
+import argparse
+from collections.abc import Mapping
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.concurrency import META_KEY
+
+SINGLE = "single"
+SHARDED = "sharded"
+LAYOUTS = (SINGLE, SHARDED)
+
+SCHEMA_KEY = "schema"
+CATALOG_KEY = "catalog"
+SHARDED_PERMISSIONS_KEY = "permissions"
+PERMISSIONS_KEY = "access_permissions"
+
+
+def detect_layout(root):
+    """Layout of the database under a Firebase root reference"""
+    return SHARDED if is_sharded({SCHEMA_KEY: root.child(SCHEMA_KEY).get()}) else SINGLE
+
+
+def is_sharded(tree):
+    """True if a whole Firebase tree is stored in the sharded layout"""
+    schema = tree.get(SCHEMA_KEY) if isinstance(tree, dict) else None
+    return isinstance(schema, dict) and schema.get("layout") == SHARDED
+
+
+def to_sharded(document):
+    """Firebase tree of a database document in the sharded layout"""
+    catalog = {key: value for key, value in document.items() if key not in (PERMISSIONS_KEY, META_KEY)}
+    return {
+        SCHEMA_KEY: {"layout": SHARDED},
+        CATALOG_KEY: catalog,
+        SHARDED_PERMISSIONS_KEY: document.get(PERMISSIONS_KEY) or {},
+    }
+
+
+def from_sharded(tree):
+    """Database document stored as a sharded Firebase tree"""
+    document = dict((tree or {}).get(CATALOG_KEY) or {})
+    document[PERMISSIONS_KEY] = (tree or {}).get(SHARDED_PERMISSIONS_KEY) or {}
+    return document
+
+
+def storage_path(path, layout):
+    """Firebase path elements of a path into the database document"""
+    if layout != SHARDED or not path:
+        return path
+    if path[0] == PERMISSIONS_KEY:
+        return (SHARDED_PERMISSIONS_KEY,) + tuple(path[1:])
+    return (CATALOG_KEY,) + tuple(path)
+
+
+def _get(ref, **kwargs):
+    return ref.get(**kwargs)
+
+
+def open_sharded(root, get=_get):
+    """Database document for reading that fetches permissions per position.
+
+    get(ref, **kwargs) performs every read, e.g. to add retries.
+    """
+    document = dict(get(root.child(CATALOG_KEY)) or {})
+    document[PERMISSIONS_KEY] = ShardedPermissions(root.child(SHARDED_PERMISSIONS_KEY), get)
+    return document
+
+
+class ShardedPermissions(Mapping):
+    """access_permissions of a sharded database, fetched on first access"""
+
+    def __init__(self, ref, get=_get):
+        self._ref = ref
+        self._get = get
+        self._departments = {}
+        self._keys = None
+
+    def _listing(self):
+        if self._keys is None:
+            # Shallow: only the department ids, not their permissions
+            self._keys = list(self._get(self._ref, shallow=True) or {})
+        return self._keys
+
+    def __getitem__(self, dept_id):
+        if not isinstance(dept_id, str) or not dept_id:
+            raise KeyError(dept_id)
+        if dept_id not in self._departments:
+            self._departments[dept_id] = _ShardedPositionPermissions(self._ref.child(dept_id), self._get)
+        return self._departments[dept_id]
+
+    def __contains__(self, dept_id):
+        return dept_id in self._listing()
+
+    def __iter__(self):
+        return iter(self._listing())
+
+    def __len__(self):
+        return len(self._listing())
+
+    def to_dict(self):
+        return self._get(self._ref) or {}
+
+
+class _ShardedPositionPermissions(Mapping):
+    """Permissions of the positions of one department, fetched per position"""
+
+    def __init__(self, ref, get=_get):
+        self._ref = ref
+        self._get = get
+        self._cache = {}
+        self._keys = None
+
+    def _listing(self):
+        if self._keys is None:
+            self._keys = list(self._get(self._ref, shallow=True) or {})
+        return self._keys
+
+    def __getitem__(self, pos_id):
+        if not isinstance(pos_id, str) or not pos_id:
+            raise KeyError(pos_id)
+        if pos_id not in self._cache:
+            self._cache[pos_id] = self._get(self._ref.child(pos_id))
+        if self._cache[pos_id] is None:
+            raise KeyError(pos_id)
+        return self._cache[pos_id]
+
+    def __contains__(self, pos_id):
+        return pos_id in self._listing()
+
+    def __iter__(self):
+        return iter(self._listing())
+
+    def __len__(self):
+        return len(self._listing())
+
+    def to_dict(self):
+        return self._get(self._ref) or {}
+
+
+def migrate(root, target, dry_run=False):
+    """Rewrite the database under root in the target layout.
+
+    The whole tree is replaced with a single conditional write, so a save
+    made by another PC during the migration makes it fail instead of being
+    lost. Returns False if the database already uses the target layout.
+    """
+    tree, etag = root.get(etag=True)
+    tree = tree or {}
+    current = SHARDED if is_sharded(tree) else SINGLE
+    if current == target:
+        return False
+
+    document = from_sharded(tree) if current == SHARDED else tree
+    new_tree = to_sharded(document) if target == SHARDED else document
+    if dry_run:
+        return True
+
+    success, _, _ = root.set_if_unchanged(etag, new_tree)
+    if not success:
+        raise RuntimeError("The database changed during the migration, run it again")
+    return True
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Change the layout of the database in Firebase")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Rewrite the database in another layout")
+    migrate_parser.add_argument("--to", choices=LAYOUTS, required=True, dest="target")
+    migrate_parser.add_argument("--dry-run", action="store_true", help="Check without writing anything")
+
+    args = parser.parse_args(argv)
+    # db_manager imports config from the project root, which main.py puts on the path
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from database.db_manager import db_manager
+    root = db_manager.firebase_root()
+    if root is None:
+        print("Firebase is not configured or could not be initialized")
+        return 1
+
+    if not migrate(root, args.target, args.dry_run):
+        print(f"The database already uses the {args.target} layout")
+    elif args.dry_run:
+        print(f"The database would be migrated to the {args.target} layout")
+    else:
+        print(f"Migrated the database to the {args.target} layout")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import datetime
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import get_logger
+
+logger = get_logger("database")
+
+# File name prefixes written by the form screen, mapped to their form type
+FORM_FILE_TYPES = {
+    "sign_in_form_": "sign_in",
+    "departure_form_": "departure",
+}
+
+FORM_FILE_PATTERN = re.compile(r"^(sign_in_form_|departure_form_)(\d{8}_\d{6})\.pdf$")
+
+
+def permissions_hash(access_permissions):
+    """Return a stable hash of the granted systems in a permissions tree"""
+    granted = sorted(
+        (category_id, system_id)
+        for category_id, systems in (access_permissions or {}).items()
+        for system_id, enabled in systems.items()
+        if enabled
+    )
+    return hashlib.sha256(json.dumps(granted).encode("utf-8")).hexdigest()[:16]
+
+
+def form_content_hash(form_type, template_version, fields, access_permissions, system_categories):
+    """Return a hash of everything that determines the bytes of a generated form.
+
+    Permissions are resolved against the catalog (category and system names in
+    catalog order), so renaming a system produces a different document.
+    """
+    resolved = []
+    for category in system_categories or []:
+        category_access = (access_permissions or {}).get(category["id"], {})
+        granted = [system["name"] for system in category.get("systems", []) if category_access.get(system["id"], False)]
+        if granted:
+            resolved.append([category["name"], granted])
+    payload = {
+        "form_type": form_type,
+        "template_version": template_version,
+        "fields": fields,
+        "permissions": resolved,
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class FormsArchive:
+    """Catalog of the documents generated in a generated_forms directory.
+
+    Records are appended to a JSON-lines index inside the forms directory and
+    kept in memory keyed by person, so a person's history is a dictionary
+    lookup instead of a walk over the (possibly network) directory tree.
+    """
+
+    INDEX_FILE = "forms_index.jsonl"
+    STATE_FILE = "forms_index_state.json"
+
+    def __init__(self, forms_dir):
+        self.forms_dir = forms_dir
+        self.index_path = os.path.join(forms_dir, self.INDEX_FILE)
+        self.state_path = os.path.join(forms_dir, self.STATE_FILE)
+        self._by_path = {}
+        self._by_person_id = {}
+        self._by_person_name = {}
+        self._by_content_hash = {}
+        self._folder_mtimes = {}
+        self._load()
+
+    def _load(self):
+        """Load the index and scanner state from the forms directory"""
+        try:
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line:
+                            self._add_to_memory(json.loads(line))
+        except Exception as e:
+            logger.warning(f"Error loading forms index: {str(e)}")
+
+        try:
+            if os.path.exists(self.state_path):
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    self._folder_mtimes = json.load(f)
+        except Exception as e:
+            logger.warning(f"Error loading forms index state: {str(e)}")
+            self._folder_mtimes = {}
+
+    def _add_to_memory(self, record):
+        """Index a record by path, person id and person name"""
+        path = record["path"]
+        if path in self._by_path:
+            return False
+        self._by_path[path] = record
+        if record.get("person_id"):
+            self._by_person_id.setdefault(record["person_id"], []).append(record)
+        if record.get("person_name"):
+            self._by_person_name.setdefault(record["person_name"].lower(), []).append(record)
+        if record.get("content_hash"):
+            self._by_content_hash[record["content_hash"]] = record
+        return True
+
+    def _append_records(self, records):
+        """Append records to the JSON-lines index file"""
+        try:
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            return True
+        except Exception as e:
+            logger.exception(f"Error writing forms index: {str(e)}")
+            return False
+
+    def _relative_path(self, path):
+        """Store paths relative to the forms directory so mapped drives still match"""
+        try:
+            return os.path.relpath(path, self.forms_dir).replace("\\", "/")
+        except ValueError:
+            # Different drive on Windows, keep the absolute path
+            return path
+
+    def absolute_path(self, record):
+        """Return the absolute path of a recorded document"""
+        return os.path.normpath(os.path.join(self.forms_dir, record["path"]))
+
+    def record(self, form_type, output_path, person_id=None, person_name="",
+               form_date="", access_permissions=None, generated_at=None, content_hash=None):
+        """Record a newly generated document and return its catalog entry"""
+        record = {
+            "person_id": person_id,
+            "person_name": person_name,
+            "form_type": form_type,
+            "form_date": form_date,
+            "generated_at": generated_at or datetime.datetime.now().isoformat(timespec="seconds"),
+            "permissions_hash": permissions_hash(access_permissions) if access_permissions is not None else None,
+            "path": self._relative_path(output_path),
+            "content_hash": content_hash,
+        }
+        if self._add_to_memory(record):
+            self._append_records([record])
+        return record
+
+    def find_by_content_hash(self, content_hash):
+        """Return the path of an existing document with this content hash, if any"""
+        record = self._by_content_hash.get(content_hash)
+        if record:
+            path = self.absolute_path(record)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def history(self, person_id=None, person_name=None):
+        """Return the documents of a person, newest first"""
+        records = {}
+        if person_id:
+            for record in self._by_person_id.get(person_id, []):
+                records[record["path"]] = record
+        if person_name:
+            for record in self._by_person_name.get(person_name.lower(), []):
+                records[record["path"]] = record
+        return sorted(records.values(), key=lambda r: r.get("generated_at") or "", reverse=True)
+
+    def scan(self, persons_data=None):
+        """Index documents that exist on disk but are missing from the catalog.
+
+        Only person folders whose modification time changed since the last
+        scan are listed, so repeated scans of a large share stay cheap.
+        Returns the number of documents added.
+        """
+        if not os.path.isdir(self.forms_dir):
+            return 0
+
+        # Person folders are named after the person with spaces as underscores
+        folder_to_person = {}
+        for person_id, person_info in (persons_data or {}).items():
+            folder_to_person.setdefault(person_info["name"].replace(' ', '_'), (person_id, person_info["name"]))
+
+        new_records = []
+        state_changed = False
+        try:
+            with os.scandir(self.forms_dir) as entries:
+                for entry in entries:
+                    if not entry.is_dir():
+                        continue
+                    mtime = entry.stat().st_mtime
+                    if self._folder_mtimes.get(entry.name) == mtime:
+                        continue
+                    person_id, person_name = folder_to_person.get(entry.name, (None, entry.name.replace('_', ' ')))
+                    new_records.extend(self._scan_folder(entry.path, person_id, person_name))
+                    self._folder_mtimes[entry.name] = mtime
+                    state_changed = True
+        except Exception as e:
+            logger.exception(f"Error scanning generated forms: {str(e)}")
+
+        if new_records:
+            self._append_records(new_records)
+        if state_changed:
+            self._save_state()
+        return len(new_records)
+
+    def _scan_folder(self, folder_path, person_id, person_name):
+        """Return catalog records for unindexed documents in a person folder"""
+        records = []
+        with os.scandir(folder_path) as files:
+            for file_entry in files:
+                match = FORM_FILE_PATTERN.match(file_entry.name)
+                if not match or not file_entry.is_file():
+                    continue
+                relative_path = self._relative_path(file_entry.path)
+                if relative_path in self._by_path:
+                    continue
+                generated_at = datetime.datetime.strptime(match.group(2), '%Y%m%d_%H%M%S')
+                record = {
+                    "person_id": person_id,
+                    "person_name": person_name,
+                    "form_type": FORM_FILE_TYPES[match.group(1)],
+                    "form_date": "",
+                    "generated_at": generated_at.isoformat(timespec="seconds"),
+                    "permissions_hash": None,
+                    "path": relative_path,
+                    "content_hash": None,
+                }
+                self._add_to_memory(record)
+                records.append(record)
+        return records
+
+    def _save_state(self):
+        """Persist the folder modification times seen by the scanner"""
+        try:
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                json.dump(self._folder_mtimes, f, indent=2)
+        except Exception as e:
+            logger.warning(f"Error saving forms index state: {str(e)}")
@@ -0,0 +1,64 @@
+"""Ids for new departments, positions, categories, systems and role templates.
+
+Ids used to be made from names (lowercased, accents dropped), so two
+different names could get the same id. New ids are ULIDs: 26 characters
+holding the creation time in milliseconds and 80 random bits, e.g.
+01M59JGW5QD2CXKG2AHQZJZTRM. Two workstations adding entries at the same
+moment, even offline, get different ids without asking Firebase, and ids
+made later sort after earlier ones. Ids already in the database are kept
+as they are.
+"""
+import os
+import time
+import threading
+
+# Crockford base32, the ULID alphabet: no I, L, O or U
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+_LENGTH = 26
+
+
+def _encode(value):
+    chars = []
+    for _ in range(_LENGTH):
+        value, digit = divmod(value, 32)
+        chars.append(_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+class IdAllocator:
+    """Makes ULIDs, increasing within this process even within one millisecond"""
+
+    def __init__(self, clock=time.time, random_bytes=os.urandom):
+        self._clock = clock
+        self._random_bytes = random_bytes
+        self._last_time = -1
+        self._last_random = 0
+        self._lock = threading.Lock()
+
+    def new_id(self, taken=None):
+        """A new id; taken(id) checks an index of the ids in use, for the clash that should never come"""
+        while True:
+            with self._lock:
+                now = int(self._clock() * 1000)
+                if now > self._last_time:
+                    randomness = int.from_bytes(self._random_bytes(_RANDOM_BITS // 8), "big")
+                else:
+                    # Same millisecond (or the clock went back): count up from the last id
+                    now = self._last_time
+                    randomness = self._last_random + 1
+                    if randomness >> _RANDOM_BITS:
+                        now, randomness = now + 1, 0
+                self._last_time, self._last_random = now, randomness
+            new_id = _encode((now << _RANDOM_BITS) | randomness)
+            if taken is None or not taken(new_id):
+                return new_id
+
+
+# Shared by the whole application
+allocator = IdAllocator()
+
+
+def new_id(taken=None):
+    """A new id from the shared allocator"""
+    return allocator.new_id(taken)
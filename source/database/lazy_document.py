@@ -0,0 +1,213 @@
+"""Indexed database format that can be decoded one section at a time.
+
+Layout of an indexed file:
+
+    b"WALDIDX1"                 magic
+    8 bytes, little endian      length of the index
+    index                       compact JSON, see dump_indexed()
+    sections                    compact JSON of each department, system
+                                category, position permission set and
+                                other top-level value, back to back
+
+The index stores the offset and length of every section, so a
+LazyDocument opened over a memory-mapped file only decodes the sections
+that are read. The Form screen, for example, reads the department and
+category lists and one position's permissions instead of every
+permission set.
+"""
+import os
+import sys
+import mmap
+import weakref
+from collections.abc import Mapping
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import codec
+
+MAGIC = b"WALDIDX1"
+_HEADER_SIZE = len(MAGIC) + 8
+
+# Lists decoded as a whole on first access, with one section per entry
+_LIST_KEYS = ("departments", "system_categories")
+_PERMISSIONS_KEY = "access_permissions"
+
+# Weak references to the documents reading from a memory-mapped file, by
+# normalized path; a file can be open in several documents at once
+_mapped_documents = {}
+
+
+def is_indexed(data):
+    """True if the bytes start with the indexed format header"""
+    return data[:len(MAGIC)] == MAGIC
+
+
+def dump_indexed(obj):
+    """Serialize a database document to the indexed format"""
+    sections = []
+    offset = 0
+
+    def add(value):
+        nonlocal offset
+        data = codec.dumps(value, codec.COMPACT)
+        sections.append(data)
+        entry = [offset, len(data)]
+        offset += len(data)
+        return entry
+
+    # departments/system_categories: [[id, offset, length], ...]
+    # access_permissions: [[dept_id, [[pos_id, offset, length], ...]], ...]
+    # other: {key: [offset, length]}
+    index = {"keys": list(obj), "other": {}}
+    for key, value in obj.items():
+        if key in _LIST_KEYS:
+            index[key] = [[entry.get("id")] + add(entry) for entry in value]
+        elif key == _PERMISSIONS_KEY:
+            index[key] = [[dept_id, [[pos_id] + add(grants) for pos_id, grants in positions.items()]]
+                          for dept_id, positions in value.items()]
+        else:
+            index["other"][key] = add(value)
+
+    header = codec.dumps(index, codec.COMPACT)
+    return MAGIC + len(header).to_bytes(8, "little") + header + b"".join(sections)
+
+
+def open_mapped(path):
+    """Open an indexed file as a LazyDocument backed by a memory map"""
+    f = open(path, "rb")
+    try:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except Exception:
+        f.close()
+        raise
+    document = LazyDocument(buffer, file=f)
+    key = _path_key(path)
+    # LazyDocument is a Mapping and so unhashable, which rules out a WeakSet
+    live = [ref for ref in _mapped_documents.get(key, ()) if ref() is not None]
+    live.append(weakref.ref(document))
+    _mapped_documents[key] = live
+    return document
+
+
+def release(path):
+    """Stop mapping a file that is about to be overwritten.
+
+    Windows refuses to truncate a file with an open mapping, so before a
+    save the document reading it copies the file into memory and keeps
+    decoding from the copy, which is still the snapshot it was opened on.
+    Every document still open on the file is detached.
+    """
+    for ref in _mapped_documents.pop(_path_key(path), ()):
+        document = ref()
+        if document is not None:
+            document.detach()
+
+
+def _path_key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+class LazyDocument(Mapping):
+    """Read-only view of an indexed database document.
+
+    Behaves like the dict returned by load_database(); sections are decoded
+    on first access and cached. Use to_dict() for a mutable copy.
+    """
+
+    def __init__(self, buffer, file=None):
+        if not is_indexed(buffer[:len(MAGIC)]):
+            raise ValueError("Not an indexed database file")
+        self._buffer = buffer
+        self._file = file
+        index_length = int.from_bytes(buffer[len(MAGIC):_HEADER_SIZE], "little")
+        self._index = codec.loads(bytes(buffer[_HEADER_SIZE:_HEADER_SIZE + index_length]))
+        self._base = _HEADER_SIZE + index_length
+        self._cache = {}
+
+    def _decode(self, offset, length):
+        start = self._base + offset
+        return codec.loads(bytes(self._buffer[start:start + length]))
+
+    def __getitem__(self, key):
+        if key in self._cache:
+            return self._cache[key]
+        if key in _LIST_KEYS and key in self._index:
+            value = [self._decode(offset, length) for _, offset, length in self._index[key]]
+        elif key == _PERMISSIONS_KEY and key in self._index:
+            value = LazyPermissions(self, self._index[key])
+        elif key in self._index["other"]:
+            value = self._decode(*self._index["other"][key])
+        else:
+            raise KeyError(key)
+        self._cache[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._index["keys"])
+
+    def __len__(self):
+        return len(self._index["keys"])
+
+    def to_dict(self):
+        """Decode every section into a plain, mutable document"""
+        data = {}
+        for key in self:
+            value = self[key]
+            if isinstance(value, LazyPermissions):
+                value = value.to_dict()
+            data[key] = value
+        return data
+
+    def detach(self):
+        """Copy the mapped file into memory and close the mapping"""
+        if isinstance(self._buffer, mmap.mmap):
+            data = self._buffer[:]
+            self._buffer.close()
+            self._buffer = data
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class LazyPermissions(Mapping):
+    """access_permissions of a LazyDocument: {dept_id: {pos_id: permissions}}"""
+
+    def __init__(self, document, index):
+        self._departments = {dept_id: _LazyPositionPermissions(document, positions)
+                             for dept_id, positions in index}
+
+    def __getitem__(self, dept_id):
+        return self._departments[dept_id]
+
+    def __iter__(self):
+        return iter(self._departments)
+
+    def __len__(self):
+        return len(self._departments)
+
+    def to_dict(self):
+        return {dept_id: positions.to_dict() for dept_id, positions in self._departments.items()}
+
+
+class _LazyPositionPermissions(Mapping):
+    """Permissions of the positions of one department, decoded per position"""
+
+    def __init__(self, document, positions):
+        self._document = document
+        self._locations = {pos_id: (offset, length) for pos_id, offset, length in positions}
+        self._cache = {}
+
+    def __getitem__(self, pos_id):
+        if pos_id not in self._cache:
+            offset, length = self._locations[pos_id]
+            self._cache[pos_id] = self._document._decode(offset, length)
+        return self._cache[pos_id]
+
+    def __iter__(self):
+        return iter(self._locations)
+
+    def __len__(self):
+        return len(self._locations)
+
+    def to_dict(self):
+        return {pos_id: self[pos_id] for pos_id in self}
@@ -0,0 +1,127 @@
+import sys
+from dataclasses import dataclass
+
+
+def intern_id(value):
+    """Intern string ids so every reference to the same id shares one object"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# The classes declare __slots__ themselves (rather than dataclass(slots=True))
+# so they also work on the Python versions older builds were made with.
+
+@dataclass
+class Position:
+    """A position within a department"""
+    __slots__ = ("id", "name")
+    id: str
+    name: str
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(intern_id(data.get("id")), data.get("name", ""))
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name}
+
+
+@dataclass
+class Department:
+    """A hotel department and its positions"""
+    __slots__ = ("id", "name", "positions")
+    id: str
+    name: str
+    positions: list
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(intern_id(data.get("id")), data.get("name", ""),
+                   [Position.from_dict(pos) for pos in data.get("positions", [])])
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name,
+                "positions": [pos.to_dict() for pos in self.positions]}
+
+
+@dataclass
+class System:
+    """A hotel system a position can be given access to"""
+    __slots__ = ("id", "name")
+    id: str
+    name: str
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(intern_id(data.get("id")), data.get("name", ""))
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name}
+
+
+@dataclass
+class SystemCategory:
+    """A group of systems shown together on the forms"""
+    __slots__ = ("id", "name", "systems")
+    id: str
+    name: str
+    systems: list
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(intern_id(data.get("id")), data.get("name", ""),
+                   [System.from_dict(system) for system in data.get("systems", [])])
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name,
+                "systems": [system.to_dict() for system in self.systems]}
+
+
+@dataclass
+class PermissionSet:
+    """Systems granted to one position, as {category_id: (system_id, ...)}.
+
+    revokes holds the systems stored as false, which take access away from
+    the position's role template (see roles.py).
+    """
+    __slots__ = ("grants", "revokes")
+    grants: dict
+    revokes: dict
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from the stored {category_id: {system_id: True/False}} shape"""
+        grants, revokes = {}, {}
+        for category_id, systems in (data or {}).items():
+            category_id = intern_id(category_id)
+            granted = tuple(intern_id(system_id) for system_id, is_granted in systems.items() if is_granted)
+            revoked = tuple(intern_id(system_id) for system_id, is_granted in systems.items() if is_granted is False)
+            if granted or not revoked:
+                grants[category_id] = granted
+            if revoked:
+                revokes[category_id] = revoked
+        return cls(grants, revokes)
+
+    def to_dict(self):
+        data = {category_id: {system_id: True for system_id in system_ids}
+                for category_id, system_ids in self.grants.items()}
+        for category_id, system_ids in self.revokes.items():
+            data.setdefault(category_id, {}).update((system_id, False) for system_id in system_ids)
+        return data
+
+    def allows(self, category_id, system_id):
+        return system_id in self.grants.get(category_id, ())
+
+
+def load_permissions(data):
+    """Parse access_permissions into {dept_id: {pos_id: PermissionSet}}"""
+    return {
+        intern_id(dept_id): {intern_id(pos_id): PermissionSet.from_dict(grants)
+                             for pos_id, grants in positions.items()}
+        for dept_id, positions in (data or {}).items()
+    }
+
+
+def dump_permissions(permissions):
+    """Serialize permissions back to the stored access_permissions shape"""
+    return {dept_id: {pos_id: permission_set.to_dict() for pos_id, permission_set in positions.items()}
+            for dept_id, positions in permissions.items()}
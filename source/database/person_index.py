@@ -0,0 +1,173 @@
+import bisect
+import math
+import unicodedata
+
+
+def normalize_text(text):
+    """Lowercase text and strip accents so 'José' and 'jose' match"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def person_display_text(person_info):
+    """Build the text shown for a person in the person combobox"""
+    return f"{person_info['name']} ({person_info['email']})"
+
+
+class PersonSearchIndex:
+    """Search index over the persons registry.
+
+    Combines a sorted prefix index (every word of the name, the full name and
+    the email) with a trigram index used for typo-tolerant matching, so lookups
+    do not need to scan every registered person.
+    """
+
+    # Minimum share of query trigrams a person must contain to be a fuzzy match
+    FUZZY_THRESHOLD = 0.6
+
+    def __init__(self, persons_data=None):
+        self._tokens = []          # Sorted list of (token, person_id)
+        self._trigrams = None      # trigram -> set of person_ids, built on first fuzzy lookup
+        self._display = {}         # person_id -> display text
+        self._by_display = {}      # normalized display text -> person_id
+        self._person_tokens = {}   # person_id -> tokens, to take a person out again
+        if persons_data:
+            self.build(persons_data)
+
+    def __len__(self):
+        return len(self._display)
+
+    def build(self, persons_data):
+        """Rebuild the index from a persons dictionary {person_id: info}"""
+        self._tokens = []
+        self._trigrams = None
+        self._display = {}
+        self._by_display = {}
+        self._person_tokens = {}
+        for person_id, person_info in persons_data.items():
+            self._index_person(person_id, person_info, sort_tokens=False)
+        self._tokens.sort()
+
+    def add(self, person_id, person_info):
+        """Add a single person to the index, replacing what was indexed for them before"""
+        self.remove(person_id)
+        self._index_person(person_id, person_info, sort_tokens=True)
+
+    def remove(self, person_id):
+        """Take a person out of the index; False if they were not in it"""
+        display = self._display.pop(person_id, None)
+        if display is None:
+            return False
+        normalized = normalize_text(display)
+        if self._by_display.get(normalized) == person_id:
+            del self._by_display[normalized]
+
+        for token in self._person_tokens.pop(person_id, ()):
+            i = bisect.bisect_left(self._tokens, (token, person_id))
+            if i < len(self._tokens) and self._tokens[i] == (token, person_id):
+                del self._tokens[i]
+
+        if self._trigrams is not None:
+            for trigram in self._trigrams_of(normalized):
+                person_ids = self._trigrams.get(trigram)
+                if person_ids is not None:
+                    person_ids.discard(person_id)
+                    if not person_ids:
+                        del self._trigrams[trigram]
+        return True
+
+    def _index_person(self, person_id, person_info, sort_tokens):
+        """Register the tokens and trigrams of a person"""
+        display = person_display_text(person_info)
+        normalized = normalize_text(display)
+        self._display[person_id] = display
+        self._by_display[normalized] = person_id
+
+        name = normalize_text(person_info.get("name", ""))
+        email = normalize_text(person_info.get("email", ""))
+        tokens = set(name.split())
+        tokens.update(t for t in (name, email) if t)
+        self._person_tokens[person_id] = tuple(tokens)
+        for token in tokens:
+            if sort_tokens:
+                bisect.insort(self._tokens, (token, person_id))
+            else:
+                self._tokens.append((token, person_id))
+
+        if self._trigrams is not None:
+            self._add_trigrams(person_id, normalized)
+
+    def _add_trigrams(self, person_id, normalized):
+        """Register the trigrams of a person's normalized display text"""
+        for trigram in self._trigrams_of(normalized):
+            self._trigrams.setdefault(trigram, set()).add(person_id)
+
+    def _ensure_trigrams(self):
+        """Build the trigram index the first time a fuzzy lookup needs it"""
+        if self._trigrams is None:
+            self._trigrams = {}
+            for person_id, display in self._display.items():
+                self._add_trigrams(person_id, normalize_text(display))
+
+    @staticmethod
+    def _trigrams_of(text):
+        """Return the set of trigrams of a padded string"""
+        padded = f"  {text} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def display_text(self, person_id):
+        """Return the display text of an indexed person"""
+        return self._display.get(person_id, "")
+
+    def find_exact(self, text):
+        """Return the person whose display text equals text (case-insensitive)"""
+        return self._by_display.get(normalize_text(text))
+
+    def iter_matches(self, query):
+        """Yield matching person ids, best matches first.
+
+        Results are produced lazily: exact matches, then prefix matches, then
+        fuzzy (trigram) matches, so callers can stop after the first few.
+        """
+        query = normalize_text(query)
+        if not query:
+            return
+        seen = set()
+
+        exact = self._by_display.get(query)
+        if exact is not None:
+            seen.add(exact)
+            yield exact
+
+        # Prefix matches: walk the sorted token list from the query position
+        start = bisect.bisect_left(self._tokens, (query,))
+        for i in range(start, len(self._tokens)):
+            token, person_id = self._tokens[i]
+            if not token.startswith(query):
+                break
+            if person_id not in seen:
+                seen.add(person_id)
+                yield person_id
+
+        # Fuzzy matches: rank candidates by the number of shared trigrams
+        self._ensure_trigrams()
+        query_trigrams = self._trigrams_of(query)
+        scores = {}
+        for trigram in query_trigrams:
+            for person_id in self._trigrams.get(trigram, ()):
+                if person_id not in seen:
+                    scores[person_id] = scores.get(person_id, 0) + 1
+        min_score = max(1, math.ceil(len(query_trigrams) * self.FUZZY_THRESHOLD))
+        ranked = sorted((item for item in scores.items() if item[1] >= min_score),
+                        key=lambda item: (-item[1], self._display[item[0]]))
+        for person_id, _ in ranked:
+            yield person_id
+
+    def search(self, query, limit=20):
+        """Return up to limit matching person ids, best matches first"""
+        results = []
+        for person_id in self.iter_matches(query):
+            results.append(person_id)
+            if len(results) >= limit:
+                break
+        return results
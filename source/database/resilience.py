@@ -0,0 +1,142 @@
+"""Retries and a circuit breaker for calls to Firebase.
+
+A call that fails with a transient error (timeout, connection refused or
+reset, 5xx) is retried after an exponentially growing, jittered delay.
+When calls keep failing the circuit breaker opens: further calls fail at
+once with CircuitOpenError, so screens fall back to the local copy instead
+of each waiting for the timeout, while a background probe checks every few
+seconds whether Firebase is reachable again and closes the breaker when it
+is.
+"""
+import os
+import sys
+import time
+import random
+import threading
+
+# Add the parent directory to the path to import other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import get_logger, metrics
+
+logger = get_logger("database")
+
+# firebase_admin error codes worth retrying
+TRANSIENT_CODES = ("UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL", "UNKNOWN")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Firebase while the circuit breaker is open"""
+
+
+def is_transient(error):
+    """True if a failed call may succeed when tried again"""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    code = getattr(error, "code", None)
+    return isinstance(code, str) and code.upper() in TRANSIENT_CODES
+
+
+class RetryPolicy:
+    """How often and how long to wait before retrying a failed call"""
+
+    def __init__(self, attempts=3, base_delay=0.25, max_delay=4.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, retry):
+        """Seconds to wait before the given retry (0 for the first), with full jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+
+class CircuitBreaker:
+    """Stops calling a service after repeated failures until a probe succeeds.
+
+    probe is called from a background thread every reset_after seconds
+    while the breaker is open; when it returns without raising the breaker
+    closes again.
+    """
+
+    def __init__(self, failure_threshold=3, reset_after=30.0, probe=None):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_after = reset_after
+        self.probe = probe
+        self._failures = 0
+        self._open = False
+        self._timer = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._open
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._close()
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if not self._open and self._failures >= self.failure_threshold:
+                self._open = True
+                metrics.increment("firebase.breaker.opened")
+                logger.warning(f"Firebase failed {self._failures} times in a row, "
+                               f"using local data until it is reachable again")
+                self._schedule_probe()
+
+    def _close(self):
+        if self._open:
+            self._open = False
+            logger.info("Firebase is reachable again")
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _schedule_probe(self):
+        if self.probe is None:
+            return
+        self._timer = threading.Timer(self.reset_after, self._run_probe)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run_probe(self):
+        try:
+            self.probe()
+        except Exception as e:
+            metrics.increment("firebase.breaker.probe_failures")
+            logger.debug(f"Firebase probe failed: {str(e)}")
+            with self._lock:
+                if self._open:
+                    self._schedule_probe()
+            return
+        self.record_success()
+
+
+def call(operation, name, policy, breaker, sleep=time.sleep):
+    """Run operation() with retries, unless the breaker is open.
+
+    Errors that are not transient (permission denied, invalid data) are
+    raised at once and do not count against the breaker.
+    """
+    if breaker.is_open:
+        metrics.increment("firebase.breaker.short_circuits")
+        raise CircuitOpenError(f"Firebase is unavailable, skipped {name}")
+
+    for attempt in range(policy.attempts):
+        try:
+            result = operation()
+        except Exception as e:
+            if not is_transient(e):
+                raise
+            if attempt == policy.attempts - 1:
+                metrics.increment("firebase.failures")
+                breaker.record_failure()
+                raise
+            metrics.increment("firebase.retries")
+            delay = policy.delay(attempt)
+            logger.warning(f"{name} failed ({str(e)}), retrying in {delay:.2f}s")
+            sleep(delay)
+        else:
+            breaker.record_success()
+            return result
@@ -0,0 +1,162 @@
+"""Role templates: permission sets that positions inherit.
+
+Stored next to access_permissions in the database document:
+
+    "role_templates":     {template_id: {"name": ..., "permissions": {category_id: {system_id: true}}}}
+    "position_templates": {dept_id: {pos_id: template_id}}
+
+For a position with a template, its access_permissions entry only holds
+the differences: true grants a system the template lacks and false takes
+away one the template grants. Positions without a template store their
+permissions exactly as before, so a database without templates is
+unchanged.
+
+Read permissions through PermissionResolver.effective_permissions(), which
+merges the two and remembers the result until the template or the
+position's overrides change through the resolver.
+"""
+
+TEMPLATES_KEY = "role_templates"
+ASSIGNMENTS_KEY = "position_templates"
+PERMISSIONS_KEY = "access_permissions"
+
+
+def resolve(template_permissions, overrides):
+    """Effective {category_id: {system_id: True}} of a template and a position's overrides"""
+    effective = {}
+    for category_id, systems in (template_permissions or {}).items():
+        granted = {system_id: True for system_id, is_granted in systems.items() if is_granted}
+        if granted:
+            effective[category_id] = granted
+    for category_id, systems in (overrides or {}).items():
+        for system_id, is_granted in systems.items():
+            if is_granted:
+                effective.setdefault(category_id, {})[system_id] = True
+            elif category_id in effective:
+                effective[category_id].pop(system_id, None)
+                if not effective[category_id]:
+                    del effective[category_id]
+    return effective
+
+
+def _set_flag(root, keys, value):
+    """Set root[k1][k2]...[kn] = value, or remove it (and emptied parents) if value is None"""
+    if value is not None:
+        node = root
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = value
+        return
+    nodes = [root]
+    for key in keys[:-1]:
+        if key not in nodes[-1]:
+            return
+        nodes.append(nodes[-1][key])
+    nodes[-1].pop(keys[-1], None)
+    for node, key in zip(reversed(nodes[:-1]), reversed(keys[:-1])):
+        if node[key]:
+            break
+        del node[key]
+
+
+class PermissionResolver:
+    """Effective permissions of the positions of one database document.
+
+    Results are memoized per position. Changes made through the methods
+    below invalidate only what they affect: a template change drops the
+    results of the positions using it, an override change drops that
+    position's result. The returned dicts are shared, do not modify them.
+    """
+
+    def __init__(self, db_data):
+        self.db_data = db_data
+        self._cache = {}
+        self._positions_by_template = {}
+
+    # --- Reading ---
+
+    def templates(self):
+        """[(template_id, name)] sorted by name"""
+        templates = self.db_data.get(TEMPLATES_KEY) or {}
+        return sorted(((template_id, template.get("name", template_id)) for template_id, template in templates.items()),
+                      key=lambda entry: entry[1].lower())
+
+    def template_of(self, dept_id, pos_id):
+        """Template id the position inherits from, or None"""
+        template_id = (self.db_data.get(ASSIGNMENTS_KEY) or {}).get(dept_id, {}).get(pos_id)
+        return template_id if template_id in (self.db_data.get(TEMPLATES_KEY) or {}) else None
+
+    def template_permissions(self, template_id):
+        template = (self.db_data.get(TEMPLATES_KEY) or {}).get(template_id) or {}
+        return template.get("permissions") or {}
+
+    def effective_permissions(self, dept_id, pos_id):
+        """{category_id: {system_id: True}} the position has access to"""
+        key = (dept_id, pos_id)
+        if key not in self._cache:
+            template_id = self.template_of(dept_id, pos_id)
+            overrides = (self.db_data.get(PERMISSIONS_KEY) or {}).get(dept_id, {}).get(pos_id)
+            self._cache[key] = resolve(self.template_permissions(template_id) if template_id else None, overrides)
+            if template_id is not None:
+                self._positions_by_template.setdefault(template_id, set()).add(key)
+        return self._cache[key]
+
+    def invalidate_position(self, dept_id, pos_id):
+        self._cache.pop((dept_id, pos_id), None)
+
+    def invalidate_template(self, template_id):
+        for key in self._positions_by_template.pop(template_id, ()):
+            self._cache.pop(key, None)
+
+    # --- Changes, on a mutable document ---
+
+    def set_position_permission(self, dept_id, pos_id, category_id, system_id, granted):
+        """Give or take away one system for a position, as an override of its template if it has one"""
+        template_id = self.template_of(dept_id, pos_id)
+        inherited = bool(self.template_permissions(template_id).get(category_id, {}).get(system_id)) \
+            if template_id else False
+        # Only store what differs from the template
+        value = None if granted == inherited else granted
+        _set_flag(self.db_data.setdefault(PERMISSIONS_KEY, {}), (dept_id, pos_id, category_id, system_id), value)
+        self.invalidate_position(dept_id, pos_id)
+
+    def set_template_permission(self, template_id, category_id, system_id, granted):
+        """Give or take away one system for every position using a template"""
+        template = self.db_data.setdefault(TEMPLATES_KEY, {})[template_id]
+        _set_flag(template.setdefault("permissions", {}), (category_id, system_id), True if granted else None)
+        self.invalidate_template(template_id)
+
+    def add_template(self, template_id, name, permissions=None):
+        """Create a template, optionally starting from a copy of some permissions"""
+        self.db_data.setdefault(TEMPLATES_KEY, {})[template_id] = {
+            "name": name,
+            "permissions": {category_id: dict(systems) for category_id, systems in (permissions or {}).items()},
+        }
+        self.invalidate_template(template_id)
+
+    def assign_template(self, dept_id, pos_id, template_id):
+        """Make a position inherit from a template, or from none.
+
+        With a template the position gets exactly the template's access; its
+        own permissions are dropped. Without one it keeps the access it had,
+        stored as its own permissions again.
+        """
+        effective = self.effective_permissions(dept_id, pos_id)
+        assignments = self.db_data.setdefault(ASSIGNMENTS_KEY, {})
+        permissions = self.db_data.setdefault(PERMISSIONS_KEY, {})
+        _set_flag(assignments, (dept_id, pos_id), template_id)
+        if template_id is None:
+            own = {category_id: dict(systems) for category_id, systems in effective.items()}
+            _set_flag(permissions, (dept_id, pos_id), own or None)
+        else:
+            _set_flag(permissions, (dept_id, pos_id), None)
+        self.invalidate_position(dept_id, pos_id)
+
+    def remove_template(self, template_id):
+        """Delete a template; positions using it keep their access as their own permissions"""
+        for dept_id, positions in list((self.db_data.get(ASSIGNMENTS_KEY) or {}).items()):
+            for pos_id, assigned in list(positions.items()):
+                if assigned == template_id:
+                    self.assign_template(dept_id, pos_id, None)
+        (self.db_data.get(TEMPLATES_KEY) or {}).pop(template_id, None)
+        self.invalidate_template(template_id)
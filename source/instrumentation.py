@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import atexit
+import logging
+import threading
+import functools
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+APP_LOG_NAME = "waldorf"
+
+# Number of recent samples kept per histogram for percentile estimates
+HISTOGRAM_SAMPLES = 1024
+
+# Timings slower than this are also logged at INFO level
+SLOW_OPERATION_MS = 500
+
+
+def get_log_dir():
+    """Return the directory for the rotating log and the metrics snapshot"""
+    log_dir = os.getenv("WALDORF_LOG_DIR")
+    if log_dir:
+        return log_dir
+    base_dir = os.getenv("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base_dir, "WaldorfAccessFormGenerator", "logs")
+
+
+_logging_configured = False
+
+
+def _configure_logging():
+    """Send application logs to the console and to a rotating log file"""
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+
+    logger = logging.getLogger(APP_LOG_NAME)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    # Console keeps the messages that used to be printed
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(logging.INFO)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(console)
+
+    try:
+        log_dir = get_log_dir()
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = RotatingFileHandler(os.path.join(log_dir, "waldorf.log"),
+                                           maxBytes=1024 * 1024, backupCount=3, encoding="utf-8")
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        logger.addHandler(file_handler)
+    except Exception as e:
+        logger.warning(f"File logging disabled: {str(e)}")
+
+
+def get_logger(name=None):
+    """Return an application logger (console plus rotating log file)"""
+    _configure_logging()
+    if name:
+        return logging.getLogger(f"{APP_LOG_NAME}.{name}")
+    return logging.getLogger(APP_LOG_NAME)
+
+
+class Histogram:
+    """Latency histogram keeping totals and a window of recent samples"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.samples = deque(maxlen=HISTOGRAM_SAMPLES)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.samples.append(value)
+
+    def summary(self):
+        """Return count, mean and percentiles of the recorded values"""
+        ordered = sorted(self.samples)
+
+        def pct(fraction):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * fraction)))]
+
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "min_ms": self.min or 0.0,
+            "max_ms": self.max or 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+        }
+
+
+class MetricsRegistry:
+    """Process-wide registry of counters and latency histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started_at = time.time()
+
+    def increment(self, name, amount=1):
+        """Add to a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, elapsed_ms):
+        """Record a latency sample in milliseconds"""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(elapsed_ms)
+
+    def snapshot(self):
+        """Return the current counters and histogram summaries"""
+        with self._lock:
+            return {
+                "uptime_s": time.time() - self.started_at,
+                "counters": dict(self.counters),
+                "timings": {name: h.summary() for name, h in sorted(self.histograms.items())},
+            }
+
+    def reset(self):
+        """Drop all recorded metrics"""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started_at = time.time()
+
+    def export_json(self, path=None):
+        """Write a JSON snapshot of the metrics and return its path"""
+        if path is None:
+            path = os.path.join(get_log_dir(), "metrics_snapshot.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+
+# Create a singleton instance
+metrics = MetricsRegistry()
+
+
+class timed:
+    """Time a block or a function into the metrics registry.
+
+    Usable as a context manager (``with timed("db.load.local"):``) or as a
+    decorator (``@timed("screen.main.construct")``). Exceptions are counted
+    under ``<name>.errors`` and re-raised.
+    """
+
+    def __init__(self, name, registry=None):
+        self.name = name
+        self.registry = registry or metrics
+        self._starts = threading.local()
+
+    def __enter__(self):
+        stack = getattr(self._starts, "stack", None)
+        if stack is None:
+            stack = self._starts.stack = []
+        stack.append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (time.perf_counter() - self._starts.stack.pop()) * 1000.0
+        self.registry.observe(self.name, elapsed_ms)
+        if exc_type is not None:
+            self.registry.increment(f"{self.name}.errors")
+        logger = get_logger("metrics")
+        if elapsed_ms >= SLOW_OPERATION_MS:
+            logger.info(f"{self.name} took {elapsed_ms:.0f} ms")
+        else:
+            logger.debug(f"{self.name} took {elapsed_ms:.1f} ms")
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self:
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def _export_on_exit():
+    """Leave a metrics snapshot next to the log when the application exits"""
+    if metrics.histograms or metrics.counters:
+        try:
+            metrics.export_json()
+        except Exception:
+            pass
+
+
+atexit.register(_export_on_exit)
@@ -0,0 +1,192 @@
+"""Startup trace mode.
+
+Set WALDORF_STARTUP_TRACE=1 (or to a file path) to record the wall time of
+bundle extraction, every module import, .env loading, database init and the
+first paint of each window. The report is written as JSON when the process
+exits, or right after the login screen is painted when
+WALDORF_STARTUP_TRACE_EXIT=1 is also set (used by the startup benchmark).
+
+This module only uses the standard library and must be the first import of
+main.py so that every later import is measured.
+"""
+import os
+import sys
+import time
+import json
+import atexit
+import builtins
+import tempfile
+
+TRACE_ENV = "WALDORF_STARTUP_TRACE"
+EXIT_ENV = "WALDORF_STARTUP_TRACE_EXIT"
+
+DEFAULT_REPORT_NAME = "waldorf_startup_trace.json"
+
+_trace_value = os.getenv(TRACE_ENV, "")
+_enabled = _trace_value.lower() not in ("", "0", "false", "no")
+_start = time.perf_counter()
+_start_wall = time.time()
+
+_phases = []        # {"name", "start_ms", "duration_ms"}
+_imports = []       # {"module", "depth", "start_ms", "duration_ms"}
+_marks = {}         # name -> ms since trace start
+_import_depth = 0
+_original_import = builtins.__import__
+_report_written = False
+
+
+def is_enabled():
+    """Return True when the startup trace is active"""
+    return _enabled
+
+
+def exit_after_first_paint():
+    """Return True when the application should quit once the login screen is painted"""
+    return _enabled and os.getenv(EXIT_ENV, "").lower() in ("1", "true", "yes")
+
+
+def _elapsed_ms():
+    return (time.perf_counter() - _start) * 1000.0
+
+
+def report_path():
+    """Return the file the trace report is written to"""
+    if _trace_value.lower() in ("1", "true", "yes"):
+        return os.path.join(tempfile.gettempdir(), DEFAULT_REPORT_NAME)
+    return _trace_value
+
+
+class phase:
+    """Context manager recording the duration of a startup phase"""
+
+    def __init__(self, name):
+        self.name = name
+        self.start_ms = None
+
+    def __enter__(self):
+        if _enabled:
+            self.start_ms = _elapsed_ms()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if _enabled and self.start_ms is not None:
+            _phases.append({
+                "name": self.name,
+                "start_ms": self.start_ms,
+                "duration_ms": _elapsed_ms() - self.start_ms,
+            })
+        return False
+
+
+def mark(name):
+    """Record a point in time, keeping the first occurrence"""
+    if _enabled and name not in _marks:
+        _marks[name] = _elapsed_ms()
+
+
+def _traced_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """builtins.__import__ replacement timing the first import of each module"""
+    global _import_depth
+    if level:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    # "from package import submodule" loads the submodule through fromlist
+    parent = sys.modules.get(name)
+    if parent is not None:
+        submodules = [f"{name}.{item}" for item in (fromlist or ())
+                      if item != "*" and not hasattr(parent, item)]
+        if not submodules:
+            return _original_import(name, globals, locals, fromlist, level)
+        label = ", ".join(submodules)
+    else:
+        label = name
+
+    start_ms = _elapsed_ms()
+    depth = _import_depth
+    _import_depth += 1
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _import_depth -= 1
+        _imports.append({
+            "module": label,
+            "depth": depth,
+            "start_ms": start_ms,
+            "duration_ms": _elapsed_ms() - start_ms,
+        })
+
+
+def _bundle_extraction_ms():
+    """Estimate the time spent unpacking a onefile bundle before Python started.
+
+    The PyInstaller bootloader creates the _MEI temp directory before it
+    extracts the archive, so the directory age at trace start covers the
+    extraction plus interpreter boot.
+    """
+    bundle_dir = getattr(sys, "_MEIPASS", None)
+    if not getattr(sys, "frozen", False) or not bundle_dir:
+        return None
+    # A onedir build runs in place, there is no extraction directory
+    if not os.path.basename(os.path.normpath(bundle_dir)).startswith("_MEI"):
+        return None
+    try:
+        return max(0.0, (_start_wall - os.path.getctime(bundle_dir)) * 1000.0)
+    except OSError:
+        return None
+
+
+def build_report():
+    """Return the trace collected so far"""
+    imports = sorted(_imports, key=lambda entry: entry["start_ms"])
+    top_level = [entry for entry in imports if entry["depth"] == 0]
+    return {
+        "frozen": bool(getattr(sys, "frozen", False)),
+        "python": sys.version.split()[0],
+        "total_ms": _elapsed_ms(),
+        "bundle_extraction_ms": _bundle_extraction_ms(),
+        "import_total_ms": sum(entry["duration_ms"] for entry in top_level),
+        "marks": dict(_marks),
+        "phases": list(_phases),
+        "imports": imports,
+    }
+
+
+def format_report(report, top=15):
+    """Return a short human readable summary of a trace report"""
+    lines = ["Startup trace"]
+    if report["bundle_extraction_ms"] is not None:
+        lines.append(f"  bundle extraction + boot  {report['bundle_extraction_ms']:9.1f} ms")
+    lines.append(f"  imports (top level)       {report['import_total_ms']:9.1f} ms")
+    for entry in report["phases"]:
+        lines.append(f"  {entry['name']:<25} {entry['duration_ms']:9.1f} ms")
+    for name, at_ms in sorted(report["marks"].items(), key=lambda item: item[1]):
+        lines.append(f"  {name:<25} at {at_ms:6.1f} ms")
+    lines.append("  slowest imports:")
+    for entry in sorted(report["imports"], key=lambda e: e["duration_ms"], reverse=True)[:top]:
+        lines.append(f"    {entry['module']:<40} {entry['duration_ms']:8.1f} ms")
+    return "\n".join(lines)
+
+
+def write_report():
+    """Write the trace report to report_path() and print a summary to stderr"""
+    global _report_written
+    if not _enabled or _report_written:
+        return None
+    _report_written = True
+    builtins.__import__ = _original_import
+    report = build_report()
+    path = report_path()
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    except Exception as e:
+        print(f"Error writing startup trace: {str(e)}", file=sys.stderr)
+    if sys.stderr:
+        print(format_report(report), file=sys.stderr)
+        print(f"Startup trace written to {path}", file=sys.stderr)
+    return report
+
+
+if _enabled:
+    builtins.__import__ = _traced_import
+    atexit.register(write_report)